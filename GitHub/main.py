@@ -1,4 +1,7 @@
 import os
+import time
+import threading
+import numpy as np
 import gradio as gr
 from supabase import create_client
 from dotenv import load_dotenv
@@ -13,24 +16,85 @@ OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Serving: Queue-Größe + Limits je Event-Gruppe (Default in Gradio: 1 Lauf pro Event)
+QUEUE_MAX = int(os.getenv("KALLI_QUEUE_MAX", "64"))
+FRAGE_CONCURRENCY = int(os.getenv("KALLI_SEM_CONCURRENCY", "2"))      # Embedding + RPC
+VIEWER_CONCURRENCY = int(os.getenv("KALLI_FILTER_CONCURRENCY", "8"))  # Listen im Polit-Viewer
+
+# Ergebnis-Cache für frage_kalli: ähnliche Fragen (Cosinus ≥ Schwelle, gleiche RPC-Parameter)
+# bekommen die gecachten Treffer. Neuer Datenstand (kalli_status.ingest_version) → leeren.
+ERGEBNIS_CACHE_SIM = float(os.getenv("KALLI_SEM_CACHE_SIM", "0.95"))
+ERGEBNIS_CACHE_MAX = int(os.getenv("KALLI_SEM_CACHE_SIZE", "128"))
+ERGEBNIS_CACHE_TTL = float(os.getenv("KALLI_SEM_CACHE_TTL", "1800"))
+ergebnis_cache = {"version": None, "eintraege": []}   # eintraege: (ablauf, vektor, params, treffer)
+_ergebnis_lock = threading.Lock()       # Handler laufen parallel (concurrency_limit)
+
+def _cache_version(version):
+    with _ergebnis_lock:
+        if version is not None and version != ergebnis_cache["version"]:
+            ergebnis_cache["eintraege"] = []
+            ergebnis_cache["version"] = version
+
+def match_cached(embedding, params):
+    """match_bvv_dokumente mit Ergebnis-Cache für (fast) gleiche Fragen."""
+    q = np.asarray(embedding, dtype=np.float32)
+    q = q / (np.linalg.norm(q) or 1.0)
+    now = time.monotonic()
+    with _ergebnis_lock:
+        eintraege = [e for e in ergebnis_cache["eintraege"] if e[0] > now and e[2] == params]
+    if eintraege:
+        sims = np.stack([e[1] for e in eintraege]) @ q
+        best = int(np.argmax(sims))
+        if sims[best] >= ERGEBNIS_CACHE_SIM:
+            return eintraege[best][3]
+
+    # RPC außerhalb des Locks; danach abgelaufene raus, neuen Eintrag rein, auf Maximum kürzen
+    matches = supabase.rpc("match_bvv_dokumente", {"query_embedding": embedding, **params}).execute().data or []
+    with _ergebnis_lock:
+        now = time.monotonic()
+        alle = [e for e in ergebnis_cache["eintraege"] if e[0] > now]
+        ergebnis_cache["eintraege"] = (alle + [(now + ERGEBNIS_CACHE_TTL, q, params, matches)])[-ERGEBNIS_CACHE_MAX:]
+    return matches
+
+# kalli_status (Modell + Datenstand) höchstens alle KALLI_STATUS_TTL Sekunden lesen,
+# nicht bei jeder Frage
+KALLI_STATUS_TTL = float(os.getenv("KALLI_STATUS_TTL", "30"))
+_status = {"row": {}, "ts": 0.0}
+_status_lock = threading.Lock()
+
+def kalli_status():
+    if time.monotonic() - _status["ts"] > KALLI_STATUS_TTL:
+        with _status_lock:
+            if time.monotonic() - _status["ts"] > KALLI_STATUS_TTL:   # anderer Thread war schneller?
+                try:
+                    rows = supabase.table("kalli_status").select("*").eq("id", 1).limit(1).execute().data or []
+                    if rows:
+                        _status["row"] = rows[0]
+                except Exception:
+                    pass   # Tabelle fehlt / Netz weg → letzten Stand behalten
+                _status["ts"] = time.monotonic()
+    return _status["row"]
+
+def embed(text):
+    # Modell muss zu den gespeicherten Vektoren passen (kalli_status, siehe migrate_embeddings.py)
+    row = kalli_status()
+    model, dims = row.get("emb_model") or "text-embedding-3-small", row.get("emb_dims")
+    _cache_version(row.get("ingest_version"))
+    response = openai_client.embeddings.create(
+        input=text,
+        model=model,
+        **({"dimensions": dims} if dims else {})
+    )
+    return response.data[0].embedding
+
 def frage_kalli(prompt, debugmodus):
     try:
-        response = openai_client.embeddings.create(
-            input=prompt,
-            model="text-embedding-3-small"
-        )
-        embedding = response.data[0].embedding
-
-        response = supabase.rpc(
-            "match_bvv_dokumente",
-            {
-                "query_embedding": embedding,
-                "match_threshold": 0.4,
-                "match_count": 3
-            }
-        ).execute()
+        embedding = embed(prompt)
 
-        matches = response.data or []
+        matches = match_cached(embedding, {
+            "match_threshold": 0.4,
+            "match_count": 3
+        })
         if not matches:
             return "😕 Leider keine passenden Inhalte gefunden."
 
@@ -66,10 +130,7 @@ def diagnose_kalli():
         report.append(f"❌ Fehler beim Lesen der View: {e}")
 
     try:
-        embedding = openai_client.embeddings.create(
-            input="Testfrage zur Verkehrssicherheit",
-            model="text-embedding-3-small"
-        ).data[0].embedding
+        embedding = embed("Testfrage zur Verkehrssicherheit")
 
         result = supabase.rpc(
             "match_bvv_dokumente",
@@ -89,6 +150,15 @@ def diagnose_kalli():
     except Exception as e:
         report.append(f"❌ Fehler bei RPC-Test: {e}")
 
+    # Gradio hat keine öffentliche API für den Queue-Status → Interna nur, wenn vorhanden
+    get_status = getattr(getattr(demo, "_queue", None), "get_status", None)
+    try:
+        st = get_status() if callable(get_status) else None
+        report.append(f"ℹ️ Queue: {st.queue_size} wartend (max {QUEUE_MAX}, Fragen parallel {FRAGE_CONCURRENCY})")
+    except Exception:
+        report.append(f"ℹ️ Queue: Status in dieser Gradio-Version nicht lesbar (max {QUEUE_MAX}, "
+                      f"Fragen parallel {FRAGE_CONCURRENCY})")
+
     return "\n".join(report)
 
 table_selector = {"selected": "antraege"}
@@ -136,12 +206,13 @@ def polit_viewer_ui():
         offset_box = gr.Number(value=0, visible=False)
         more_button = gr.Button("🔁 Mehr anzeigen", visible=False)
 
-        btn_antraege.click(fn=show_entries, inputs=[gr.Textbox(value="antraege", visible=False)], outputs=[output, offset_box, more_button])
-        btn_muendlich.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_muendlich", visible=False)], outputs=[output, offset_box, more_button])
-        btn_klein.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_klein", visible=False)], outputs=[output, offset_box, more_button])
-        btn_gross.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_gross", visible=False)], outputs=[output, offset_box, more_button])
+        btn_antraege.click(fn=show_entries, inputs=[gr.Textbox(value="antraege", visible=False)], outputs=[output, offset_box, more_button], concurrency_limit=VIEWER_CONCURRENCY, concurrency_id="viewer")
+        btn_muendlich.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_muendlich", visible=False)], outputs=[output, offset_box, more_button], concurrency_limit=VIEWER_CONCURRENCY, concurrency_id="viewer")
+        btn_klein.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_klein", visible=False)], outputs=[output, offset_box, more_button], concurrency_limit=VIEWER_CONCURRENCY, concurrency_id="viewer")
+        btn_gross.click(fn=show_entries, inputs=[gr.Textbox(value="anfragen_gross", visible=False)], outputs=[output, offset_box, more_button], concurrency_limit=VIEWER_CONCURRENCY, concurrency_id="viewer")
 
-        more_button.click(fn=fetch_data, inputs=[offset_box], outputs=[output, offset_box, more_button])
+        more_button.click(fn=fetch_data, inputs=[offset_box], outputs=[output, offset_box, more_button],
+                          concurrency_limit=VIEWER_CONCURRENCY, concurrency_id="viewer")
     return demo
 
 with gr.Blocks() as demo:
@@ -153,7 +224,8 @@ with gr.Blocks() as demo:
                     gr.Textbox(label="Was willst Du wissen?", placeholder="Stell mir eine Frage…"),
                     gr.Checkbox(label="Debugmodus aktivieren")
                 ],
-                outputs=gr.Markdown(label="Antwort von KalliGPT")
+                outputs=gr.Markdown(label="Antwort von KalliGPT"),
+                concurrency_limit=FRAGE_CONCURRENCY
             ).render()
 
         with gr.TabItem("Diagnose"):
@@ -166,4 +238,5 @@ with gr.Blocks() as demo:
         with gr.TabItem("Polit-Viewer"):
             polit_viewer_ui()
 
+demo.queue(max_size=QUEUE_MAX)
 demo.launch(server_name="0.0.0.0", server_port=int(os.environ.get("PORT", 8080)))
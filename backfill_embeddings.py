@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Backfill: Vorgänge ohne Eintrag in vorgang_embeddings nachträglich embedden.
+
+Betrifft Zeilen, die nicht über embed_from_json_v2.py kamen
+(altes Insert-Skript → log/embedding_log.txt, manuelle Edits in Supabase).
+Ohne Vektor tauchen sie in der semantischen Suche nie auf.
+
+Ablauf je Quelltabelle:
+  Keyset-Paging auf id (Anti-Join gegen vorgang_embeddings) → Batch embedden → Upsert
+
+Usage:
+  python backfill_embeddings.py              # alle vier Tabellen
+  python backfill_embeddings.py --dry-run    # nur zählen
+  python backfill_embeddings.py --tabelle antraege --batch 32
+"""
+import argparse, time
+
+from bulk_load_v2 import SOURCE_TABLES, connect, vector_literal
+from embed_from_json_v2 import embed_for_write, knn_nachziehen, BATCH_SIZE, SOURCE_EMB_DIMS
+
+
+def iter_missing(conn, table: str, batch: int):
+    """Liefert Seiten (id, titel, inhalt) ohne Vektor – Keyset auf id, nie OFFSET."""
+    after = None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT t.id, t.titel, t.inhalt
+                  FROM {table} t
+                 WHERE (%(after)s::uuid IS NULL OR t.id > %(after)s::uuid)
+                   AND NOT EXISTS (SELECT 1 FROM vorgang_embeddings e WHERE e.id = t.id)
+                 ORDER BY t.id
+                 LIMIT %(limit)s""", {"after": after, "limit": batch})
+            rows = cur.fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield rows
+
+
+def count_missing(conn, table: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT count(*) FROM {table} t
+             WHERE NOT EXISTS (SELECT 1 FROM vorgang_embeddings e WHERE e.id = t.id)""")
+        return int(cur.fetchone()[0])
+
+
+def write_embeddings(conn, table: str, rows, embs):
+    """Upsert nach vorgang_embeddings (+ Spiegel in der Quelltabelle, wenn die Dimension passt)."""
+    params = [(doc_id, vector_literal(emb)) for (doc_id, _, _), emb in zip(rows, embs)]
+    with conn.cursor() as cur:
+        cur.executemany(
+            """INSERT INTO vorgang_embeddings (id, embedding) VALUES (%s, %s::vector)
+               ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding""",
+            params,
+        )
+        if embs and len(embs[0]) == SOURCE_EMB_DIMS:
+            cur.executemany(
+                f"UPDATE {table} SET embedding = %s::vector WHERE id = %s",
+                [(vec, doc_id) for doc_id, vec in params],
+            )
+    conn.commit()
+
+
+def backfill(tables, batch: int, dry_run: bool = False) -> int:
+    total_done = 0
+    with connect() as conn:
+        for table in tables:
+            missing = count_missing(conn, table)
+            print(f"[i] {table}: {missing} Vorgang/Vorgänge ohne Vektor")
+            if dry_run or not missing:
+                continue
+
+            done, t0, model = 0, time.monotonic(), None
+            for rows in iter_missing(conn, table, batch):
+                try:
+                    embs, model = embed_for_write([f"Titel: {titel}\n\n{inhalt or ''}" for _, titel, inhalt in rows])
+                except Exception as e:
+                    print(f"[!] {table}: Fehler beim Embedding → {e} (Batch übersprungen)")
+                    continue
+                write_embeddings(conn, table, rows, embs)
+                done += len(rows)
+                rate = done / max(time.monotonic() - t0, 1e-6)
+                print(f"[~] {table}: {done}/{missing} · {rate:.1f} Vorgänge/s")
+
+            print(f"[✓] {table}: {done} Vektor(en) nachgetragen ({model or '–'})")
+            total_done += done
+
+    return total_done
+
+
+# --- Main ---
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fehlende Embeddings nachtragen (Backfill)")
+    ap.add_argument("--tabelle", choices=SOURCE_TABLES, help="nur diese Quelltabelle")
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE)
+    ap.add_argument("--dry-run", action="store_true", help="nur fehlende Vektoren zählen")
+    args = ap.parse_args()
+
+    n = backfill([args.tabelle] if args.tabelle else SOURCE_TABLES, args.batch, dry_run=args.dry_run)
+    print(f"[i] Done. Nachgetragen: {n}")
+    if n:
+        knn_nachziehen()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Bulk-Loader für Erstbefüllungen (COPY statt PostgREST-Upserts).
+
+Ablauf:
+  1. alle Zeilen per COPY in eine temporäre Staging-Tabelle schreiben
+  2. EIN SQL-Statement verteilt sie auf die vier Quelltabellen
+     und spiegelt die Vektoren nach vorgang_embeddings
+
+Wird über `embed_from_json_v2.py <dir> --bulk` genutzt.
+Lokaler Test: sql/00_lokal_schema.sql einspielen und SUPABASE_DB_URL setzen.
+"""
+import os
+from typing import Dict, Iterable, List
+
+# Optional lib: psycopg (v3) – nur für den Direktzugriff auf Postgres nötig.
+try:
+    import psycopg
+except Exception:
+    psycopg = None
+
+
+SOURCE_TABLES = ("antraege", "anfragen_klein", "anfragen_gross", "anfragen_muendlich")
+
+# Reihenfolge = Reihenfolge im COPY
+STAGE_COLUMNS = (
+    "tabelle", "id", "titel", "inhalt", "datum", "kategorie", "thema", "pdf_url",
+    "drucksache", "fraktion", "einreicher", "status", "published", "embedding",
+)
+
+# Spalten, die in den Quelltabellen bei Konflikt überschrieben werden
+_UPDATE_COLUMNS = STAGE_COLUMNS[2:]
+
+STAGE_DDL = """
+CREATE TEMP TABLE _stage_vorgaenge (
+    tabelle     text not null,
+    id          uuid,
+    titel       text not null,
+    inhalt      text not null,
+    datum       date,
+    kategorie   text,
+    thema       text,
+    pdf_url     text,
+    drucksache  text,
+    fraktion    text,
+    einreicher  text,
+    status      text,
+    published   boolean not null default false,
+    embedding   vector not null,
+    nr          bigint generated always as identity    -- COPY-Reihenfolge (letzter gewinnt)
+) ON COMMIT DROP
+"""
+
+
+def connect(dsn: str | None = None):
+    """Direkte Postgres-Verbindung (Supabase: Settings → Database → Connection string)."""
+    if psycopg is None:
+        raise RuntimeError("❌ psycopg fehlt → pip install \"psycopg[binary]\"")
+    dsn = dsn or os.getenv("SUPABASE_DB_URL")
+    if not dsn:
+        raise RuntimeError("❌ SUPABASE_DB_URL fehlt → Postgres-Connection-String in .env eintragen!")
+    return psycopg.connect(dsn)
+
+
+def vector_literal(emb: List[float]) -> str:
+    """pgvector-Textformat: '[0.1,0.2,...]'."""
+    return "[" + ",".join(repr(float(x)) for x in emb) + "]"
+
+
+def dedupe_rows(rows: Iterable[Dict]) -> List[Dict]:
+    """
+    Offensichtliche Dubletten vorab zusammenfassen (letzter gewinnt) – spart Embeddings.
+    Was erst in der DB auflösbar ist (Zeile mit id + Zeile mit passender drucksache
+    → gleiche Ziel-ID), fasst das Merge-Statement per DISTINCT ON (rid) zusammen.
+    """
+    seen: Dict[tuple, Dict] = {}
+    for i, r in enumerate(rows):
+        if r.get("id"):
+            key = (r["tabelle"], "id", str(r["id"]))
+        elif r.get("drucksache"):
+            key = (r["tabelle"], "ds", r["drucksache"])
+        else:
+            key = (r["tabelle"], "neu", i)
+        seen.pop(key, None)
+        seen[key] = r
+    return list(seen.values())
+
+
+def _build_merge_sql(source_embedding: bool = True) -> str:
+    """
+    Ein Statement: ID-Auflösung über drucksache + Upsert in alle Zieltabellen.
+    source_embedding=False: Spalte `embedding` der Quelltabellen nicht anfassen
+    (z. B. nach einem Modellwechsel mit anderer Dimension, siehe migrate_embeddings.py).
+    """
+    upd = _UPDATE_COLUMNS if source_embedding else _UPDATE_COLUMNS[:-1]
+    cols = ", ".join(upd)
+    sets = ", ".join(f"{c} = EXCLUDED.{c}" for c in upd)
+
+    lookups = "\n            UNION ALL\n".join(
+        f"            SELECT t.id FROM {t} t WHERE s.tabelle = '{t}' AND t.drucksache = s.drucksache"
+        for t in SOURCE_TABLES
+    )
+    upserts = ",\n".join(
+        f"""up_{t} AS (
+    INSERT INTO {t} (id, {cols})
+    SELECT rid, {cols} FROM staged WHERE tabelle = '{t}'
+    ON CONFLICT (id) DO UPDATE SET {sets}
+    RETURNING 1
+)"""
+        for t in SOURCE_TABLES
+    )
+    counts = ",\n    ".join(f"(SELECT count(*) FROM up_{t}) AS {t}" for t in SOURCE_TABLES)
+
+    return f"""
+WITH resolved AS MATERIALIZED (
+    SELECT s.*, COALESCE(s.id, ex.id, gen_random_uuid()) AS rid
+    FROM _stage_vorgaenge s
+    LEFT JOIN LATERAL (
+{lookups}
+            LIMIT 1
+    ) ex ON s.id IS NULL AND s.drucksache IS NOT NULL
+),
+-- je Ziel-ID nur die zuletzt gestagte Zeile, sonst "cannot affect row a second time"
+staged AS MATERIALIZED (
+    SELECT DISTINCT ON (rid) * FROM resolved ORDER BY rid, nr DESC
+),
+{upserts},
+up_embeddings AS (
+    INSERT INTO vorgang_embeddings (id, embedding)
+    SELECT rid, embedding FROM staged
+    ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding
+    RETURNING 1
+)
+SELECT
+    {counts},
+    (SELECT count(*) FROM up_embeddings) AS vorgang_embeddings
+"""
+
+
+def stage_rows(conn, rows: List[Dict]) -> int:
+    """Zeilen per COPY in die Staging-Tabelle schreiben."""
+    n = 0
+    with conn.cursor() as cur:
+        cur.execute(STAGE_DDL)
+        with cur.copy(f"COPY _stage_vorgaenge ({', '.join(STAGE_COLUMNS)}) FROM STDIN") as cp:
+            for r in rows:
+                cp.write_row((
+                    r["tabelle"],
+                    r.get("id") or None,
+                    r["titel"],
+                    r["inhalt"],
+                    r.get("datum") or None,
+                    r.get("kategorie"),
+                    r.get("thema"),
+                    r.get("pdf_url"),
+                    r.get("drucksache"),
+                    r.get("fraktion"),
+                    r.get("einreicher"),
+                    r.get("status"),
+                    bool(r.get("published", False)),
+                    vector_literal(r["embedding"]),
+                ))
+                n += 1
+    return n
+
+
+def bulk_load(rows: List[Dict], dsn: str | None = None, source_embedding: bool = True) -> Dict[str, int]:
+    """
+    Staging per COPY + Merge in einer Transaktion.
+    rows: Dicts mit 'tabelle', Vorgangsfeldern und 'embedding'.
+    Rückgabe: Anzahl geschriebener Zeilen je Zieltabelle.
+    """
+    bad = {r.get("tabelle") for r in rows} - set(SOURCE_TABLES)
+    if bad:
+        raise ValueError(f"ungültige Tabelle(n): {', '.join(map(str, bad))}")
+
+    rows = dedupe_rows(rows)
+    with connect(dsn) as conn:
+        staged = stage_rows(conn, rows)
+        with conn.cursor() as cur:
+            cur.execute(_build_merge_sql(source_embedding))
+            names = [d.name for d in cur.description]
+            counts = dict(zip(names, cur.fetchone()))
+        conn.commit()
+
+    counts["staged"] = staged
+    return counts
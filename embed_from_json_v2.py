@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
-import os, sys, json, glob, hashlib
+import os, sys, json, glob, hashlib, time
 from pathlib import Path
 from typing import List, Dict
 from uuid import uuid4
 from supabase import create_client, Client
-from openai import OpenAI
+from openai import OpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError, BadRequestError
 from dotenv import load_dotenv
 #python .\embed_from_json_v2.py .\1479-XXI.json
+#python .\embed_from_json_v2.py .\json\ --bulk     (Erstbefüllung per COPY, braucht SUPABASE_DB_URL)
 
 
 # 🌱 .env laden
@@ -28,21 +29,108 @@ sb: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 oc = OpenAI(api_key=OPENAI_API_KEY)
 
 # 🔧 Embedding-Parameter
-EMB_MODEL  = "text-embedding-3-small"    # 1536 dims
+DEFAULT_EMB_MODEL = "text-embedding-3-small"    # 1536 dims
+SOURCE_EMB_DIMS   = 1536     # Spalte `embedding` in den Quelltabellen ist vector(1536)
 BATCH_SIZE = 64
 SLEEP_429  = 2.0
+BATCH_CHARS = 300_000       # Zeichen je Request (≈ 100k Token, Limit 300k Token je Request)
+MAX_INPUT_CHARS = 24_000    # je Text (Limit 8191 Token; Deutsch ≈ 3 Zeichen/Token)
+BULK_CHUNK = 500            # Bulk: Vorgänge je Embedding + COPY (RAM begrenzt, Fortschritt committet)
+_TRANSIENT = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def active_embedding_model() -> tuple[str, int | None]:
+    """
+    Aktives Modell aus kalli_status (nach migrate_embeddings.py), sonst Default.
+    Bei jedem Aufruf frisch gelesen (nicht beim Import): ein Cutover während eines
+    langen Laufs soll keine Vektoren des alten Modells in die neue Tabelle bringen.
+    """
+    try:
+        rows = sb.table("kalli_status").select("emb_model, emb_dims").eq("id", 1).limit(1).execute().data or []
+        if rows and rows[0].get("emb_model"):
+            return rows[0]["emb_model"], rows[0].get("emb_dims")
+    except Exception:
+        pass   # Tabelle (noch) nicht angelegt → Default
+    return DEFAULT_EMB_MODEL, None
+
 
 # Erlaubte Quelltabellen
 ALLOWED_TABLES = {"antraege", "anfragen_klein", "anfragen_gross", "anfragen_muendlich"}
 
 
 # --- Helfer ---
+def _emb_kwargs(model: str, dims: int | None) -> dict:
+    """`dimensions` nur mitschicken, wenn gesetzt (ada-002 kennt den Parameter nicht)."""
+    return {"model": model, **({"dimensions": dims} if dims else {})}
+
+
 def embed_text(text: str) -> List[float]:
     """Embedding für Text erzeugen (OpenAI)."""
-    resp = oc.embeddings.create(input=text, model=EMB_MODEL)
+    resp = oc.embeddings.create(input=text, **_emb_kwargs(*active_embedding_model()))
     return resp.data[0].embedding
 
 
+def _batches(texts: List[str]):
+    """Batches aus höchstens BATCH_SIZE Texten und BATCH_CHARS Zeichen."""
+    batch, chars = [], 0
+    for t in texts:
+        if batch and (len(batch) >= BATCH_SIZE or chars + len(t) > BATCH_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(t)
+        chars += len(t)
+    if batch:
+        yield batch
+
+
+def _embed_batch(chunk: List[str], kwargs: dict) -> List[List[float]]:
+    """
+    Ein Request; vorübergehende Fehler (429, Timeout, 5xx) → warten + wiederholen.
+    Zu groß (400): Batch halbieren, einzelnen Text kürzen.
+    """
+    for attempt in range(5):
+        try:
+            resp = oc.embeddings.create(input=chunk, **kwargs)
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+        except _TRANSIENT:
+            if attempt == 4:
+                raise
+            time.sleep(SLEEP_429 * (attempt + 1))
+        except BadRequestError:
+            if len(chunk) > 1:
+                half = len(chunk) // 2
+                return _embed_batch(chunk[:half], kwargs) + _embed_batch(chunk[half:], kwargs)
+            if len(chunk[0]) < 1000:
+                raise
+            print(f"[~] Text zu lang für das Embedding ({len(chunk[0])} Zeichen) → gekürzt")
+            return _embed_batch([chunk[0][:len(chunk[0]) // 2]], kwargs)
+
+
+def embed_texts(texts: List[str], model: str | None = None, dims: int | None = None) -> List[List[float]]:
+    """Embeddings für viele Texte in Batches (OpenAI); überlange Texte werden gekürzt."""
+    kwargs = _emb_kwargs(model, dims) if model else _emb_kwargs(*active_embedding_model())
+    out: List[List[float]] = []
+    for chunk in _batches([t[:MAX_INPUT_CHARS] for t in texts]):
+        out.extend(_embed_batch(chunk, kwargs))
+    return out
+
+
+def embed_for_write(texts: List[str]) -> tuple[List[List[float]], str]:
+    """
+    Embeddings mit dem aktiven Modell; vor dem Schreiben kalli_status erneut prüfen.
+    Cutover dazwischen → mit dem neuen Modell neu embedden. Rückgabe: (Vektoren, Modell)
+    """
+    model = active_embedding_model()
+    for _ in range(3):
+        embs = embed_texts(texts, *model)
+        current = active_embedding_model()
+        if current == model:
+            return embs, model[0]
+        print(f"[~] Embedding-Modell gewechselt ({model[0]} → {current[0]}) → neu embedden")
+        model = current
+    raise RuntimeError("Embedding-Modell wechselt ständig – Lauf später wiederholen")
+
+
 def collect_json_inputs(path_like: str):
     """
     Nimmt einen Pfad entgegen und liefert eine Liste von JSON-Dateien zurück.
@@ -112,9 +200,10 @@ def pre_sanitize_json(raw: str) -> str:
 
 
 
-def run(json_dir: str, dry_run: bool = False):
+def run(json_dir: str, dry_run: bool = False, bulk: bool = False):
     """
     Hauptlogik: Einlesen von JSON-Dateien, Embeddings erzeugen, optional Upsert nach Supabase.
+    bulk=True: Embeddings in Batches, Schreiben per COPY + Merge (siehe bulk_load_v2.py).
     """
     files = collect_json_inputs(json_dir)
 
@@ -127,6 +216,7 @@ def run(json_dir: str, dry_run: bool = False):
         print(f"    - {Path(p).name}")
 
     new_cnt, skip_cnt = 0, 0
+    bulk_rows: List[Dict] = []   # nur im Bulk-Modus
     for fn in files:
         try:
             #with open(fn, "r", encoding="utf-8-sig") as f:
@@ -162,10 +252,23 @@ def run(json_dir: str, dry_run: bool = False):
             (vorgang.get("titel", "") + vorgang.get("inhalt", "")).encode("utf-8")
         ).hexdigest()
 
+        # Bulk: nur sammeln, Embedding + Schreiben erfolgt gebündelt nach der Schleife
+        if bulk:
+            table = (meta.get("tabelle") or data.get("tabelle") or vorgang.get("tabelle"))
+            if table not in ALLOWED_TABLES:
+                print(f"[!] {Path(fn).name}: ungültige Tabelle '{table}' → skip")
+                skip_cnt += 1
+                continue
+            if dry_run:
+                print(f"[dry] {Path(fn).name}: ok (bulk) → Tabelle={table}; hash={content_hash[:8]}...")
+                continue
+            bulk_rows.append({**vorgang, "tabelle": table})
+            continue
+
         # Embedding erzeugen
         try:
             emb_input = f"Titel: {vorgang['titel']}\n\n{vorgang['inhalt']}"
-            emb = embed_text(emb_input)
+            emb = embed_for_write([emb_input])[0][0]
         except Exception as e:
             print(f"[!] {Path(fn).name}: Fehler beim Embedding → {e}")
             skip_cnt += 1
@@ -208,7 +311,8 @@ def run(json_dir: str, dry_run: bool = False):
                 "einreicher": vorgang.get("einreicher"),
                 "status":     vorgang.get("status"),
                 "published":  bool(vorgang.get("published", False)),
-                "embedding":  emb,  # nur wenn du die Spalte in der Quelltabelle halten willst
+                # nur wenn du die Spalte in der Quelltabelle halten willst (und die Dimension passt)
+                **({"embedding": emb} if len(emb) == SOURCE_EMB_DIMS else {}),
             }, on_conflict="id").execute()
 
             # Spiegel in vorgang_embeddings (für Semantik)
@@ -226,15 +330,70 @@ def run(json_dir: str, dry_run: bool = False):
             continue
 
 
+    if bulk_rows:
+        new_cnt, failed = run_bulk(bulk_rows)
+        skip_cnt += failed
+
     print(f"[i] Done. Neu/aktualisiert: {new_cnt}, übersprungen: {skip_cnt}")
+    if new_cnt and not dry_run:
+        knn_nachziehen()
+
+
+def knn_nachziehen():
+    """kNN-Graph (knn_nachbarn.py) inkrementell nachziehen; ohne NumPy/psycopg nur ein Hinweis."""
+    try:
+        from knn_nachbarn import after_ingest
+    except Exception as e:
+        print(f"[~] kNN-Graph nicht aktualisiert ({e}) → python knn_nachbarn.py")
+        return
+    after_ingest()
+
+
+def run_bulk(rows: List[Dict]) -> tuple[int, int]:
+    """
+    Bulk-Pfad, je BULK_CHUNK Vorgänge: Embeddings erzeugen → COPY → Staging → Merge → Commit.
+    Im RAM liegen nur die Vektoren eines Blocks; ein fehlgeschlagener Block kostet nur sich selbst.
+    Rückgabe: (geschrieben, übersprungen)
+    """
+    from bulk_load_v2 import bulk_load, dedupe_rows   # braucht psycopg + SUPABASE_DB_URL
+
+    rows = dedupe_rows(rows)
+    print(f"[i] Bulk: {len(rows)} Vorgang/Vorgänge in Blöcken zu {BULK_CHUNK} (Batch {BATCH_SIZE}) …")
+    written, skipped = 0, 0
+    for start in range(0, len(rows), BULK_CHUNK):
+        chunk = rows[start:start + BULK_CHUNK]
+        label = f"Block {start // BULK_CHUNK + 1} ({start + 1}–{start + len(chunk)})"
+        try:
+            embs, _ = embed_for_write([f"Titel: {r['titel']}\n\n{r['inhalt']}" for r in chunk])
+        except Exception as e:
+            print(f"[!] Bulk {label}: Fehler beim Embedding → {e}")
+            skipped += len(chunk)
+            continue
+
+        staged = [{**r, "embedding": emb} for r, emb in zip(chunk, embs)]
+        try:
+            counts = bulk_load(staged, source_embedding=(len(embs[0]) == SOURCE_EMB_DIMS))
+        except Exception as e:
+            print(f"[!] Bulk {label}: Fehler beim COPY/Merge → {e}")
+            skipped += len(chunk)
+            continue
+        finally:
+            del staged, embs
+
+        per_table = ", ".join(f"{k}={v}" for k, v in counts.items() if k != "staged")
+        print(f"[✓] Bulk {label}: {counts['staged']} Zeilen gestaged → {per_table}")
+        written += counts["vorgang_embeddings"]
+        skipped += len(chunk) - counts["staged"]
+    return written, skipped
 
 
 # --- Main ---
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python embed_from_json_v2.py <json_file_or_dir> [--dry-run]")
+        print("Usage: python embed_from_json_v2.py <json_file_or_dir> [--dry-run] [--bulk]")
         sys.exit(1)
 
     path = sys.argv[1]
     dry = "--dry-run" in sys.argv
-    run(path, dry_run=dry)
+    bulk = "--bulk" in sys.argv
+    run(path, dry_run=dry, bulk=bulk)
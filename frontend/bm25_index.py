@@ -0,0 +1,292 @@
+# ============================================================
+#  Lokaler BM25-Volltextindex (Deutsch)
+#   – Tokenisierung + CISTEM-Stemmer (Weissweiler/Fraser 2017)
+#   – invertierter Index: Term → (Slots, Häufigkeiten) als kompakte Arrays
+#   – BM25-Scoring per NumPy, Filter auf typ/status/einreicher/datum
+#   – inkrementell: geänderte Vorgänge bekommen einen neuen Slot,
+#     der alte wird als gelöscht markiert (Neuaufbau ab 30 % Leichen)
+#
+#  Ersetzt kein ilike, sondern liefert eine Rangfolge für die Hybrid-Suche.
+# ============================================================
+
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+
+# Optional lib: numpy – ohne NumPy keine Hybrid-Suche.
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+TITEL_BOOST = 3            # Titel-Tokens zählen dreifach
+MAX_DEAD_RATIO = 0.3       # ab so vielen gelöschten Slots → Neuaufbau empfehlen
+META_COLUMNS = ("id", "typ", "titel", "datum", "status", "fraktion",
+                "einreicher", "drucksache", "pdf_url")
+
+_TOKEN_RE = re.compile(r"[0-9a-zäöüß]+", re.IGNORECASE)
+
+# kurze Stoppwortliste – häufige Funktionswörter in Anträgen/Anfragen
+STOPWORDS = frozenset("""
+aber alle allem allen aller als also am an auch auf aus bei beim bis da damit dann das dass
+dem den denen der des die dies diese diesem diesen dieser dieses doch dort durch ein eine
+einem einen einer eines er es für gegen hat haben hier ich ihr im in ins ist jedoch kann
+kein keine mit nach nicht noch nur ob oder ohne sich sie sind so soll sollen über um und
+uns unter vom von vor war was wenn werden wie wir wird wo zu zum zur zwischen
+bezirksamt bezirksverordnetenversammlung drucksache
+""".split())
+
+
+# ---------- CISTEM ----------
+
+_RE_GE = re.compile(r"^ge(.{4,})")
+_RE_DOUBLE = re.compile(r"(.)\1")
+_RE_EMR = re.compile(r"e[mr]$")
+_RE_ND = re.compile(r"nd$")
+_RE_T = re.compile(r"t$")
+_RE_ESN = re.compile(r"[esn]$")
+_RE_UNDOUBLE = re.compile(r"(.)\*")
+
+
+def stem(word: str) -> str:
+    """CISTEM (case-insensitive Variante): 'Radwegen' → 'radweg', 'Anträge' → 'antrag'."""
+    word = word.lower().replace("ü", "u").replace("ö", "o").replace("ä", "a").replace("ß", "ss")
+    word = _RE_GE.sub(r"\1", word)
+    word = word.replace("sch", "$").replace("ei", "%").replace("ie", "&")
+    word = _RE_DOUBLE.sub(r"\1*", word)
+    while len(word) > 3:
+        if len(word) > 5:
+            new = _RE_EMR.sub("", word)
+            if new != word:
+                word = new
+                continue
+            new = _RE_ND.sub("", word)
+            if new != word:
+                word = new
+                continue
+        new = _RE_T.sub("", word)
+        if new != word:
+            word = new
+            continue
+        new = _RE_ESN.sub("", word)
+        if new != word:
+            word = new
+            continue
+        break
+    word = _RE_UNDOUBLE.sub(r"\1\1", word)
+    return word.replace("&", "ie").replace("%", "ei").replace("$", "sch")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Text → gestemmte Terme ohne Stoppwörter."""
+    if not text:
+        return []
+    out = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if len(tok) < 2 or tok in STOPWORDS:
+            continue
+        out.append(stem(tok) if not tok.isdigit() else tok)
+    return out
+
+
+def _doc_terms(row: dict) -> list[str]:
+    terms = tokenize(row.get("titel")) * TITEL_BOOST
+    for col in ("drucksache", "thema", "fraktion", "einreicher", "inhalt"):
+        terms += tokenize(row.get(col))
+    return terms
+
+
+def _matches(meta: dict, typ=None, status=None, einreicher=None, von=None, bis=None) -> bool:
+    if typ and meta.get("typ") not in typ:
+        return False
+    if status and meta.get("status") not in status:
+        return False
+    if einreicher and meta.get("einreicher") not in einreicher:
+        return False
+    d = str(meta.get("datum") or "")[:10]
+    if von and (not d or d < str(von)[:10]):
+        return False
+    if bis and (not d or d > str(bis)[:10]):
+        return False
+    return True
+
+
+class BM25Index:
+    """Invertierter Index mit BM25; thread-sicher über ein Lock (Suchen dauern Millisekunden)."""
+
+    def __init__(self, path: str | None = None, k1: float = 1.5, b: float = 0.75):
+        if np is None:
+            raise RuntimeError("numpy fehlt → pip install numpy")
+        self.path = path
+        self.k1, self.b = k1, b
+        self._clear()
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()       # nie zwei Syncs gleichzeitig (doppelte Slots)
+
+    def _clear(self):
+        self.terms: dict[str, tuple] = {}        # term → (array('I') slots, array('H') tf)
+        self.slots: list = []                    # Slot → Meta-Dict oder None (gelöscht)
+        self.lens = array("I")                   # Slot → Dokumentlänge (Terme)
+        self.pos: dict[str, int] = {}            # id → aktueller Slot
+        self.total_len = 0
+        self.watermark = [None, None]            # (updated_at, id)
+
+    # ---------- Status ----------
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.pos)
+
+    def __len__(self):
+        return len(self.pos)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        dead = len(self.slots) - len(self.pos)
+        return bool(self.slots) and dead / len(self.slots) > MAX_DEAD_RATIO
+
+    # ---------- Pflege ----------
+
+    def _remove(self, doc_id: str):
+        slot = self.pos.pop(doc_id, None)
+        if slot is not None:
+            self.slots[slot] = None              # Postings bleiben, werden beim Suchen übersprungen
+            self.total_len -= self.lens[slot]
+
+    def add(self, row: dict):
+        """Vorgang (neu oder geändert) indexieren."""
+        doc_id = str(row["id"])
+        counts: dict[str, int] = {}
+        for t in _doc_terms(row):
+            counts[t] = counts.get(t, 0) + 1
+        with self._lock:
+            self._remove(doc_id)
+            slot = len(self.slots)
+            self.slots.append({c: (doc_id if c == "id" else row.get(c)) for c in META_COLUMNS}
+                              | {"vorschau": (row.get("vorschau") or (row.get("inhalt") or "")[:220]),
+                                 "updated_at": row.get("updated_at")})
+            length = sum(counts.values())
+            self.lens.append(length)
+            self.total_len += length
+            self.pos[doc_id] = slot
+            for t, tf in counts.items():
+                post = self.terms.get(t)
+                if post is None:
+                    post = self.terms[t] = (array("I"), array("H"))
+                post[0].append(slot)
+                post[1].append(min(tf, 65535))
+
+    def _known(self, row: dict) -> bool:
+        """Schon mit diesem updated_at indexiert? (Nachlauf des Aufrufers → kein neuer Slot)"""
+        with self._lock:
+            slot = self.pos.get(str(row["id"]))
+            return slot is not None and self.slots[slot].get("updated_at") == row.get("updated_at")
+
+    def sync(self, fetch_page, page_size: int = 200, full: bool = False) -> int:
+        """
+        Änderungen seit dem Wasserstand einpflegen.
+        fetch_page(seit, nach_id, anzahl) → Vorgänge inkl. inhalt + updated_at.
+        Rückgabe: Anzahl neu indexierter Vorgänge.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if full:
+                    self._clear()
+                watermark = list(self.watermark)
+            n = 0
+            while True:
+                page = fetch_page(watermark[0], watermark[1], page_size) or []
+                for row in page:
+                    if not self._known(row):
+                        self.add(row)
+                        n += 1
+                if page:
+                    watermark = [page[-1]["updated_at"], str(page[-1]["id"])]
+                if len(page) < page_size:
+                    break
+            with self._lock:
+                self.watermark = watermark
+            return n
+
+    # ---------- Persistenz ----------
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            state = {k: getattr(self, k) for k in ("terms", "slots", "lens", "pos", "total_len", "watermark")}
+            with open(self.path + ".tmp", "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        with self._lock:
+            for k, v in state.items():
+                setattr(self, k, v)
+        return True
+
+    # ---------- Suche ----------
+
+    def search(self, query: str, k: int = 100, **filters) -> list[dict]:
+        """
+        BM25-Rangliste für `query`, gefiltert (typ/status/einreicher als Listen, von/bis ISO).
+        Rückgabe: Meta-Dicts inkl. "bm25", absteigend.
+        """
+        qterms = list(dict.fromkeys(tokenize(query)))
+        if not qterms:
+            return []
+        with self._lock:
+            n_docs = len(self.pos)
+            if not n_docs:
+                return []
+            n_slots = len(self.slots)
+            avgdl = self.total_len / n_docs or 1.0
+            lens = np.frombuffer(self.lens, dtype=np.uint32)[:n_slots].astype(np.float32)
+            scores = np.zeros(n_slots, dtype=np.float32)
+            for t in qterms:
+                post = self.terms.get(t)
+                if not post:
+                    continue
+                slots = np.array(post[0], dtype=np.int64)
+                tf = np.array(post[1], dtype=np.float32)
+                df = len(slots)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lens[slots] / avgdl)
+                scores[slots] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+            del lens
+
+            cand = np.flatnonzero(scores)
+            cand = cand[np.argsort(-scores[cand])]
+            out = []
+            for slot in cand:
+                meta = self.slots[slot]
+                if meta is None or not _matches(meta, **filters):
+                    continue
+                out.append({**meta, "bm25": float(scores[slot])})
+                if len(out) >= k:
+                    break
+            return out
+
+
+def rrf_fuse(*rankings: list[dict], k: int = 60, key: str = "id") -> list[dict]:
+    """
+    Reciprocal Rank Fusion: score = Σ 1 / (k + Rang) über alle Ranglisten.
+    Zeilen werden per `key` zusammengeführt (erste Fundstelle liefert die Meta-Daten).
+    """
+    scores: dict = {}
+    rows: dict = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            doc_id = str(row[key])
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            rows.setdefault(doc_id, {}).update({kk: v for kk, v in row.items() if v is not None})
+    order = sorted(scores, key=scores.get, reverse=True)
+    return [{**rows[d], "rrf": scores[d]} for d in order]
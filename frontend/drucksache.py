@@ -0,0 +1,22 @@
+# ============================================================
+#  Drucksache-Nummern in der Suchzeile erkennen
+#   Eingabe wie "0246/XXI" (Muster aus extractor.guess_drucksache) →
+#   exakte Varianten (mit/ohne führende Nullen) + Präfix für die
+#   indizierte Spalte drucksache. Alles andere ist keine Drucksache.
+#
+#  Nur stdlib.
+# ============================================================
+
+import re
+
+DRUCKSACHE_RE = re.compile(r"^\s*(\d{3,4})\s*/\s*([XVI]{2,4})\s*$", re.IGNORECASE)
+
+
+def drucksache_query(q: str | None) -> tuple[list[str], str] | None:
+    """("0246/XXI") → (exakte Varianten, Präfix) oder None, wenn q keine Drucksache ist."""
+    m = DRUCKSACHE_RE.match(q or "")
+    if not m:
+        return None
+    nr, wp = m.group(1), m.group(2).upper()
+    variants = list(dict.fromkeys([f"{nr}/{wp}", f"{nr.zfill(4)}/{wp}", f"{nr.lstrip('0') or '0'}/{wp}"]))
+    return variants, f"{nr.zfill(4)}/{wp}"
@@ -0,0 +1,16 @@
+# ============================================================
+#  CSV-Zellen für den Daten-Export
+#   Zellen mit = + - @ (oder Tab/CR) am Anfang würden Excel/LibreOffice
+#   als Formel lesen (CSV-/Formel-Injektion) → mit ' als Text markieren.
+#
+#  Nur stdlib.
+# ============================================================
+
+CSV_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def csv_cell(value):
+    """Zelle, die Excel/LibreOffice als Formel lesen würde → mit ' als Text markieren."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA):
+        return "'" + value
+    return value
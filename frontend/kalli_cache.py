@@ -0,0 +1,309 @@
+# ============================================================
+#  Caches für das BVV-Frontend
+#   – TTLCache: größenbegrenzter LRU mit Ablaufzeit + Hit/Miss-Zähler
+#   – Registry: alle datenabhängigen Caches bei neuem Datenstand leeren
+#     (im SharedStore zusätzlich je Datenstand getrennt abgelegt)
+#   – SharedStore: optionale zweite Ebene in einer SQLite-Datei, damit
+#     mehrere Frontend-Prozesse (KALLI_WORKERS) Treffer teilen
+#   – SingleFlight: gleichzeitige identische Aufrufe teilen sich EINE
+#     laufende Berechnung (geteilter Such-Link → 1 Query statt 50)
+#
+#  Bewusst ohne externe Abhängigkeiten (nur stdlib), thread-sicher,
+#  weil Gradio Handler parallel in Worker-Threads ausführt.
+# ============================================================
+
+import asyncio
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+# Caches + Callbacks, die bei neuem Datenstand (Ingestion) geleert/aufgerufen werden
+_REGISTRY: list = []
+_CALLBACKS: list = []
+# Datenstand (ingest_version), unter dem registrierte Caches im SharedStore ablegen:
+# ein Prozess, der den neuen Stand noch nicht kennt, schreibt unter dem alten
+# Namensraum – Prozesse mit neuem Stand lesen das nie.
+_GENERATION = {"v": None}
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Request-Coalescing: pro Key läuft höchstens eine Berechnung, alle anderen warten darauf."""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.coalesced = 0                 # Aufrufe, die sich angehängt haben
+        self._calls: dict = {}             # key → _Call (Threads)
+        self._tasks: dict = {}             # key → asyncio.Task (Coroutinen)
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """fn() ausführen – oder auf den gleichen, schon laufenden Aufruf warten (auch dessen Fehler)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def ado(self, key, coro_fn):
+        """Async-Variante: coro_fn() läuft einmal als Task; abbrechende Wartende brechen ihn nicht ab."""
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(coro_fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda t: self._tasks.pop(key, None))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class SharedStore:
+    """
+    Prozessübergreifender Key-Value-Speicher mit Ablaufzeit (SQLite, WAL).
+    Keys werden als JSON, Werte per pickle abgelegt. Nur für eigene Daten –
+    pickle aus fremden Quellen wäre unsicher.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("create table if not exists cache ("
+                     " ns text, key text, expires real, value blob, primary key (ns, key))")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = off")     # Cache: Verlust beim Absturz egal
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(key) -> str:
+        return json.dumps(key, default=str, ensure_ascii=False)
+
+    def get(self, ns: str, key):
+        """(Restlaufzeit, Wert) oder None."""
+        try:
+            row = self._conn().execute("select expires, value from cache where ns = ? and key = ?",
+                                       (ns, self._key(key))).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] < time.time():
+            return None
+        return row[0] - time.time(), pickle.loads(row[1])
+
+    def set(self, ns: str, key, value, ttl: float):
+        try:
+            self._conn().execute("insert or replace into cache values (?, ?, ?, ?)",
+                                 (ns, self._key(key), time.time() + ttl, pickle.dumps(value)))
+        except sqlite3.Error:
+            pass                                         # gesperrt/voll → nur lokal cachen
+
+    def clear(self, ns: str):
+        """Namensraum leeren, inkl. aller Datenstände "ns@…"."""
+        try:
+            self._conn().execute("delete from cache where ns = ? or ns like ?", (ns, ns + "@%"))
+        except sqlite3.Error:
+            pass
+
+    def purge(self):
+        """Abgelaufene Einträge entfernen (gelegentlich aufrufen)."""
+        try:
+            self._conn().execute("delete from cache where expires < ?", (time.time(),))
+        except sqlite3.Error:
+            pass
+
+
+class TTLCache:
+    """LRU-Cache mit max. Größe und Ablaufzeit je Eintrag (Sekunden); optional mit SharedStore dahinter."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0, name: str = "",
+                 shared: SharedStore | None = None, on_evict=None):
+        """on_evict(wert): für Einträge, die der Cache selbst verwirft (LRU, Ablauf, Ersetzen, clear)."""
+        self.maxsize = max(1, int(maxsize))
+        self.on_evict = on_evict
+        self.ttl = float(ttl)
+        self.name = name
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()   # key -> (ablauf, wert)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight(name)
+        self.versioned = False                    # register() → Namensraum je Datenstand
+
+    def _ns(self) -> str:
+        return f"{self.name}@{_GENERATION['v']}" if self.versioned else self.name
+
+    def _evicted(self, values):
+        if self.on_evict is None:
+            return
+        for value in values:
+            try:
+                self.on_evict(value)
+            except Exception as e:
+                print(f"[!] Cache {self.name}: on_evict fehlgeschlagen: {e}")
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[0] >= now:
+                self._data.move_to_end(key)      # zuletzt benutzt → hinten
+                self.hits += 1
+                return item[1]
+            if item is not _MISSING:
+                del self._data[key]              # abgelaufen
+        if item is not _MISSING:
+            self._evicted([item[1]])
+        if self.shared is not None:
+            found = self.shared.get(self._ns(), key)
+            if found is not None:
+                remaining, value = found
+                self._set_local(key, value, remaining)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _set_local(self, key, value, ttl: float):
+        dropped = []
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None and old[1] is not value:
+                dropped.append(old[1])
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                dropped.append(self._data.popitem(last=False)[1][1])   # ältesten Eintrag verwerfen
+        self._evicted(dropped)
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._set_local(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(self._ns(), key, value, ttl)
+
+    def get_or_set(self, key, fn, ttl: float | None = None):
+        """
+        Wert aus dem Cache oder fn() berechnen und ablegen (fn läuft ohne Lock).
+        Gleichzeitige Misses auf denselben Key rechnen nur einmal (SingleFlight).
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            def _compute():
+                value = fn()
+                self.set(key, value, ttl)
+                return value
+            value = self._flight.do(key, _compute)
+        return value
+
+    async def aget_or_set(self, key, coro_fn, ttl: float | None = None):
+        """Async-Variante von get_or_set: coro_fn() wird bei Miss einmal (geteilt) awaited."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            async def _compute():
+                value = await coro_fn()
+                self.set(key, value, ttl)
+                return value
+            value = await self._flight.ado(key, _compute)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            dropped = [item[1] for item in self._data.values()]
+            self._data.clear()
+        self._evicted(dropped)
+        if self.shared is not None:
+            self.shared.clear(self.name)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "coalesced": self._flight.coalesced,
+            "shared": self.shared is not None,
+        }
+
+
+def register(cache):
+    """Cache hängt vom Datenstand ab → wird von invalidate_all() geleert, geteilt nur je Datenstand."""
+    _REGISTRY.append(cache)
+    if hasattr(cache, "versioned"):
+        cache.versioned = True
+    return cache
+
+
+def set_generation(version):
+    """Aktuellen Datenstand setzen (Namensraum der geteilten Einträge registrierter Caches)."""
+    _GENERATION["v"] = version
+
+
+def on_invalidate(fn):
+    """Callback bei neuem Datenstand (z. B. lokale Indizes nachziehen). Als Decorator nutzbar."""
+    _CALLBACKS.append(fn)
+    return fn
+
+
+def invalidate_all(version=_MISSING):
+    """Alles Datenabhängige leeren; mit `version` zuerst auf den neuen Datenstand umschalten."""
+    if version is not _MISSING:
+        set_generation(version)
+    for cache in _REGISTRY:
+        cache.clear()
+    for fn in _CALLBACKS:
+        try:
+            fn()
+        except Exception as e:
+            print(f"[!] Invalidate-Callback {getattr(fn, '__name__', fn)} fehlgeschlagen: {e}")
@@ -1,5 +1,26 @@
 # ============================================================
 #  BVV-Frontend 
+#   v3.8 (Daten-Export CSV/JSONL, gestreamt über Keyset-Blöcke)
+#   v3.7 (PDF-Export: blockweise gelesen, seitenweise geschrieben, im Worker-Thread)
+#   v3.6 (vorberechneter kNN-Graph für Ähnliche Vorgänge / Siehe auch)
+#   v3.5 (Ähnliche Vorgänge aus gespeicherten Vektoren, ohne Embedding)
+#   v3.4 (Typeahead-Vorschläge aus lokalem Präfix-Index)
+#   v3.3 (Schnellpfad für Drucksache-Nummern)
+#   v3.2 (Facetten-Zahlen in einem Query, Auswahllisten aus den Daten)
+#   v3.1 (Single-Flight: gleichzeitige identische Suchen teilen einen Aufruf)
+#   v3.0 (semantischer Ergebnis-Cache mit Ähnlichkeits-Schwelle)
+#   v2.9 (semantisches Blättern über gecachte Kandidatenliste)
+#   v2.8 (Prefetch der nächsten Seite pro Session)
+#   v2.7 (gepuffertes Zugriffslog: Batches im Hintergrund, Flush beim Beenden)
+#   v2.6 (schlanke Listen: nur Render-Spalten + vorschau, Detail-Tab lädt Volltext)
+#   v2.5 (Queue/Concurrency-Limits je Event-Gruppe, Multi-Worker mit geteiltem Cache)
+#   v2.4 (async Handler: AsyncOpenAI, Liste + Anzahl parallel, Log im Hintergrund)
+#   v2.3 (optionales SQLite-Replikat für Liste/Anzahl/Detail)
+#   v2.2 (Hybrid-Suche: lokaler BM25-Index + Vektor, Reciprocal Rank Fusion)
+#   v2.1 (optionaler lokaler Vektor-Index für die semantische Suche)
+#   v2.0 (Keyset-Paging über Cursor, Anzahl optional/geschätzt)
+#   v1.9 (Ergebnis-Cache für Liste/Anzahl, Invalidierung über Datenstand)
+#   v1.8 (Embedding-Cache für Suchanfragen)
 #   v1.7 (Filter Einreicher)
 #   v1.6 (weitere Filter)
 #   v1.5 (bereinigte SQL-Views)
@@ -23,22 +44,43 @@
 # =============================
 
 import os
-from datetime import datetime
+import re
+import csv
+import json
+import time
+import sys
+import atexit
+import asyncio
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
 import gradio as gr
 
+import kalli_cache
+from kalli_cache import TTLCache, SingleFlight
+from kalli_log import BufferedLogger
+from semantic_cache import SemanticCache
+from pdf_stream import StreamingPDF
+from drucksache import drucksache_query as _drucksache_query
+from export_csv import csv_cell as _csv_cell
+from keyset import encode_cursor as _encode_cursor, decode_cursor as _decode_cursor, apply_cursor as _apply_cursor, apply_order
+
 # --- oben bei den Imports: genau einmal laden ---
 from dotenv import load_dotenv
 load_dotenv()
 
 from supabase import create_client, Client
 from urllib.parse import urlparse # DPF-Download der Drucksachen
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # kein KeyError bei leerer .env
 openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+# Async-Client für die Handler: wartet auf OpenAI, ohne einen Worker-Thread zu blockieren
+openai_async = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
 
 APP_TITLE = "BVV – Vorgänge (Suche & Übersicht)"
-__APP_VERSION__ = "Version 1.7"
+__APP_VERSION__ = "Version 3.8"
 LOGO_PATH = os.environ.get("KALLI_LOGO_PATH", "assets/logo_160_80.png")
 PAGE_SIZE = 10
 MIN_LEN = 2         # mind. Länge Suchstring
@@ -52,6 +94,27 @@ SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_SERVICE_ROL
 
 sb: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# ----- Serving: Queue, Concurrency, Worker -----
+# Gradio-Default ist 1 gleichzeitiger Lauf pro Event → eine langsame semantische
+# Suche blockiert alle. Deshalb zwei Gruppen mit eigenen Limits:
+#   "filter"   – klassische Suche/Blättern (billig, viele parallel)
+#   "semantik" – Embedding + Vektor/Hybrid (teuer, OpenAI-Rate-Limit)
+QUEUE_MAX = int(os.getenv("KALLI_QUEUE_MAX", "64"))                   # wartende Events, danach "Server voll"
+DEFAULT_CONCURRENCY = int(os.getenv("KALLI_DEFAULT_CONCURRENCY", "4"))
+FILTER_CONCURRENCY = int(os.getenv("KALLI_FILTER_CONCURRENCY", "8"))
+SEM_CONCURRENCY = int(os.getenv("KALLI_SEM_CONCURRENCY", "2"))
+# Mehrere Prozesse (je eigener Port ab PORT, davor ein Load Balancer mit Sticky Sessions,
+# z. B. nginx ip_hash – die Gradio-Queue lebt im Prozess). Caches teilen sich dann
+# eine SQLite-Datei (kalli_cache.SharedStore).
+WORKERS = int(os.getenv("KALLI_WORKERS", "1"))
+WORKER_INDEX = int(os.getenv("KALLI_WORKER_INDEX", "0"))
+SHARED_CACHE = None
+if WORKERS > 1 or os.getenv("KALLI_SHARED_CACHE"):
+    try:
+        SHARED_CACHE = kalli_cache.SharedStore(os.getenv("KALLI_SHARED_CACHE", "data/kalli_cache.sqlite"))
+    except Exception as e:
+        print(f"[!] Gemeinsamer Cache nicht verfügbar: {e}")
+
 # =============================
 # BLOCK 2 — CSS
 # =============================
@@ -96,6 +159,78 @@ def _can_search(q, typ, einreicher, status, von, bis) -> bool:
     return _has_any_filter(typ, status, von, bis, einreicher)
 
 
+# kalli_status: aktives Embedding-Modell (migrate_embeddings.py) + Datenstand (sql/02_ingest_version.sql)
+# Query-Vektoren MÜSSEN zum Modell der gespeicherten Vektoren passen.
+EMB_DEFAULT_MODEL = "text-embedding-3-small"
+KALLI_STATUS_TTL = float(os.getenv("KALLI_STATUS_TTL", "30"))   # Sekunden – so schnell folgt das Frontend
+_KALLI_STATUS = {"row": {}, "ts": 0.0, "version": None}
+_WATCHER = {"started": False}
+_WATCHER_LOCK = threading.Lock()
+
+def _refresh_kalli_status():
+    """Netz-Abfrage – nur im Watcher-Thread, nie im Request-Pfad (blockiert sonst den Event-Loop)."""
+    try:
+        rows = sb.table("kalli_status").select("*").eq("id", 1).limit(1).execute().data or []
+        if rows:
+            _KALLI_STATUS["row"] = rows[0]
+        _KALLI_STATUS["ts"] = time.monotonic()
+    except Exception:
+        pass  # Tabelle fehlt / Netz weg → letzten bekannten Stand behalten
+
+def _kalli_status() -> dict:
+    """Zuletzt gelesener Stand (vom Watcher aktualisiert); bis zum ersten Lauf leer → Defaults."""
+    _ensure_watcher()
+    return _KALLI_STATUS["row"]
+
+def _embedding_model() -> tuple[str, int | None]:
+    row = _kalli_status()
+    return row.get("emb_model") or EMB_DEFAULT_MODEL, row.get("emb_dims")
+
+def _check_data_version():
+    """Neuer Datenstand seit dem letzten Blick? → alle datenabhängigen Caches leeren."""
+    _refresh_kalli_status()
+    version = _KALLI_STATUS["row"].get("ingest_version")
+    if version is None:
+        return
+    if _KALLI_STATUS["version"] is not None and version != _KALLI_STATUS["version"]:
+        print(f"[i] Datenstand {_KALLI_STATUS['version']} → {version}: Caches werden geleert")
+        kalli_cache.invalidate_all(version)
+    elif _KALLI_STATUS["version"] is None:
+        kalli_cache.set_generation(version)           # erster Blick: Namensraum im SharedStore
+    _KALLI_STATUS["version"] = version
+
+def _watch_data_version():
+    """Hintergrund-Thread: Datenstand pollen, damit der Request-Pfad nie wartet."""
+    while True:
+        _check_data_version()
+        time.sleep(KALLI_STATUS_TTL)
+
+def _ensure_watcher():
+    """Watcher genau einmal starten (auch wenn das Modul ohne __main__ läuft, z. B. importiert)."""
+    if _WATCHER["started"]:
+        return
+    with _WATCHER_LOCK:
+        if not _WATCHER["started"]:
+            _WATCHER["started"] = True
+            threading.Thread(target=_watch_data_version, name="kalli-status", daemon=True).start()
+
+
+# Fallback-Query, wenn nur Filter gesetzt sind (wird beim Start vorgewärmt)
+FALLBACK_QUERY = "BVV Berlin Vorgänge allgemein"
+
+# Query-Embeddings cachen: gleiche Suche → kein OpenAI-Roundtrip (~300 ms)
+EMB_CACHE = TTLCache(
+    maxsize=int(os.getenv("KALLI_EMB_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("KALLI_EMB_CACHE_TTL", str(24 * 3600))),
+    name="embeddings",
+    shared=SHARED_CACHE,
+)
+
+def _normalize_query(text: str) -> str:
+    """Cache-Key: Groß/klein + Mehrfach-Leerzeichen egal."""
+    return re.sub(r"\s+", " ", (text or "").strip()).casefold()
+
+
 # semantische Suche
 def _embed_query(text: str) -> list[float]:
     txt = (text or "").strip()  #leere Eingaben abgefangen
@@ -103,114 +238,490 @@ def _embed_query(text: str) -> list[float]:
         return []
     if not openai_client:
         raise RuntimeError("OPENAI_API_KEY fehlt – Embedding nicht möglich.")
-    resp = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=txt
-    )
-    return resp.data[0].embedding  #Liste von 1536 Gleitkommazahlen (float)
+    model, dims = _embedding_model()
+    key = (_normalize_query(txt), model, dims)
+
+    def _create():
+        resp = openai_client.embeddings.create(
+            model=model,
+            input=txt,
+            **({"dimensions": dims} if dims else {}),
+        )
+        return resp.data[0].embedding  #Liste von Gleitkommazahlen (float), 1536 bei -3-small
 
-def do_search_sem_db(q, typ, einreicher, status, von, bis, page, sort):
+    # Cache + Coalescing: gleiche Anfrage parallel → ein OpenAI-Call
+    return EMB_CACHE.get_or_set(key, _create)
+
+
+async def _aembed_query(text: str) -> list[float]:
+    """Wie _embed_query, aber über AsyncOpenAI (gleicher Cache)."""
+    txt = (text or "").strip()
+    if not txt:
+        return []
+    if not openai_async:
+        raise RuntimeError("OPENAI_API_KEY fehlt – Embedding nicht möglich.")
+    model, dims = _embedding_model()
+    key = (_normalize_query(txt), model, dims)
+
+    async def _create():
+        resp = await openai_async.embeddings.create(
+            model=model,
+            input=txt,
+            **({"dimensions": dims} if dims else {}),
+        )
+        return resp.data[0].embedding
+
+    return await EMB_CACHE.aget_or_set(key, _create)
+
+
+def _prewarm_embeddings():
+    """Fallback-Query beim Start embedden, damit die erste Filter-Suche nicht wartet."""
+    try:
+        _embed_query(FALLBACK_QUERY)
+    except Exception as e:
+        print(f"[!] Prewarm Embedding fehlgeschlagen: {e}")
+
+
+SEM_THRESHOLD = 0.3
+
+# --- Lokale Spiegel (Vektor-Index, BM25, SQLite-Replikat, Typeahead) ---
+# Alle ziehen über einen Wasserstand (updated_at, id) nach: beim Start und bei
+# neuem Datenstand (on_invalidate), je Spiegel ein Hintergrund-Thread.
+# Löschungen sieht der Wasserstand nicht: hat ein Spiegel mehr Einträge als die
+# Quelltabelle, wird er neu aufgebaut. Gezählt (count="exact") wird je Durchlauf
+# einmal pro Tabelle, nicht je Spiegel.
+# updated_at stempelt now() = Transaktionsbeginn: eine lange Transaktion (Bulk-Load)
+# kann nach dem Wasserstand committen, ihre Zeilen liegen dann "davor". Deshalb
+# beginnt jeder Abgleich SYNC_LAG_S vor dem Wasserstand; schon bekannte Zeilen
+# mit gleichem Stempel überspringen die Indizes.
+_MIRRORS: list[tuple] = []      # (name, obj, fetch, count_table, sync_opts)
+SYNC_LAG_S = float(os.getenv("KALLI_SYNC_LAG_S", "900"))
+
+def _with_lag(fetch):
+    """fetch_page-Hülle: erster Aufruf je Abgleich ab (Wasserstand − SYNC_LAG_S)."""
+    first = [True]
+    def fetch_page(seit, nach_id, anzahl):
+        if first[0] and seit and SYNC_LAG_S > 0:
+            try:
+                ts = datetime.fromisoformat(str(seit).replace("Z", "+00:00"))
+                seit, nach_id = (ts - timedelta(seconds=SYNC_LAG_S)).isoformat(), None
+            except ValueError:
+                pass
+        first[0] = False
+        return fetch(seit, nach_id, anzahl)
+    return fetch_page
+
+def _register_mirror(name: str, obj, fetch, count_table: str, sync_opts=dict):
+    """Spiegel anmelden; sync_opts() → zusätzliche Argumente für obj.sync (je Lauf neu gelesen)."""
+    if obj is not None:
+        _MIRRORS.append((name, obj, fetch, count_table, sync_opts))
+
+def _remote_count(table: str, counts: dict, lock: threading.Lock):
+    with lock:
+        if table not in counts:
+            try:
+                counts[table] = sb.table(table).select("id", count="exact").limit(1).execute().count
+            except Exception:
+                counts[table] = None
+        return counts[table]
+
+def _sync_mirror(name, obj, fetch, count_table, sync_opts, counts, lock, full: bool = False):
+    """Einen Spiegel inkrementell nachziehen (bzw. neu aufbauen). Läuft im Hintergrund-Thread."""
+    try:
+        n = obj.sync(_with_lag(fetch), full=full, **sync_opts())
+    except Exception as e:
+        print(f"[!] {name} Sync fehlgeschlagen: {e}")
+        return
+    if not full:
+        remote = _remote_count(count_table, counts, lock)
+        # needs_rebuild: BM25 mit vielen ersetzten Slots
+        if (remote is not None and len(obj) > remote) or getattr(obj, "needs_rebuild", False):
+            return _sync_mirror(name, obj, fetch, count_table, sync_opts, counts, lock, full=True)
+    if (n or full) and hasattr(obj, "save"):
+        try:
+            obj.save()
+        except Exception as e:
+            print(f"[!] {name} speichern fehlgeschlagen: {e}")
+    print(f"[i] {name}: {n} neu/geändert, {len(obj)} gesamt")
+
+def _sync_mirrors(full: bool = False):
+    """Alle Spiegel parallel nachziehen; die Zählungen teilen sie sich."""
+    counts, lock = {}, threading.Lock()
+    for m in _MIRRORS:
+        threading.Thread(target=_sync_mirror, args=(*m, counts, lock, full), daemon=True).start()
+
+@kalli_cache.on_invalidate
+def _mirrors_on_new_data():
+    _sync_mirrors()
+
+
+# --- Lokaler Vektor-Index (optional, KALLI_LOCAL_INDEX=1) ---
+# Hält alle Vektoren im RAM (vektor_index.py) → semantische Suche ohne Supabase-RPC.
+LOCAL_INDEX = None
+if os.getenv("KALLI_LOCAL_INDEX", "0") == "1":
+    try:
+        from vektor_index import VektorIndex
+        LOCAL_INDEX = VektorIndex(os.getenv("KALLI_INDEX_DIR", "data/vektor_index"),
+                                  dtype=os.getenv("KALLI_INDEX_DTYPE", "float32"))
+        LOCAL_INDEX.load()
+    except Exception as e:
+        print(f"[!] Lokaler Vektor-Index nicht verfügbar: {e}")
+        LOCAL_INDEX = None
+
+def _index_model_key() -> str:
+    model, dims = _embedding_model()
+    return f"{model}:{dims or ''}"
+
+def _fetch_vektoren(seit, nach_id, anzahl):
+    return sb.rpc("vektoren_seit", {"seit": seit, "nach_id": nach_id, "anzahl": anzahl}).execute().data or []
+
+_register_mirror("Vektor-Index", LOCAL_INDEX, _fetch_vektoren, "vorgang_embeddings",
+                 lambda: {"model": _index_model_key()})
+
+def _local_index_usable() -> bool:
+    return LOCAL_INDEX is not None and LOCAL_INDEX.ready and LOCAL_INDEX.model == _index_model_key()
+
+# Ergebnis-Cache vor den Vektor-Suchen: gleiche Filter + ähnlicher Query-Vektor
+# (Cosinus ≥ KALLI_SEM_CACHE_SIM) → gecachte Rangliste statt neuem Scan.
+SEM_RESULTS = kalli_cache.register(SemanticCache(
+    maxsize=int(os.getenv("KALLI_SEM_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("KALLI_SEM_CACHE_TTL", "1800")),
+    threshold=float(os.getenv("KALLI_SEM_CACHE_SIM", "0.95")),
+    name="sem_ergebnisse",
+))
+
+SEM_FLIGHT = SingleFlight("semantik")      # identische Vektor-Suchen gleichzeitig → ein RPC
+
+def _sem_cached(kind: str, q_vec, limit: int, filters: dict, fn):
+    sig = (kind, limit, _index_model_key()) + _filter_key("", filters.get("typ"), filters.get("einreicher"),
+                                                           filters.get("status"), filters.get("von"), filters.get("bis"))
+    rows = SEM_RESULTS.lookup(sig, q_vec)
+    if rows is None:
+        def _compute():
+            rows = fn()
+            SEM_RESULTS.add(sig, q_vec, rows)
+            return rows
+        rows = SEM_FLIGHT.do(sig + (tuple(q_vec),), _compute)
+    return rows
+
+def match_dokumente(q_vec: list[float], *, limit: int, typ=None, einreicher=None, status=None,
+                    von=None, bis=None, full_text: bool = False) -> list[dict]:
+    """
+    EIN Roundtrip: Similarity + alle Filter laufen in match_bvv_dokumente
+    (sql/03_match_bvv_dokumente_filter.sql), Ergebnis ist nach Similarity sortiert
+    und enthält nur die Render-Spalten (vorschau statt inhalt).
+    Mit lokalem Index: Antwort direkt aus dem RAM, kein Netz-Roundtrip.
+    Ähnliche Anfrage mit gleichen Filtern schon gesehen → Rangliste aus SEM_RESULTS.
+    """
+    filters = dict(typ=typ, einreicher=einreicher, status=status, von=von, bis=bis)
+    return _sem_cached("dok" + ("+text" if full_text else ""), q_vec, limit, filters,
+                       lambda: _match_dokumente(q_vec, limit=limit, full_text=full_text, **filters))
+
+def _match_dokumente(q_vec, *, limit, typ, einreicher, status, von, bis, full_text):
+    if not full_text and _local_index_usable():
+        return LOCAL_INDEX.search(
+            q_vec, k=limit, threshold=SEM_THRESHOLD,
+            typ=_as_list_or_none(typ), status=_as_list_or_none(status),
+            einreicher=_as_list_or_none(einreicher), von=von or None, bis=bis or None,
+        )
+    rpc = sb.rpc("match_bvv_dokumente", {
+        "query_embedding": q_vec,
+        "match_count": limit,
+        "match_threshold": SEM_THRESHOLD,
+        "typ_filter": _as_list_or_none(typ),
+        "status_filter": _as_list_or_none(status),
+        "einreicher_filter": _as_list_or_none(einreicher),
+        "von": von or None,
+        "bis": bis or None,
+        "published_only": False,
+        "full_text": full_text,
+    }).execute()
+    return rpc.data or []
+
+
+# --- Semantisches Blättern ---
+# Erste Anfrage: Embedding + EIN Vektor-Scan → Rangliste (id, similarity) der Top-N
+# plus Render-Zeilen der ersten Seite, gecached pro Session + Suche. Jede weitere
+# Seite lädt danach nur die Render-Spalten ihrer IDs.
+SEM_CANDIDATES_N = int(os.getenv("KALLI_SEM_CANDIDATES", "200"))
+SEM_CANDIDATES = kalli_cache.register(TTLCache(      # (session, key) → [{"id", "similarity"}]
+    maxsize=512, ttl=float(os.getenv("KALLI_SEM_CANDIDATES_TTL", "1800")), name="sem_kandidaten"))
+
+def match_kandidaten(q_vec: list[float], *, limit: int, seite: int = 0, typ=None, einreicher=None,
+                     status=None, von=None, bis=None) -> list[dict]:
+    """
+    Rangliste nur als (id, similarity) – match_bvv_kandidaten (sql/07) oder lokaler Index.
+    seite > 0: die ersten `seite` Einträge bringen ihre Render-Zeile gleich mit ("zeile",
+    match_bvv_kandidaten_seite, sql/13) → Seite 1 ohne zweiten Roundtrip.
+    """
+    filters = dict(typ=typ, einreicher=einreicher, status=status, von=von, bis=bis)
+    return _sem_cached(f"ids+{seite}" if seite else "ids", q_vec, limit, filters,
+                       lambda: _match_kandidaten(q_vec, limit=limit, seite=seite, **filters))
+
+def _match_kandidaten(q_vec, *, limit, seite, typ, einreicher, status, von, bis):
+    if _local_index_usable():
+        rows = LOCAL_INDEX.search(
+            q_vec, k=limit, threshold=SEM_THRESHOLD,
+            typ=_as_list_or_none(typ), status=_as_list_or_none(status),
+            einreicher=_as_list_or_none(einreicher), von=von or None, bis=bis or None,
+        )
+        return [{"id": r["id"], "similarity": r["similarity"], **({"zeile": r} if i < seite else {})}
+                for i, r in enumerate(rows)]
+    extra = {"seite_n": seite} if seite else {}
+    rpc = sb.rpc("match_bvv_kandidaten_seite" if seite else "match_bvv_kandidaten", {
+        **extra,
+        "query_embedding": q_vec,
+        "match_count": limit,
+        "match_threshold": SEM_THRESHOLD,
+        "typ_filter": _as_list_or_none(typ),
+        "status_filter": _as_list_or_none(status),
+        "einreicher_filter": _as_list_or_none(einreicher),
+        "von": von or None,
+        "bis": bis or None,
+        "published_only": False,
+    }).execute()
+    return rpc.data or []
+
+def rows_by_ids(ids: list) -> list[dict]:
+    """Render-Zeilen zu IDs in Ranglisten-Reihenfolge: lokaler Index → Replikat → Supabase."""
+    ids = [str(i) for i in ids]
+    if not ids:
+        return []
+    if _local_index_usable():
+        rows = [LOCAL_INDEX.row(i) for i in ids]
+        if all(rows):
+            return rows
+    if _replica_usable():
+        try:
+            rows = REPLICA.rows(ids)
+            if len(rows) == len(ids):
+                return rows
+        except Exception as e:
+            print(f"[!] Replikat-Zeilen fehlgeschlagen, nutze Supabase: {e}")
+    data = sb.table("bvv_dokumente").select(LIST_COLUMNS).in_("id", ids).execute().data or []
+    found = {str(r["id"]): r for r in data}
+    return [found[i] for i in ids if i in found]
+
+
+# --- Ähnliche Vorgänge ---
+# Anfrage ist der gespeicherte Vektor des Vorgangs (lokaler Index oder
+# aehnliche_vorgaenge(), sql/10) → kein Embedding-Aufruf.
+# Ohne Filter: vorberechneter kNN-Graph (vorgang_nachbarn, knn_nachbarn.py) → ein Index-Read.
+# Dessen k steht in kalli_status.knn_k (schreibt der Job) – kein eigener Wert im Frontend.
+AEHNLICH_N = int(os.getenv("KALLI_AEHNLICH_N", "10"))
+SIEHE_AUCH_N = 5
+AEHNLICH_CACHE = kalli_cache.register(TTLCache(
+    maxsize=512, ttl=float(os.getenv("KALLI_AEHNLICH_TTL", "1800")), name="aehnliche"))
+
+def aehnliche_vorgaenge(doc_id, *, limit: int = AEHNLICH_N, typ=None, einreicher=None, status=None,
+                        von=None, bis=None) -> list[dict]:
+    """Render-Zeilen inkl. "similarity" der nächsten Nachbarn von doc_id (ohne doc_id selbst)."""
+    key = (str(doc_id), limit) + _filter_key("", typ, einreicher, status, von, bis)
+    return AEHNLICH_CACHE.get_or_set(key, lambda: _aehnliche_db(
+        str(doc_id), limit=limit, typ=_as_list_or_none(typ), einreicher=_as_list_or_none(einreicher),
+        status=_as_list_or_none(status), von=von or None, bis=bis or None))
+
+def _knn_k() -> int:
+    """k des vorberechneten Graphen laut kalli_status (Watcher-Stand); 0 = noch kein Graph."""
+    try:
+        return int(_kalli_status().get("knn_k") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _aehnliche_db(doc_id, *, limit, typ, einreicher, status, von, bis):
+    filters = dict(typ=typ, status=status, einreicher=einreicher, von=von, bis=bis)
+    if _local_index_usable():
+        vec = LOCAL_INDEX.vector(doc_id)
+        if vec is not None:
+            return LOCAL_INDEX.search(vec, k=limit, threshold=SEM_THRESHOLD, exclude=[doc_id], **filters)
+    if limit <= _knn_k() and not any(filters.values()):
+        try:
+            cands = (sb.table("vorgang_nachbarn").select("nachbar_id,similarity")
+                     .eq("id", doc_id).gt("similarity", SEM_THRESHOLD).order("rang").limit(limit)
+                     .execute().data or [])
+            if cands:
+                sim = {str(c["nachbar_id"]): c["similarity"] for c in cands}
+                return [{**r, "similarity": sim.get(str(r["id"]), 0.0)} for r in rows_by_ids(list(sim))]
+        except Exception as e:
+            print(f"[!] kNN-Graph nicht lesbar, nutze Vektor-Suche: {e}")
+    cands = sb.rpc("aehnliche_vorgaenge", {
+        "doc_id": doc_id,
+        "match_count": limit,
+        "match_threshold": SEM_THRESHOLD,
+        "typ_filter": typ,
+        "status_filter": status,
+        "einreicher_filter": einreicher,
+        "von": von,
+        "bis": bis,
+        "published_only": False,
+    }).execute().data or []
+    sim = {str(c["id"]): c["similarity"] for c in cands}
+    return [{**r, "similarity": sim.get(str(r["id"]), 0.0)} for r in rows_by_ids(list(sim))]
+
+
+def _sem_pager(q, typ, einreicher, status, von, bis) -> dict:
+    return {"mode": "sem", "key": _filter_key(q, typ, einreicher, status, von, bis) + ("sem",), "page": 1}
+
+
+async def _semantic_page(q, typ, einreicher, status, von, bis, pager: dict, session: str | None):
+    """Seite pager["page"] der semantischen Rangliste rendern → 6 Outputs inkl. Pager."""
+    cache_key = (session, pager["key"])
+    cands = SEM_CANDIDATES.get(cache_key)
+    if cands is None:
+        # --- Embedding erzeugen ---
+        try:
+            q_vec = await _aembed_query(q or FALLBACK_QUERY)
+        except Exception as e:
+            gr.Warning(f"Embedding fehlgeschlagen: {e}")
+            return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+        # --- RPC: Similarity + Typ/Status/Einreicher/Datum in einem Query → IDs + Zeilen der Seite 1 ---
+        try:
+            cands = await asyncio.to_thread(match_kandidaten, q_vec, limit=SEM_CANDIDATES_N,
+                                            seite=STATE["limit"], typ=typ, einreicher=einreicher,
+                                            status=status, von=von, bis=bis)
+        except Exception as e:
+            gr.Warning(f"Vektor-Suche fehlgeschlagen: {e}")
+            return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+        SEM_CANDIDATES.set(cache_key, cands)             # nur Erfolge cachen
+
+    limit = STATE["limit"]
+    total = len(cands)
+    page = max(1, min(int(pager.get("page") or 1), max(1, -(-total // limit))))
+    offset = (page - 1) * limit
+    slice_ = cands[offset:offset + limit]
+    if slice_ and all(c.get("zeile") for c in slice_):
+        rows = [c["zeile"] for c in slice_]          # Seite 1: kam mit der Rangliste
+    else:
+        try:
+            rows = await asyncio.to_thread(rows_by_ids, [c["id"] for c in slice_])
+        except Exception as e:
+            gr.Warning(f"Treffer laden fehlgeschlagen: {e}")
+            rows = []
+    sim = {str(c["id"]): c["similarity"] for c in slice_}
+    rows = [{**r, "similarity": sim.get(str(r["id"]), 0.0)} for r in rows]
+
+    start = offset + 1 if rows else 0
+    end = offset + len(rows)
+    out_md = f"**{start}–{end} von {total} (semantisch)**\n\n" + ("\n\n---\n\n".join(_render_ranked(rows)) if rows else "_Keine Treffer._")
+    log_action("semantic", {"q": q, "typ": typ, "status": status, "von": von, "bis": bis, "page": page})
+    return (out_md, gr.update(interactive=page > 1), gr.update(interactive=end < total), page,
+            f"{start}–{end} / {total}", {**pager, "page": page})
+
+
+async def do_search_sem_db(q, typ, einreicher, status, von, bis, pager, sort, request: gr.Request = None):
     """
     Semantische Suche auf bvv_dokumente.
     Parameter:
       q: Suchtext (String)
       typ: Liste Typen (oder [])
-      status: Dropdown -> String; wird intern in Liste normiert und gefiltert
+      einreicher/status: Dropdown -> Liste/String; wird serverseitig im RPC gefiltert
       von/bis: Datumsfilter (Strings)
-      page: ignoriert (Top-N semantisch)
+      pager: Pager-State; neue Suche → Seite 1 (mode "sem")
       sort: ignoriert (Similarity dominiert)
     """
 
     # Guard: Nur ausführen, wenn Text oder Filter gesetzt
-    if not ((q or "").strip() or _has_any_filter(typ, status, von, bis)):
+    if not ((q or "").strip() or _has_any_filter(typ, status, von, bis, einreicher)):
         gr.Warning("Bitte Suchbegriff eingeben ODER mind. einen Filter setzen.")
-        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
-
-    # --- Embedding erzeugen ---
-    try:
-        q_vec = _embed_query(q or "BVV Berlin Vorgänge allgemein")
-    except Exception as e:
-        gr.Warning(f"Embedding fehlgeschlagen: {e}")
-        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
-
-    limit   = max(STATE.get("limit", 10), 20)
-    typ_arg = typ or None
-    von_arg = von or None
-    bis_arg = bis or None
-
-    # --- RPC: nur für Similarity + Typ/Datum; Status filtern wir clientseitig sicher nach ---
-    try:
-        rpc = sb.rpc("match_bvv_dokumente", {
-            "query_embedding": q_vec,
-            "match_count": limit,
-            "match_threshold": 0.3,
-            "typ_filter": typ_arg,
-            # "status_filter": _as_list_or_none(status),  # optional serverseitig – erst aktivieren, wenn DB-Funktion erweitert ist
-            "von": von_arg,
-            "bis": bis_arg,
-            "published_only": False
-        }).execute()
-        hits = rpc.data or []
-        #gr.Info(f"RPC semantisch: {len(hits)} Treffer (vor Nachfilter)")
-    except Exception as e:
-        gr.Warning(f"Vektor-Suche fehlgeschlagen: {e}")
-        hits = []
+        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
 
-    # --- IDs + Similarity-Map ---
-    ids = [h.get("id") for h in hits if h.get("id") is not None]
-    sim = {h.get("id"): h.get("similarity", 0.0) for h in hits if h.get("id") is not None}
-
-    # --- Status normalisieren & NACHFILTERN (garantiert wirksam) ---
-    status_arg = _as_list_or_none(status)
-    einreicher_arg = _as_list_or_none(einreicher)
-
-    query = sb.table("bvv_dokumente").select("*")
-    if ids:
-        query = query.in_("id", ids)
-    else:
-        # Keine IDs -> leer
-        rows = []
-        total = 0
-        out_md = "**0–0 von 0 (semantisch)**\n\n_Keine Treffer._"
-        return out_md, gr.update(interactive=False), gr.update(interactive=False), 1, "0–0 / 0"
-
-    if status_arg:
-        query = query.in_("status", status_arg)
-    if einreicher_arg:
-        query = query.in_("einreicher", einreicher_arg)
-
-    try:
-        rows = query.execute().data or []
-    except Exception as e:
-        gr.Warning(f"Datenabruf fehlgeschlagen: {e}")
-        rows = []
+    session = _session(request)
+    fresh = _sem_pager(q, typ, einreicher, status, von, bis)
+    SEM_CANDIDATES.pop((session, fresh["key"]))       # Button = bewusst neu suchen
+    return await _semantic_page(q, typ, einreicher, status, von, bis, fresh, session)
 
-    # Nach Similarity sortieren (damit die Reihenfolge dem RPC entspricht)
-    rows.sort(key=lambda r: sim.get(r.get("id"), 0.0), reverse=True)
 
-    # --- Render ---
+def _render_ranked(rows: list[dict]) -> list[str]:
     body = []
     for row in rows:
-        preview = (row.get("inhalt") or "")[:220]
+        preview = row.get("vorschau") or ""
         pdf_md = _pdf_link(row.get("pdf_url"))
-        s = sim.get(row.get("id"), 0.0)
+        s = row.get("similarity", 0.0)
         body.append(
             f"📄 **{row.get('titel','(ohne Titel)')}**  \n"
             f"Dok-Typ-> {row.get('typ','?')} · {row.get('status','?')} · {row.get('datum','?')} · {row.get('fraktion','')} - Eingereicht von: {row.get('einreicher','')}  \n"
             f"{preview}…  \n"
             #f"Ähnlichkeit: {s:.2f}  \n"
+            f"ID: `{row.get('id','?')}` (Volltext im Tab „Detail“)  \n"
             f"Dokument: {pdf_md}"
-            #f"ID: `{row.get('id','?')}`{pdf_md}"
         )
+    return body
+
+
+def _ranked_outputs(rows: list[dict], label: str):
+    """Top-N-Treffer (hybrid) rendern → 5 Outputs, Pager bleibt aus."""
+    body = _render_ranked(rows)
 
     total = len(rows)
     start, end = (1 if total else 0), total
-    out_md = f"**{start}–{end} von {total} (semantisch)**\n\n" + ("\n\n---\n\n".join(body) if body else "_Keine Treffer._")
+    out_md = f"**{start}–{end} von {total} ({label})**\n\n" + ("\n\n---\n\n".join(body) if body else "_Keine Treffer._")
 
     # Pager bleibt aus – wir holen Top-N
     return out_md, gr.update(interactive=False), gr.update(interactive=False), 1, f"{start}–{end} / {total}"
 
 
+# --- Hybrid-Suche: BM25 (lokal, bm25_index.py) + Vektor, fusioniert per RRF ---
+# Der BM25-Index liegt im RAM (+ Pickle unter KALLI_INDEX_DIR) und wird über
+# dokumente_seit() (sql/05_dokumente_seit.sql) nachgezogen, sobald die Ingestion
+# den Datenstand hochzählt (on_invalidate).
+HYBRID_CANDIDATES = int(os.getenv("KALLI_HYBRID_CANDIDATES", "100"))   # je Rangliste
+RRF_K = 60
+
+BM25 = None
+if os.getenv("KALLI_BM25", "1") == "1":
+    try:
+        from bm25_index import BM25Index, rrf_fuse
+        BM25 = BM25Index(os.path.join(os.getenv("KALLI_INDEX_DIR", "data/vektor_index"), "bm25.pkl"))
+        BM25.load()
+    except Exception as e:
+        print(f"[!] BM25-Index nicht verfügbar: {e}")
+        BM25 = None
+
+def _fetch_dokumente(seit, nach_id, anzahl):
+    return sb.rpc("dokumente_seit", {"seit": seit, "nach_id": nach_id, "anzahl": anzahl}).execute().data or []
+
+_register_mirror("BM25-Index", BM25, _fetch_dokumente, "bvv_dokumente")
+
+
+async def do_search_hybrid(q, typ, einreicher, status, von, bis, page, sort):
+    """
+    Hybrid-Suche: BM25-Rangliste + Vektor-Rangliste (gleiche Filter), per
+    Reciprocal Rank Fusion gemischt. Fällt ein Teil aus, zählt nur der andere.
+    BM25 läuft parallel zum Embedding. page/sort: ignoriert (Rang dominiert).
+    """
+    if len((q or "").strip()) < MIN_LEN:
+        gr.Warning("Hybrid-Suche braucht einen Suchbegriff.")
+        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+
+    filters = dict(typ=_as_list_or_none(typ), status=_as_list_or_none(status),
+                   einreicher=_as_list_or_none(einreicher), von=von or None, bis=bis or None)
+
+    async def _lexical():
+        if BM25 is not None and BM25.ready:
+            return await asyncio.to_thread(BM25.search, q, k=HYBRID_CANDIDATES, **filters)
+        gr.Info("Volltext-Index lädt noch – Ergebnis nur semantisch.")
+        return []
+
+    async def _vector():
+        try:
+            q_vec = await _aembed_query(q)
+            return await asyncio.to_thread(match_dokumente, q_vec, limit=HYBRID_CANDIDATES, typ=typ,
+                                           einreicher=einreicher, status=status, von=von, bis=bis)
+        except Exception as e:
+            gr.Warning(f"Vektor-Suche fehlgeschlagen: {e}")
+            return []
+
+    lexical, vector = await asyncio.gather(_lexical(), _vector())
+
+    if BM25 is not None:
+        rows = rrf_fuse(lexical, vector, k=RRF_K)
+    else:
+        rows = vector
+    limit = max(STATE.get("limit", 10), 20)
+    log_action("hybrid", {"q": q, "typ": typ, "status": status, "von": von, "bis": bis})
+    return _ranked_outputs(rows[:limit], "hybrid")
+
+
 # =============================
 # BLOCK 3 — Data Layer
 # =============================
@@ -242,35 +753,289 @@ def _apply_filters(query, *, q: str | None, typ: list[str] | None, status: list[
     return query
 
 
+# --- Ergebnis-Cache (Liste + Anzahl) ---
+# Anzahl: gilt für die ganze Blätter-Session derselben Suche (count="exact" = Full Scan)
+# Seiten: kurze TTL; beides wird bei neuem Datenstand geleert (_check_data_version)
+COUNT_CACHE = kalli_cache.register(TTLCache(
+    maxsize=256, ttl=float(os.getenv("KALLI_COUNT_CACHE_TTL", "900")), name="count", shared=SHARED_CACHE))
+PAGE_CACHE = kalli_cache.register(TTLCache(
+    maxsize=512, ttl=float(os.getenv("KALLI_PAGE_CACHE_TTL", "60")), name="pages", shared=SHARED_CACHE))
+
+def _filter_key(q, typ, einreicher, status, von, bis) -> tuple:
+    """Normierter Filter-Tupel: gleiche Suche → gleicher Key, egal wie eingegeben."""
+    def _norm_list(x):
+        x = _as_list_or_none(x)
+        return tuple(sorted(str(v) for v in x)) if x else ()
+    def _norm_date(d):
+        return str(d).strip()[:10] if d else ""
+    return (
+        _normalize_query(q),           # ilike ist ohnehin case-insensitiv
+        _norm_list(typ),
+        _norm_list(einreicher),
+        _norm_list(status),
+        _norm_date(von),
+        _norm_date(bis),
+    )
+
+
 def clear_filters_keep_results():
     gr.Info("🧹 Filter zurückgesetzt.")
     #return "", [], [], [], None, None, "datum:desc", 1, gr.update()
     #return "", [], [], None, None, "datum:desc", 1, gr.update()
     return "", [], [], None, None, None, "datum:desc", 1, gr.update()
 
+# --- Keyset-Paging auf (datum, id) → keyset.py ---
+# Cursor = letzte Zeile der Seite; Zeilen ohne Datum immer am Ende (NULLS LAST).
+
+
+# --- Lokales SQLite-Replikat (optional, KALLI_REPLICA=1) ---
+# Spiegelt bvv_dokumente über dokumente_seit() (sqlite_replica.py); Liste, Anzahl
+# und Detail kommen dann ohne Netz-Roundtrip – auch wenn Supabase hakt.
+REPLICA = None
+if os.getenv("KALLI_REPLICA", "0") == "1":
+    try:
+        from sqlite_replica import SqliteReplica
+        REPLICA = SqliteReplica(os.getenv("KALLI_REPLICA_PATH", "data/bvv_replica.sqlite"))
+    except Exception as e:
+        print(f"[!] SQLite-Replikat nicht verfügbar: {e}")
+        REPLICA = None
+
+_register_mirror("SQLite-Replikat", REPLICA, _fetch_dokumente, "bvv_dokumente")
+
+def _replica_usable() -> bool:
+    try:
+        return REPLICA is not None and REPLICA.ready
+    except Exception:
+        return False
+
+
+# --- Typeahead (typeahead_index.py) ---
+# Präfix-Index über Titel/Thema/Drucksache im RAM, aufgebaut über dokumente_kopf_seit()
+# (sql/12, ohne inhalt) und nachgezogen bei neuem Datenstand. Vorschläge ohne
+# Datenbank-Roundtrip.
+TYPEAHEAD = None
+if os.getenv("KALLI_TYPEAHEAD", "1") == "1":
+    from typeahead_index import PrefixIndex
+    TYPEAHEAD = PrefixIndex()
+TYPEAHEAD_K = int(os.getenv("KALLI_TYPEAHEAD_K", "8"))
+
+def _fetch_dokumente_kopf(seit, nach_id, anzahl):
+    return sb.rpc("dokumente_kopf_seit", {"seit": seit, "nach_id": nach_id, "anzahl": anzahl}).execute().data or []
+
+_register_mirror("Typeahead-Index", TYPEAHEAD, _fetch_dokumente_kopf, "bvv_dokumente",
+                 lambda: {"page_size": 2000})
+
+def suggest(q: str):
+    """Vorschläge fürs Suchfeld → Dropdown-Update (Wert = Drucksache bzw. Titel)."""
+    if TYPEAHEAD is None or not TYPEAHEAD.ready:
+        return gr.update(choices=[], value=None)
+    choices = []
+    for r in TYPEAHEAD.suggest(q or "", k=TYPEAHEAD_K):
+        ds = r.get("drucksache")
+        label = f"{ds} · {r.get('titel') or ''}" if ds else (r.get("titel") or "")
+        choices.append((label[:120], ds or r.get("titel") or ""))
+    return gr.update(choices=choices, value=None)
+
+
+# --- Drucksache-Schnellpfad ---
+# Eingabe wie "0246/XXI" (Muster aus extractor.guess_drucksache) → exakte bzw.
+# Präfix-Suche auf der indizierten Spalte drucksache statt ilike über inhalt.
+# Nichts gefunden → normale Suche.
+# Erkennung in drucksache.py.
+DRUCKSACHE_MAX = 50
+
+def find_drucksache(q, *, typ=None, einreicher=None, status=None, datum_von=None, datum_bis=None,
+                    sort: str = "datum:desc") -> list[dict] | None:
+    """Treffer des Schnellpfads in `sort`-Reihenfolge (gecached) – None, wenn q keine Drucksache ist oder nichts passt."""
+    parsed = _drucksache_query(q)
+    if parsed is None:
+        return None
+    key = ("drucksache",) + _filter_key(q, typ, einreicher, status, datum_von, datum_bis) + (sort,)
+    rows = PAGE_CACHE.get_or_set(key, lambda: _find_drucksache_db(
+        *parsed, typ=_as_list_or_none(typ), einreicher=_as_list_or_none(einreicher),
+        status=_as_list_or_none(status), von=datum_von, bis=datum_bis, sort=sort))
+    return rows or None
+
+def _find_drucksache_db(variants, prefix, *, typ, einreicher, status, von, bis, sort) -> list[dict]:
+    col, desc = _sort_spec(sort)
+    filters = dict(typ=typ, einreicher=einreicher, status=status, von=von, bis=bis, col=col, desc=desc)
+    if _replica_usable():
+        try:
+            return (REPLICA.by_drucksache(variants, limit=DRUCKSACHE_MAX, **filters)
+                    or REPLICA.by_drucksache(None, prefix, limit=DRUCKSACHE_MAX, **filters))
+        except Exception as e:
+            print(f"[!] Replikat-Drucksache fehlgeschlagen, nutze Supabase: {e}")
+
+    def _query():
+        query = sb.table("bvv_dokumente").select(LIST_COLUMNS)
+        query = _apply_filters(query, q=None, typ=typ, status=status, von=von, bis=bis, einreicher=einreicher)
+        return apply_order(query, col, desc)
+
+    rows = _query().in_("drucksache", variants).limit(DRUCKSACHE_MAX).execute().data or []
+    if not rows:
+        rows = _query().like("drucksache", f"{prefix}%").limit(DRUCKSACHE_MAX).execute().data or []
+    return rows
+
+
+def _sort_spec(sort: str) -> tuple[str, bool]:
+    """"datum:desc" → ("datum", True)."""
+    col, direction = ((sort or "datum:desc").split(":") + ["asc"])[:2]
+    return col, direction.lower() == "desc"
+
+
 def list_vorgaenge(*, q: str = "", typ: list[str] | None = None, einreicher = None, status: list[str] | None = None,
                    datum_von: str | None = None, datum_bis: str | None = None,
-                   limit: int = 20, offset: int = 0, sort: str = "datum:desc"):
+                   limit: int = 20, cursor: str | None = None, sort: str = "datum:desc"):
+    hits = find_drucksache(q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von,
+                           datum_bis=datum_bis, sort=sort)
+    if hits is not None:
+        # Treffer liegen komplett vor (≤ DRUCKSACHE_MAX): Cursor = ID der letzten Zeile der Vorseite
+        after = _decode_cursor(cursor)
+        ids = [str(h.get("id")) for h in hits]
+        if not after:
+            return hits[:limit]
+        if str(after[1]) not in ids:
+            return []                                # Treffer inzwischen anders → nichts doppelt zeigen
+        start = ids.index(str(after[1])) + 1
+        return hits[start:start + limit]
+    key = _filter_key(q, typ, einreicher, status, datum_von, datum_bis) + (sort, limit, cursor)
+    return PAGE_CACHE.get_or_set(key, lambda: _list_vorgaenge_db(
+        q=q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von, datum_bis=datum_bis,
+        limit=limit, cursor=cursor, sort=sort))
+
+
+# Liste: nur was gerendert wird + vorschau (berechnete Spalte, sql/06_vorschau.sql);
+# den vollen inhalt lädt erst die Detailansicht
+LIST_COLUMNS = "id,typ,titel,datum,status,fraktion,einreicher,drucksache,pdf_url,kategorie,vorschau"
+DETAIL_COLUMNS = "id,titel,inhalt,datum,kategorie,thema,pdf_url,drucksache,fraktion,einreicher,status"
+
+def _list_vorgaenge_db(*, q, typ, einreicher, status, datum_von, datum_bis, limit, cursor, sort,
+                       columns: str = LIST_COLUMNS):
     base = "bvv_dokumente"  # Supabase View
-    col, direction = (sort.split(":") + ["asc"])[:2]
-
-    query = sb.table(base).select("*")
+    col, desc = _sort_spec(sort)
+
+    if _replica_usable():
+        try:
+            return REPLICA.list(q=q, typ=typ, einreicher=_as_list_or_none(einreicher), status=_as_list_or_none(status),
+                                von=datum_von, bis=datum_bis, limit=limit, after=_decode_cursor(cursor),
+                                col=col, desc=desc,
+                                columns=None if columns == LIST_COLUMNS else tuple(columns.split(",")))
+        except Exception as e:
+            print(f"[!] Replikat-Liste fehlgeschlagen, nutze Supabase: {e}")
+
+    query = sb.table(base).select(columns)
     query = _apply_filters(query, q=q, typ=typ, status=_as_list_or_none(status), von=datum_von, bis=datum_bis, einreicher=_as_list_or_none(einreicher))
-    query = query.order(col, desc=(direction.lower() == "desc"))
-    query = query.range(offset, offset + limit - 1)
+    query = _apply_cursor(query, cursor, col, desc)
+    query = apply_order(query, col, desc)
+    query = query.limit(limit)
     res = query.execute()
     return res.data or []
 
 
+def iter_vorgaenge(*, q: str = "", typ=None, einreicher=None, status=None, datum_von=None, datum_bis=None,
+                   sort: str = "datum:desc", columns: str = DETAIL_COLUMNS, chunk: int = 200,
+                   max_rows: int | None = None):
+    """
+    Alle Treffer der Filter als Generator, in Keyset-Blöcken zu `chunk` Zeilen
+    (für Exporte): im RAM liegt immer nur ein Block, kein PAGE_CACHE.
+    """
+    col = sort.split(":")[0]
+    cols = columns.split(",")
+    columns = ",".join(cols + [c for c in ("id", col) if c not in cols])    # Cursor braucht col + id
+    cursor, n = None, 0
+    while True:
+        size = chunk if max_rows is None else min(chunk, max_rows - n)
+        if size <= 0:
+            return
+        page = _list_vorgaenge_db(q=q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von,
+                                  datum_bis=datum_bis, limit=size, cursor=cursor, sort=sort, columns=columns)
+        yield from page
+        n += len(page)
+        if len(page) < size:
+            return
+        cursor = _encode_cursor(page[-1], col)
+
+
+# Anzahl: "exact" = Full Scan über das ilike-OR, "planned"/"estimated" = Planner-Schätzung
+# (estimated: exakt bei kleinen Mengen, sonst geschätzt), "none" = gar nicht zählen.
+COUNT_MODE = os.getenv("KALLI_COUNT_MODE", "estimated")
+
 def count_vorgaenge(*, q: str = "", typ: list[str] | None = None, einreicher = None, status: list[str] | None = None,
-                    datum_von: str | None = None, datum_bis: str | None = None) -> int:
+                    datum_von: str | None = None, datum_bis: str | None = None) -> int | None:
+    hits = find_drucksache(q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von, datum_bis=datum_bis)
+    if hits is not None:
+        return len(hits)
+    mode = "replica" if _replica_usable() else COUNT_MODE
+    if mode == "none":
+        return None
+    key = _filter_key(q, typ, einreicher, status, datum_von, datum_bis) + (mode,)
+    return COUNT_CACHE.get_or_set(key, lambda: _count_vorgaenge_db(
+        q=q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von, datum_bis=datum_bis))
+
+
+def _count_exact() -> bool:
+    """Ist die angezeigte Anzahl exakt? (Replikat zählt lokal immer exakt)"""
+    return COUNT_MODE == "exact" or _replica_usable()
+
+
+def _count_vorgaenge_db(*, q, typ, einreicher, status, datum_von, datum_bis) -> int:
     base = "bvv_dokumente"
-    query = sb.table(base).select("id", count="exact")
+    if _replica_usable():
+        try:
+            return REPLICA.count(q=q, typ=typ, einreicher=_as_list_or_none(einreicher), status=_as_list_or_none(status),
+                                 von=datum_von, bis=datum_bis)
+        except Exception as e:
+            print(f"[!] Replikat-Anzahl fehlgeschlagen, nutze Supabase: {e}")
+    query = sb.table(base).select("id", count=COUNT_MODE).limit(1)
     query = _apply_filters(query, q=q, typ=typ,  status=_as_list_or_none(status), von=datum_von, bis=datum_bis, einreicher=_as_list_or_none(einreicher))
     res = query.execute()
     return int(res.count or 0)
 
 
+# --- Facetten: Trefferzahlen je typ/status/einreicher/jahr ---
+# EIN gruppierter Query (RPC facetten, sql/08_facetten.sql – oder lokal im Replikat),
+# gecached pro Filter (ohne Cursor → gilt für alle Seiten derselben Suche).
+# Jede Facette zählt unter allen aktuellen Filtern außer ihrem eigenen → die übrigen
+# Werte behalten ihre Anzahl und bleiben für die Mehrfachauswahl wählbar.
+FACETS = ("typ", "status", "einreicher", "jahr")
+TYP_CHOICES = ["antrag", "anfrage_muendlich", "anfrage_klein", "anfrage_gross"]
+STATUS_CHOICES = ["eingereicht", "beantwortet", "abgelehnt", "zugestimmt"]
+EINREICHER_CHOICES = ["Franck", "Kasper", "Turban"]     # immer wählbar, auch ohne Treffer
+FACET_CACHE = kalli_cache.register(TTLCache(
+    maxsize=256, ttl=float(os.getenv("KALLI_FACET_CACHE_TTL", "900")), name="facetten", shared=SHARED_CACHE))
+
+def facet_counts(*, q: str = "", typ=None, einreicher=None, status=None,
+                 datum_von=None, datum_bis=None) -> dict[str, list[tuple[str, int]]]:
+    key = _filter_key(q, typ, einreicher, status, datum_von, datum_bis)
+    return FACET_CACHE.get_or_set(key, lambda: _facet_counts_db(
+        q=q, typ=typ, einreicher=einreicher, status=status, datum_von=datum_von, datum_bis=datum_bis))
+
+
+def _facet_counts_db(*, q, typ, einreicher, status, datum_von, datum_bis) -> dict:
+    args = dict(q=q or None, typ=_as_list_or_none(typ), einreicher=_as_list_or_none(einreicher),
+                status=_as_list_or_none(status), von=datum_von or None, bis=datum_bis or None)
+    rows = None
+    if _replica_usable():
+        try:
+            rows = REPLICA.facets(**args)
+        except Exception as e:
+            print(f"[!] Replikat-Facetten fehlgeschlagen, nutze Supabase: {e}")
+    if rows is None:
+        rows = sb.rpc("facetten", {
+            "q": args["q"],
+            "typ_filter": args["typ"],
+            "status_filter": args["status"],
+            "einreicher_filter": args["einreicher"],
+            "von": args["von"],
+            "bis": args["bis"],
+        }).execute().data or []
+    out = {f: [] for f in FACETS}
+    for r in rows:
+        if r.get("facette") in out:
+            out[r["facette"]].append((str(r["wert"]), int(r["anzahl"])))
+    return out
+
+
 def get_vorgang_detail(typ: str, id_):
     table = {
         "antrag": "antraege",
@@ -280,20 +1045,35 @@ def get_vorgang_detail(typ: str, id_):
     }.get(typ)
     if not table:
         return None
-    res = sb.table(table).select("*").eq("id", id_).single().execute()
+    if _replica_usable():
+        try:
+            row = REPLICA.detail(id_)
+            if row and row.get("typ") == typ:
+                return row
+        except Exception as e:
+            print(f"[!] Replikat-Detail fehlgeschlagen, nutze Supabase: {e}")
+    res = sb.table(table).select(DETAIL_COLUMNS).eq("id", id_).single().execute()
     return res.data
 
 
+# Zugriffslog gepuffert (kalli_log.py): Suchen warten nie auf den Insert.
+# Batches nach Anzahl/Zeit, bei Überlast wird verworfen (oder KALLI_LOG_BLOCK Sek. gewartet).
+ACCESS_LOG = BufferedLogger(
+    lambda rows: sb.table("zugriffslog_bvv").insert(rows).execute(),
+    maxsize=int(os.getenv("KALLI_LOG_QUEUE", "2000")),
+    batch_size=int(os.getenv("KALLI_LOG_BATCH", "50")),
+    interval=float(os.getenv("KALLI_LOG_INTERVAL", "2")),
+    block_timeout=float(os.getenv("KALLI_LOG_BLOCK", "0")),
+    name="zugriffslog",
+)
+
 def log_action(action: str, query: dict | None = None, vorgang_id=None):
-    try:
-        sb.table("zugriffslog_bvv").insert({
-            "action": action,
-            "query": query and str(query),
-            "vorgang_id": vorgang_id,
-        }).execute()
-    except Exception:
-        # still be silent in frontend
-        pass
+    # still be silent in frontend: nur einreihen, Fehler landen im Writer-Thread
+    ACCESS_LOG.log({
+        "action": action,
+        "query": query and str(query),
+        "vorgang_id": vorgang_id,
+    })
 
 # =============================
 # BLOCK 4 — UI Actions
@@ -310,29 +1090,120 @@ def _pdf_link(url: str | None) -> str:
     host = urlparse(u).netloc or "PDF"
     return f"\n[🔗 Original-PDF ({host})]({u})"
 
-def do_search(q, typ, einreicher, status, von, bis, page, sort):
-    # ---- Guard: nur suchen, wenn sinnvoll ----
-    if not _can_search(q, typ, einreicher, status, von, bis):
-        gr.Warning("Bitte Suchbegriff eingeben ODER mindestens einen Filter setzen (z. B. Typ).")
-        # Nichts ändern: alle Outputs unverändert lassen
-        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+def _render_rows(items) -> list[str]:
+    body = []
+    for row in items:
+
+        preview = row.get("vorschau") or (row.get("inhalt") or "")[:220]
+        pdf_md = _pdf_link(row.get("pdf_url"))
+        body.append(
+            f"📄 **{row.get('titel','(ohne Titel)')}**  \n"
+            f"Dok-Typ-> {row.get('typ','?')} - Status: {row.get('status','?')} · {row.get('datum','?')} · {row.get('fraktion','')} -> {row.get('einreicher','')}  \n"
+            f"{preview}…  \n"
+            f"ID: `{row.get('id','?')}` (Volltext im Tab „Detail“)  \n"
+            f"zur Drucksache: {pdf_md}"
+        )
+    return body
+
 
+def _new_pager(q, typ, einreicher, status, von, bis, sort) -> dict:
+    """Pager-State (gr.State): Cursor je Seitenanfang statt Seitennummer."""
+    return {"key": _filter_key(q, typ, einreicher, status, von, bis) + (sort or "datum:desc",),
+            "cursors": [None], "next": None}
 
-    page = max(1, int(page or 1))
+
+# --- Prefetch: nach Seite N lädt Seite N+1 im Hintergrund (pro Session) ---
+# Je Session höchstens ein Prefetch; neuer Seitenaufruf/andere Filter → alter wird abgebrochen
+# (der Thread läuft ggf. zu Ende, das Ergebnis wird verworfen). Global max. PREFETCH_MAX parallel.
+PREFETCH_ENABLED = os.getenv("KALLI_PREFETCH", "1") == "1"
+PREFETCH_MAX = int(os.getenv("KALLI_PREFETCH_MAX", "4"))
+PREFETCH = kalli_cache.register(TTLCache(     # session → ((pager key, cursor), Task)
+    maxsize=int(os.getenv("KALLI_PREFETCH_SESSIONS", "256")), ttl=120, name="prefetch",
+    on_evict=lambda entry: _discard_prefetch(entry)))      # LRU/Ablauf/neuer Datenstand → absagen
+_PREFETCH_INFLIGHT = {"n": 0}       # laufende Worker-Threads (nicht Tasks)
+_PREFETCH_LOCK = threading.Lock()
+
+def _discard_prefetch(entry):
+    """
+    Veralteten Prefetch absagen. Auch aus anderen Threads (invalidate_all läuft im
+    Watcher): cancel() dann über den Event-Loop des Tasks.
+    """
+    if not entry or entry[1].done():
+        return
+    task = entry[1]
+    try:
+        same_loop = asyncio.get_running_loop() is task.get_loop()
+    except RuntimeError:
+        same_loop = False
+    if same_loop:
+        task.cancel()
+    else:
+        try:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            pass                     # Loop schon zu
+
+def _cancel_prefetch(session: str | None):
+    _discard_prefetch(PREFETCH.pop(session) if session else None)
+
+def _start_prefetch(session: str | None, tag: tuple, fetch):
+    """
+    Nächste Seite im Hintergrund laden. Gezählt wird der Thread: cancel() stoppt
+    nur das Warten, der Thread läuft zu Ende – erst sein finally gibt den Platz frei.
+    Wird der Task abgesagt, bevor der Thread startet, gibt ihn der done-Callback frei.
+    """
+    _cancel_prefetch(session)
+    if not PREFETCH_ENABLED or not session:
+        return
+    with _PREFETCH_LOCK:
+        if _PREFETCH_INFLIGHT["n"] >= PREFETCH_MAX:
+            return
+        _PREFETCH_INFLIGHT["n"] += 1
+    slot = {"started": False, "released": False}
+
+    def _run():
+        with _PREFETCH_LOCK:
+            if slot["released"]:
+                return None                  # schon abgesagt, bevor der Thread lief
+            slot["started"] = True
+        try:
+            return fetch()
+        finally:
+            with _PREFETCH_LOCK:
+                slot["released"] = True
+                _PREFETCH_INFLIGHT["n"] -= 1
+
+    def _never_ran(_task):
+        with _PREFETCH_LOCK:
+            if not slot["started"] and not slot["released"]:
+                slot["released"] = True
+                _PREFETCH_INFLIGHT["n"] -= 1
+
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(_run))
+    task.add_done_callback(_never_ran)
+    # Fehler immer abholen – verworfene Prefetches sonst "Task exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    PREFETCH.set(session, (tag, task))
+
+async def _take_prefetch(session: str | None, tag: tuple):
+    """Vorab geladene Seite (ggf. noch laufend → abwarten) oder None; andere Seite → absagen."""
+    entry = PREFETCH.pop(session) if session else None
+    if not entry or entry[0] != tag:
+        _discard_prefetch(entry)
+        return None
+    try:
+        return await entry[1]
+    except (asyncio.CancelledError, Exception):
+        return None
+
+
+async def _classic_page(q, typ, einreicher, status, von, bis, sort, pager: dict, session: str | None = None):
+    """Seite zu pager["cursors"][-1] laden + rendern. Liefert die 6 Outputs inkl. neuem Pager."""
+    page = len(pager["cursors"])
     limit = STATE["limit"]
-    offset = (page - 1) * limit
-    items = list_vorgaenge(
-        q=q or "",
-        typ=typ or None,
-        einreicher=einreicher or None,
-        status=status or None,
-        datum_von=von or None,
-        datum_bis=bis or None,
-        limit=limit,
-        offset=offset,
-        sort=sort or "datum:desc",
-    )
-    total = count_vorgaenge(
+    sort = sort or "datum:desc"
+    col = sort.split(":")[0]
+    filters = dict(
         q=q or "",
         typ=typ or None,
         einreicher=einreicher or None,
@@ -340,43 +1211,100 @@ def do_search(q, typ, einreicher, status, von, bis, page, sort):
         datum_von=von or None,
         datum_bis=bis or None,
     )
+    # eine Zeile mehr holen → "Weiter" ohne Gesamtanzahl entscheidbar
+    # Liste + Anzahl sind unabhängig → parallel statt nacheinander
+    items = await _take_prefetch(session, (pager["key"], pager["cursors"][-1]))
+    if items is not None:
+        total = await asyncio.to_thread(count_vorgaenge, **filters)     # liegt im COUNT_CACHE
+    else:
+        items, total = await asyncio.gather(
+            asyncio.to_thread(list_vorgaenge, **filters, limit=limit + 1, cursor=pager["cursors"][-1], sort=sort),
+            asyncio.to_thread(count_vorgaenge, **filters),
+        )
 
-    start = 0 if total == 0 else offset + 1
-    end = min(offset + limit, total)
+    has_next = len(items) > limit
+    items = items[:limit]
+    pager = {**pager, "next": _encode_cursor(items[-1], col) if has_next else None}
 
-    body = []
-    for row in items:
+    if has_next:
+        nxt = pager["next"]
+        _start_prefetch(session, (pager["key"], nxt),
+                        lambda: list_vorgaenge(**filters, limit=limit + 1, cursor=nxt, sort=sort))
+    else:
+        _cancel_prefetch(session)
 
-        preview = (row.get("inhalt") or "")[:220]
-        pdf_md = _pdf_link(row.get("pdf_url"))
-        body.append(
-            f"📄 **{row.get('titel','(ohne Titel)')}**  \n"
-            f"Dok-Typ-> {row.get('typ','?')} - Status: {row.get('status','?')} · {row.get('datum','?')} · {row.get('fraktion','')} -> {row.get('einreicher','')}  \n"
-            f"{preview}…  \n"
-            #f"ID: `{row.get('id','?')}`{pdf_md}"
-            f"zur Drucksache: {pdf_md}"
-        )
+    offset = (page - 1) * limit
+    start = offset + 1 if items else 0
+    end = offset + len(items)
+    if total is None:
+        total_txt = "vielen" if has_next else str(end)
+    else:
+        total = max(total, end)      # Schätzung darf nicht kleiner als das Gesehene sein
+        total_txt = str(total) if _count_exact() or not has_next else f"~{total}"
 
-    header = f"**{start}–{end} von {total} Einträgen**\n\n"
+    body = _render_rows(items)
+    header = f"**{start}–{end} von {total_txt} Einträgen**\n\n"
     out_md = header + ("\n\n---\n\n".join(body) if body else "_Keine Treffer._")
 
     # Toggle Pager-Buttons
     has_prev = page > 1
-    has_next = end < total
 
     log_action("list", {"q": q, "typ": typ, "status": status, "von": von, "bis": bis, "page": page, "sort": sort})
-    return out_md, gr.update(interactive=has_prev), gr.update(interactive=has_next), page, f"{start}–{end} / {total}"
+    return out_md, gr.update(interactive=has_prev), gr.update(interactive=has_next), page, f"{start}–{end} / {total_txt}", pager
 
 
-def next_page(q, typ, einreicher, status, von, bis, page, sort):
-    return do_search(q, typ, einreicher, status, von, bis, (int(page or 1) + 1), sort)
+def _session(request: gr.Request | None) -> str | None:
+    return getattr(request, "session_hash", None)
 
-def prev_page(q, typ, einreicher, status, von, bis, page, sort):
-    return do_search(q, typ, einreicher, status, von, bis, (max(1, int(page or 1) - 1)), sort)
+
+async def do_search(q, typ, einreicher, status, von, bis, pager, sort, request: gr.Request = None):
+    # ---- Guard: nur suchen, wenn sinnvoll ----
+    if not _can_search(q, typ, einreicher, status, von, bis):
+        gr.Warning("Bitte Suchbegriff eingeben ODER mindestens einen Filter setzen (z. B. Typ).")
+        # Nichts ändern: alle Outputs unverändert lassen
+        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+
+    # neue Suche → immer Seite 1
+    return await _classic_page(q, typ, einreicher, status, von, bis, sort,
+                               _new_pager(q, typ, einreicher, status, von, bis, sort), _session(request))
+
+
+async def next_page(q, typ, einreicher, status, von, bis, pager, sort, request: gr.Request = None):
+    if pager and pager.get("mode") == "sem":
+        return await _sem_step(q, typ, einreicher, status, von, bis, pager, +1, request)
+    fresh = _new_pager(q, typ, einreicher, status, von, bis, sort)
+    if not pager or pager.get("key") != fresh["key"] or not pager.get("next"):
+        return await do_search(q, typ, einreicher, status, von, bis, fresh, sort, request)   # Filter geändert → von vorn
+    return await _classic_page(q, typ, einreicher, status, von, bis, sort,
+                         {**pager, "cursors": pager["cursors"] + [pager["next"]]}, _session(request))
+
+async def prev_page(q, typ, einreicher, status, von, bis, pager, sort, request: gr.Request = None):
+    if pager and pager.get("mode") == "sem":
+        return await _sem_step(q, typ, einreicher, status, von, bis, pager, -1, request)
+    fresh = _new_pager(q, typ, einreicher, status, von, bis, sort)
+    if not pager or pager.get("key") != fresh["key"] or len(pager.get("cursors", [])) < 2:
+        return await do_search(q, typ, einreicher, status, von, bis, fresh, sort, request)
+    return await _classic_page(q, typ, einreicher, status, von, bis, sort,
+                         {**pager, "cursors": pager["cursors"][:-1]}, _session(request))
+
+
+async def _sem_step(q, typ, einreicher, status, von, bis, pager, step: int, request):
+    """Blättern in der semantischen Rangliste; Filter geändert → Seite 1 der neuen Suche."""
+    fresh = _sem_pager(q, typ, einreicher, status, von, bis)
+    if pager.get("key") != fresh["key"]:
+        return await _semantic_page(q, typ, einreicher, status, von, bis, fresh, _session(request))
+    return await _semantic_page(q, typ, einreicher, status, von, bis,
+                                {**pager, "page": int(pager.get("page") or 1) + step}, _session(request))
 
 
 def show_detail(typ, id_):
-    d = get_vorgang_detail(typ, id_)
+    id_ = (id_ or "").strip().strip("`")
+    if not typ or not id_:
+        return "Bitte Typ und ID angeben."
+    try:
+        d = get_vorgang_detail(typ, id_)
+    except Exception:
+        d = None                     # z. B. ungültige UUID → wie nicht gefunden
     if not d:
         return "Nicht gefunden."
     log_action("detail", {"typ": typ}, id_)
@@ -386,6 +1314,17 @@ def show_detail(typ, id_):
     if pdf_url and pdf_url.startswith(("http://","https://")):
         pdf_line = f"\n**PDF:** [🔗 Original-PDF]({pdf_url})"
 
+    # "Siehe auch": ungefiltert → meist ein Read auf vorgang_nachbarn
+    try:
+        nachbarn = aehnliche_vorgaenge(id_, limit=SIEHE_AUCH_N)
+    except Exception:
+        nachbarn = []
+    siehe_auch = ""
+    if nachbarn:
+        siehe_auch = "\n**Siehe auch:**\n" + "\n".join(
+            f"- {n.get('titel') or '(ohne Titel)'} ({n.get('drucksache') or n.get('typ') or ''}) · ID: `{n.get('id')}`"
+            for n in nachbarn) + "\n"
+
     return (
     f"### {d.get('titel','(ohne Titel)')}\n"
     f"**Typ:** {typ}  \n"
@@ -396,12 +1335,229 @@ def show_detail(typ, id_):
     f"**Inhalt:**\n{d.get('inhalt') or ''}\n\n"
     f"**Drucksache:** {d.get('drucksache','-')}  \n"
     f"{pdf_line}\n"
+    f"{siehe_auch}"
+    )
+
+
+async def show_aehnliche(id_, typ, einreicher, status, von, bis):
+    """Detail-Tab: ähnliche Vorgänge zur ID, mit den Filtern der Suche."""
+    id_ = (id_ or "").strip().strip("`")
+    if not id_:
+        return "Bitte ID angeben."
+    try:
+        rows = await asyncio.to_thread(aehnliche_vorgaenge, id_, typ=typ, einreicher=einreicher,
+                                       status=status, von=von, bis=bis)
+    except Exception as e:
+        return f"Ähnliche Vorgänge nicht verfügbar: {e}"
+    log_action("aehnliche", {"typ": typ, "status": status, "von": von, "bis": bis}, id_)
+    if not rows:
+        return "_Keine ähnlichen Vorgänge (oder kein Vektor zu dieser ID)._"
+    return f"**{len(rows)} ähnliche Vorgänge**\n\n" + "\n\n---\n\n".join(_render_ranked(rows))
+
+
+def _facet_choices(base: list[str], counts: list[tuple[str, int]], selected) -> list[tuple[str, str]]:
+    """(Label mit Anzahl, Wert): bekannte Werte zuerst, dann neue aus den Daten; Auswahl bleibt wählbar."""
+    n = dict(counts)
+    values = list(base) + [v for v, _ in counts if v not in base]
+    values += [v for v in (_as_list_or_none(selected) or []) if v not in values]
+    return [(f"{v} ({n.get(v, 0)})", v) for v in values]
+
+
+async def update_facets(q, typ, einreicher, status, von, bis):
+    """Nach der klassischen Suche (und beim Laden): Auswahllisten mit Trefferzahlen füllen."""
+    try:
+        f = await asyncio.to_thread(facet_counts, q=q or "", typ=typ or None, einreicher=einreicher or None,
+                                    status=status or None, datum_von=von or None, datum_bis=bis or None)
+    except Exception as e:
+        print(f"[!] Facetten fehlgeschlagen: {e}")
+        return gr.update(), gr.update(), gr.update(), gr.update()
+    jahre = sorted(f["jahr"], reverse=True)
+    jahre_md = ("**Jahre:** " + " · ".join(f"{j} ({n})" for j, n in jahre)) if jahre else ""
+    return (
+        gr.update(choices=_facet_choices(TYP_CHOICES, f["typ"], typ), value=typ or []),
+        gr.update(choices=_facet_choices(EINREICHER_CHOICES, f["einreicher"], einreicher), value=einreicher or []),
+        gr.update(choices=_facet_choices(STATUS_CHOICES, f["status"], status), value=status),
+        jahre_md,
     )
 
 
-def export_pdf_placeholder():
-    # Platzhalter – hier später HTML->PDF (weasyprint/wkhtmltopdf) einbauen
-    return "🖨️ PDF-Export kommt als nächster Schritt (HTML-Render + PDF)."
+def _queue_status():
+    """
+    Status der Gradio-Queue (wie /queue/status) – Gradio hat dafür keine öffentliche
+    Python-API, also nur wenn die Interna so aussehen wie erwartet; sonst None.
+    """
+    get_status = getattr(getattr(demo, "_queue", None), "get_status", None)
+    if not callable(get_status):
+        return None
+    try:
+        st = get_status()
+    except Exception:
+        return None
+    return st if hasattr(st, "queue_size") else None
+
+
+def serving_status() -> str:
+    """Queue-Tiefe, Limits und Cache-Trefferquoten dieses Prozesses (Button + API "status")."""
+    lines = [f"**Worker** {WORKER_INDEX + 1}/{WORKERS} · Queue max {QUEUE_MAX} · "
+             f"Limits filter={FILTER_CONCURRENCY}, semantik={SEM_CONCURRENCY}, default={DEFAULT_CONCURRENCY}"]
+    st = _queue_status()
+    if st is None:
+        lines.append("**Queue:** Status in dieser Gradio-Version nicht lesbar")
+    else:
+        eta = getattr(st, "rank_eta", None)
+        lines.append(f"**Queue:** {st.queue_size} wartend" + (f", ETA {eta:.1f}s" if eta else ""))
+    lg = ACCESS_LOG.stats()
+    lines.append(f"**Zugriffslog:** {lg['pending']} wartend, {lg['written']} geschrieben, "
+                 f"{lg['dropped']} verworfen, {lg['failed']} fehlgeschlagen")
+    lines.append(f"**Prefetch:** {'an' if PREFETCH_ENABLED else 'aus'}, {_PREFETCH_INFLIGHT['n']}/{PREFETCH_MAX} laufend")
+    for cache in (EMB_CACHE, COUNT_CACHE, PAGE_CACHE, FACET_CACHE, PREFETCH, SEM_RESULTS):
+        c = cache.stats()
+        lines.append(f"- Cache `{c['name']}`: {c['size']}/{c['maxsize']}, Trefferquote {c['hit_rate']:.0%}"
+                     + (f", {c['coalesced']} zusammengelegt" if c.get("coalesced") else "")
+                     + (" (geteilt)" if c["shared"] else ""))
+    lines.append(f"- Vektor-Suchen zusammengelegt: {SEM_FLIGHT.coalesced}")
+    return "  \n".join(lines)
+
+
+# --- Export ---
+# Läuft in einem Worker-Thread und schreibt blockweise (iter_vorgaenge) direkt in eine
+# Datei unter KALLI_EXPORT_DIR; der Handler meldet nur den Fortschritt. Dateien älter
+# als EXPORT_KEEP Sekunden werden beim nächsten Export gelöscht.
+EXPORT_MAX = int(os.getenv("KALLI_EXPORT_MAX", "2000"))            # max. Vorgänge je Export
+EXPORT_CHUNK = int(os.getenv("KALLI_EXPORT_CHUNK", "50"))          # Zeilen je Keyset-Block (mit inhalt)
+EXPORT_CONCURRENCY = int(os.getenv("KALLI_EXPORT_CONCURRENCY", "2"))
+EXPORT_DIR = os.getenv("KALLI_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "kalli_export"))
+EXPORT_KEEP = 3600
+
+def _export_path(suffix: str) -> str:
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    now = time.time()
+    for name in os.listdir(EXPORT_DIR):
+        full = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(full) > EXPORT_KEEP:
+                os.remove(full)
+        except OSError:
+            pass
+    fd, path = tempfile.mkstemp(prefix=f"bvv_export_{datetime.now():%Y%m%d_%H%M}_", suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+    return path
+
+def _filter_text(q, typ, einreicher, status, von, bis) -> str:
+    parts = [f"{label}: {', '.join(map(str, v)) if isinstance(v, list) else v}"
+             for label, v in (("Suche", q), ("Typ", typ), ("Eingereicht von", einreicher),
+                              ("Status", status), ("Von", von), ("Bis", bis)) if v]
+    return " · ".join(parts) or "ohne Filter"
+
+def _write_pdf(path: str, rows, title: str, subtitle: str, progress: dict):
+    """Zeilen (Generator) in eine PDF-Datei streamen; progress["n"] zählt mit, progress["stop"] bricht ab."""
+    with open(path, "wb") as f:
+        pdf = StreamingPDF(f, title=title, footer=f"{APP_TITLE} · Export {datetime.now():%d.%m.%Y %H:%M}")
+        pdf.heading(title, size=16)
+        pdf.paragraph(subtitle, size=9, space_after=10)
+        for row in rows:
+            if progress.get("stop"):
+                break
+            pdf.heading(row.get("titel") or "(ohne Titel)")
+            meta = " · ".join(str(row.get(c)) for c in ("typ", "status", "datum", "fraktion", "einreicher")
+                              if row.get(c))
+            if row.get("drucksache"):
+                meta += f" · Drucksache {row['drucksache']}"
+            pdf.paragraph(meta, size=9)
+            pdf.paragraph(row.get("inhalt") or "", size=10)
+            if row.get("pdf_url"):
+                pdf.paragraph(f"PDF: {row['pdf_url']}", size=8)
+            pdf.rule()
+            progress["n"] += 1
+        pdf.close()
+
+async def _run_export(write, label: str, suffix: str, limit: int = EXPORT_MAX):
+    """
+    Export im Worker-Thread starten und Fortschritt melden (Async-Generator → 2 Outputs:
+    Statuszeile, Datei). Bricht der Client ab, stoppt auch der Worker.
+    """
+    progress = {"n": 0, "stop": False}
+    path = _export_path(suffix)
+    task = asyncio.create_task(asyncio.to_thread(write, path, progress))
+    try:
+        while not task.done():
+            yield f"⏳ {label} wird erstellt … {progress['n']} Vorgänge", gr.update(visible=False)
+            await asyncio.wait({task}, timeout=1.0)
+        task.result()
+    except Exception as e:
+        yield f"❌ {label} fehlgeschlagen: {e}", gr.update(visible=False)
+        return
+    finally:
+        progress["stop"] = True
+    n = progress["n"]
+    hint = f" (auf {limit} begrenzt)" if n >= limit else ""
+    yield f"✓ {label}: {n} Vorgänge{hint}", gr.update(value=path, visible=True)
+
+async def export_pdf(q, typ, einreicher, status, von, bis, sort):
+    """PDF aller Treffer der aktuellen Filter (inkl. Volltext), seitenweise geschrieben."""
+    if not _can_search(q, typ, einreicher, status, von, bis):
+        gr.Warning("Bitte Suchbegriff eingeben ODER mind. einen Filter setzen.")
+        yield gr.update(), gr.update()
+        return
+    log_action("export_pdf", {"q": q, "typ": typ, "status": status, "von": von, "bis": bis})
+    rows = iter_vorgaenge(q=q or "", typ=typ or None, einreicher=einreicher or None, status=status or None,
+                          datum_von=von or None, datum_bis=bis or None, sort=sort or "datum:desc",
+                          columns=DETAIL_COLUMNS + ",typ", chunk=EXPORT_CHUNK, max_rows=EXPORT_MAX)
+    subtitle = f"{_filter_text(q, typ, einreicher, status, von, bis)} · Stand {datetime.now():%d.%m.%Y %H:%M}"
+
+    def write(path, progress):
+        _write_pdf(path, rows, APP_TITLE, subtitle, progress)
+
+    async for out in _run_export(write, "PDF-Export", ".pdf"):
+        yield out
+
+# Daten-Export (Tabelle): ohne inhalt viel kleiner → größere Blöcke, höhere Grenze.
+# CSV mit ";" + BOM, damit Excel (de) Spalten und Umlaute richtig erkennt;
+# Zellen mit = + - @ am Anfang werden als Text markiert (keine Formel-Injektion, export_csv.py).
+EXPORT_DATA_MAX = int(os.getenv("KALLI_EXPORT_DATA_MAX", "50000"))
+EXPORT_DATA_CHUNK = int(os.getenv("KALLI_EXPORT_DATA_CHUNK", "500"))
+EXPORT_DATA_COLUMNS = "id,typ,titel,datum,status,fraktion,einreicher,drucksache,kategorie,thema,pdf_url"
+EXPORT_FORMATS = ["CSV", "JSONL"]
+
+def _write_rows(path: str, rows, fmt: str, columns: list[str], progress: dict):
+    """Zeilen (Generator) zeilenweise als CSV oder JSONL schreiben; nichts wird gesammelt."""
+    if fmt == "JSONL":
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                if progress.get("stop"):
+                    break
+                f.write(json.dumps({c: row.get(c) for c in columns}, ensure_ascii=False, default=str) + "\n")
+                progress["n"] += 1
+        return
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=columns, delimiter=";", extrasaction="ignore")
+        w.writeheader()
+        for row in rows:
+            if progress.get("stop"):
+                break
+            w.writerow({c: _csv_cell(row.get(c)) for c in columns})
+            progress["n"] += 1
+
+async def export_daten(q, typ, einreicher, status, von, bis, sort, fmt, volltext):
+    """Alle Treffer der aktuellen Filter als CSV/JSONL (Keyset-Blöcke, direkt in die Datei)."""
+    if not _can_search(q, typ, einreicher, status, von, bis):
+        gr.Warning("Bitte Suchbegriff eingeben ODER mind. einen Filter setzen.")
+        yield gr.update(), gr.update()
+        return
+    fmt = fmt if fmt in EXPORT_FORMATS else "CSV"
+    columns = EXPORT_DATA_COLUMNS.split(",") + (["inhalt"] if volltext else [])
+    log_action("export_daten", {"q": q, "typ": typ, "status": status, "von": von, "bis": bis, "fmt": fmt})
+    rows = iter_vorgaenge(q=q or "", typ=typ or None, einreicher=einreicher or None, status=status or None,
+                          datum_von=von or None, datum_bis=bis or None, sort=sort or "datum:desc",
+                          columns=",".join(columns), chunk=EXPORT_CHUNK if volltext else EXPORT_DATA_CHUNK,
+                          max_rows=EXPORT_DATA_MAX)
+
+    def write(path, progress):
+        _write_rows(path, rows, fmt, columns, progress)
+
+    async for out in _run_export(write, f"{fmt}-Export", ".jsonl" if fmt == "JSONL" else ".csv",
+                                 limit=EXPORT_DATA_MAX):
+        yield out
 
 # =============================
 # BLOCK 5 — Gradio UI
@@ -461,17 +1617,22 @@ with gr.Blocks(css=CUSTOM_CSS, title=f"{APP_TITLE} · {__APP_VERSION__}") as dem
         with gr.TabItem("Suche"):
             with gr.Row():
                 q = gr.Textbox(placeholder="Suche (Titel, Text)…", label="Volltext -einfach/semantisch)", scale=3)
-                typ = gr.CheckboxGroup(choices=["antrag","anfrage_muendlich","anfrage_klein","anfrage_gross"], label="Typ", scale=2)
+                typ = gr.CheckboxGroup(choices=TYP_CHOICES, label="Typ", scale=2)
             
+            vorschlaege = gr.Dropdown(choices=[], label="Vorschläge", interactive=True, allow_custom_value=False)
+
             with gr.Row():
-                 einreicher = gr.Dropdown(label="Eingereicht von", choices=["Franck", "Kasper", "Turban"], multiselect=True)
-                 status = gr.Dropdown(label="Status",choices=["eingereicht", "beantwortet", "abgelehnt", "zugestimmt"],multiselect=False)
+                 einreicher = gr.Dropdown(label="Eingereicht von", choices=EINREICHER_CHOICES, multiselect=True)
+                 status = gr.Dropdown(label="Status",choices=STATUS_CHOICES,multiselect=False)
 
             with gr.Row(elem_classes="filters"):
                 with gr.Column(scale=1, min_width=160):
                     sort = gr.Dropdown(choices=["datum:desc","datum:asc"], value="datum:desc", label="Sortierung")
                 with gr.Column(scale=1, min_width=120):
-                    page = gr.Number(value=1, label="Seite", precision=0)
+                    page = gr.Number(value=1, label="Seite", precision=0, interactive=False)
+
+            # Keyset-Cursor für Weiter/Zurück (ersetzt das Rechnen mit der Seitennummer)
+            pager = gr.State(None)
 
 
             # --- nur die Datumsfelder ---
@@ -488,10 +1649,18 @@ with gr.Blocks(css=CUSTOM_CSS, title=f"{APP_TITLE} · {__APP_VERSION__}") as dem
                 btn_next = gr.Button("Weiter ▶️", interactive=False)
                 pager_info = gr.Markdown("1–0 / 0")
                 btn_sem   = gr.Button("🧠 Suche-semantisch", variant="primary") 
+                btn_hybrid = gr.Button("🔀 Suche-hybrid", variant="primary")
                 btn_export = gr.Button("🖨️ Export PDF")
+                btn_daten = gr.Button("⬇️ Export Daten")
                 btn_clear = gr.Button("🧹 Filter zurücksetzen", variant="secondary")
      
       
+            facet_info = gr.Markdown()
+            with gr.Row():
+                export_fmt = gr.Dropdown(choices=EXPORT_FORMATS, value="CSV", label="Datenformat", scale=1)
+                export_voll = gr.Checkbox(label="mit Volltext (inhalt)", value=False, scale=1)
+                export_info = gr.Markdown()
+                export_file = gr.File(label="Export", visible=False)
             results = gr.Markdown(elem_id="results")
 
             # Hier – nach Button-Definition:
@@ -501,30 +1670,92 @@ with gr.Blocks(css=CUSTOM_CSS, title=f"{APP_TITLE} · {__APP_VERSION__}") as dem
                 outputs=[q, typ, einreicher, status, von, bis, sort, page, results]
             )
             btn_search.click(
-                do_search, [q, typ, einreicher, status, von, bis, page, sort], 
-                [results, btn_prev, btn_next, page, pager_info]
+                do_search, [q, typ, einreicher, status, von, bis, pager, sort], 
+                [results, btn_prev, btn_next, page, pager_info, pager],
+                concurrency_limit=FILTER_CONCURRENCY, concurrency_id="filter"
+            ).then(
+                update_facets, [q, typ, einreicher, status, von, bis], [typ, einreicher, status, facet_info],
+                concurrency_limit=FILTER_CONCURRENCY, concurrency_id="filter"
             )
-            btn_next.click(next_page, [q, typ, einreicher, status, von, bis, page, sort], [results, btn_prev, btn_next, page, pager_info])
-            btn_prev.click(prev_page, [q, typ, einreicher, status, von, bis, page, sort], [results, btn_prev, btn_next, page, pager_info])
-            btn_export.click(lambda: export_pdf_placeholder(), [], [results])
+            # Typeahead: bei jeder Eingabe, ohne Queue (lokaler Index, Millisekunden)
+            q.input(suggest, [q], [vorschlaege], api_name="suggest", queue=False,
+                    trigger_mode="always_last", show_progress="hidden")
+            vorschlaege.select(lambda v: v or gr.update(), [vorschlaege], [q], queue=False)
+            # Auswahllisten beim Laden aus den Daten füllen (ungefiltert, gecached)
+            demo.load(update_facets, [q, typ, einreicher, status, von, bis], [typ, einreicher, status, facet_info])
+            btn_next.click(next_page, [q, typ, einreicher, status, von, bis, pager, sort], [results, btn_prev, btn_next, page, pager_info, pager],
+                           concurrency_limit=FILTER_CONCURRENCY, concurrency_id="filter")
+            btn_prev.click(prev_page, [q, typ, einreicher, status, von, bis, pager, sort], [results, btn_prev, btn_next, page, pager_info, pager],
+                           concurrency_limit=FILTER_CONCURRENCY, concurrency_id="filter")
+            btn_export.click(export_pdf, [q, typ, einreicher, status, von, bis, sort], [export_info, export_file],
+                             api_name="export_pdf", concurrency_limit=EXPORT_CONCURRENCY, concurrency_id="export")
+            btn_daten.click(export_daten, [q, typ, einreicher, status, von, bis, sort, export_fmt, export_voll],
+                            [export_info, export_file], api_name="export_daten",
+                            concurrency_limit=EXPORT_CONCURRENCY, concurrency_id="export")
             btn_sem.click(
                 do_search_sem_db,
+                inputs=[q, typ, einreicher, status, von, bis, pager, sort],
+                outputs=[results, btn_prev, btn_next, page, pager_info, pager],
+                concurrency_limit=SEM_CONCURRENCY, concurrency_id="semantik"
+            )
+            btn_hybrid.click(
+                do_search_hybrid,
                 inputs=[q, typ, einreicher, status, von, bis, page, sort],
-                outputs=[results, btn_prev, btn_next, page, pager_info]
+                outputs=[results, btn_prev, btn_next, page, pager_info],
+                concurrency_limit=SEM_CONCURRENCY, concurrency_id="semantik"
             )
 
+            with gr.Accordion("⚙️ Status", open=False):
+                status_md = gr.Markdown()
+                btn_status = gr.Button("📊 Queue & Caches")
+                btn_status.click(serving_status, [], [status_md], api_name="status",
+                                 queue=False)   # am Queue vorbei – soll auch bei voller Queue antworten
+
+
+        # Volltext erst auf Anfrage (Listen liefern nur die Vorschau)
+        with gr.TabItem("Detail"):
+            with gr.Row():
+                in_typ = gr.Dropdown(choices=["antrag","anfrage_muendlich","anfrage_klein","anfrage_gross"], label="Typ")
+                in_id = gr.Textbox(label="ID", placeholder="ID aus der Trefferliste")
+                btn_detail = gr.Button("➡️ Laden")
+                btn_aehnlich = gr.Button("🔗 Ähnliche Vorgänge")
+            detail = gr.Markdown()
+            aehnlich = gr.Markdown()
+            btn_detail.click(show_detail, [in_typ, in_id], [detail], api_name="detail",
+                             concurrency_limit=FILTER_CONCURRENCY, concurrency_id="filter")
+            # Filter aus dem Such-Tab gelten auch hier
+            btn_aehnlich.click(show_aehnliche, [in_id, typ, einreicher, status, von, bis], [aehnlich],
+                               api_name="aehnliche", concurrency_limit=SEM_CONCURRENCY, concurrency_id="semantik")
+
+def _spawn_workers(base_port: int):
+    """Weitere Prozesse auf base_port+1 … starten (gleiches Skript, eigener Index-Ordner)."""
+    procs = []
+    for i in range(1, WORKERS):
+        env = {
+            **os.environ,
+            "KALLI_WORKER_INDEX": str(i),
+            "PORT": str(base_port + i),
+            "KALLI_INDEX_DIR": os.path.join(os.getenv("KALLI_INDEX_DIR", "data/vektor_index"), f"w{i}"),
+        }
+        procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env))
+        print(f"[i] Worker {i + 1}/{WORKERS} auf Port {base_port + i} gestartet")
+    atexit.register(lambda: [p.terminate() for p in procs])
 
-        #with gr.TabItem("Detail"):
-        #    with gr.Row():
-        #        in_typ = gr.Dropdown(choices=["antrag","anfrage_muendlich","anfrage_klein","anfrage_gross"], label="Typ")
-        #        in_id = gr.Textbox(label="ID")
-                #btn_detail = gr.Button("➡️ Laden")
-            #detail = gr.Markdown()
-            #btn_detail.click()
 
 if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 7860))
+    if WORKERS > 1 and WORKER_INDEX == 0:
+        _spawn_workers(port)
+
+    # Modell + Datenstand einmal vorab lesen (noch kein Event-Loop), danach nur noch der Watcher
+    _refresh_kalli_status()
+    _ensure_watcher()
+    threading.Thread(target=_prewarm_embeddings, daemon=True).start()
+    _sync_mirrors()
+
     # Für Deployment (Render, Docker etc.):
-    demo.launch(server_name="0.0.0.0", server_port=int(os.environ.get("PORT", 7860)))
+    demo.queue(max_size=QUEUE_MAX, default_concurrency_limit=DEFAULT_CONCURRENCY)
+    demo.launch(server_name="0.0.0.0", server_port=port)
 
     # Für lokalen Test:
     #demo.launch()
@@ -0,0 +1,163 @@
+# ============================================================
+#  Gepuffertes Zugriffslog für das BVV-Frontend
+#   – log() legt nur in eine begrenzte Queue (kein Netz im Request-Pfad)
+#   – Hintergrund-Thread schreibt in Batches (nach Anzahl ODER Zeit)
+#   – Überlast: verwerfen (Default) oder kurz warten (Backpressure);
+#     im Event-Loop (async Handler) wird nie gewartet, nur verworfen
+#   – atexit + SIGTERM (Container-Stop, p.terminate() der Worker):
+#     Rest wird beim Beenden noch geschrieben
+#
+#  Nur stdlib; das eigentliche Insert kommt als Funktion von außen.
+# ============================================================
+
+import asyncio
+import atexit
+import queue
+import signal
+import sys
+import threading
+import time
+
+_LOGGERS: list = []                 # offene Logger, für den SIGTERM-Handler
+_PREV_SIGTERM = None
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _on_sigterm(signum, frame):
+    """SIGTERM überspringt atexit → erst alle Logger leeren, dann regulär beenden."""
+    for lg in list(_LOGGERS):
+        lg.close()
+    if callable(_PREV_SIGTERM):
+        _PREV_SIGTERM(signum, frame)
+    sys.exit(128 + signum)
+
+
+def _install_sigterm():
+    """Handler einmal setzen (geht nur im Haupt-Thread; sonst bleibt es bei atexit)."""
+    global _PREV_SIGTERM
+    if signal.getsignal(signal.SIGTERM) is _on_sigterm:
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        _PREV_SIGTERM = signal.signal(signal.SIGTERM, _on_sigterm)
+    except (ValueError, OSError):
+        pass
+
+
+class BufferedLogger:
+    """Batcht Log-Zeilen und schreibt sie über insert_fn(rows) im Hintergrund."""
+
+    def __init__(self, insert_fn, maxsize: int = 2000, batch_size: int = 50,
+                 interval: float = 2.0, block_timeout: float = 0.0, name: str = "log"):
+        """
+        insert_fn:      schreibt eine Liste von Dicts (ein Roundtrip)
+        maxsize:        max. wartende Zeilen; darüber wird verworfen
+        batch_size:     spätestens bei so vielen Zeilen schreiben
+        interval:       spätestens nach so vielen Sekunden schreiben
+        block_timeout:  > 0 → bei voller Queue so lange warten (Backpressure), dann verwerfen
+        """
+        self.insert_fn = insert_fn
+        self.batch_size = max(1, int(batch_size))
+        self.interval = float(interval)
+        self.block_timeout = float(block_timeout)
+        self.name = name
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+        self._thread.start()
+        self._closed = False
+        _LOGGERS.append(self)
+        atexit.register(self.close)
+        _install_sigterm()
+
+    def log(self, row: dict) -> bool:
+        """
+        Zeile einreihen. False = verworfen (Queue voll).
+        Backpressure (block_timeout) nur außerhalb eines Event-Loops – ein async
+        Handler darf hier nicht blockieren.
+        """
+        try:
+            if self.block_timeout > 0 and not _in_event_loop():
+                self._q.put(row, timeout=self.block_timeout)
+            else:
+                self._q.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _take_batch(self, wait: bool) -> list[dict]:
+        """Bis batch_size Zeilen holen; wartet höchstens `interval` auf die erste/weitere."""
+        rows = []
+        deadline = time.monotonic() + self.interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            waiting = wait and timeout > 0 and not self._stop.is_set()
+            try:
+                if waiting:
+                    # kurz warten und wieder nachsehen: close() soll den halben Batch nicht verlieren
+                    rows.append(self._q.get(timeout=min(timeout, 0.2)))
+                else:
+                    rows.append(self._q.get_nowait())
+            except queue.Empty:
+                if waiting:
+                    continue
+                break
+        return rows
+
+    def _write(self, rows: list[dict]):
+        for attempt in (1, 2):
+            try:
+                self.insert_fn(rows)
+                self.written += len(rows)
+                return
+            except Exception as e:
+                if attempt == 2:
+                    self.failed += len(rows)
+                    print(f"[!] {self.name}: {len(rows)} Zeilen nicht geschrieben: {e}")
+                else:
+                    time.sleep(0.5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rows = self._take_batch(wait=True)
+            if rows:
+                self._write(rows)
+
+    def flush(self):
+        """Alles Wartende sofort schreiben (im aufrufenden Thread)."""
+        while True:
+            rows = self._take_batch(wait=False)
+            if not rows:
+                break
+            self._write(rows)
+
+    def close(self, timeout: float = 5.0):
+        if self._closed:                     # SIGTERM + atexit → nur einmal
+            return
+        self._closed = True
+        self._stop.set()
+        self._thread.join(timeout)
+        self.flush()
+        if self in _LOGGERS:
+            _LOGGERS.remove(self)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "pending": self._q.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
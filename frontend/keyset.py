@@ -0,0 +1,60 @@
+# ============================================================
+#  Keyset-Paging auf (spalte, id) für PostgREST-Abfragen
+#   Statt OFFSET (Postgres überspringt jede frühere Zeile) merkt sich der
+#   Cursor die letzte Zeile der Seite. id als Tie-Breaker → stabile Seiten
+#   bei gleichem Datum. Zeilen ohne Wert stehen immer am Ende (NULLS LAST),
+#   in beiden Richtungen – so wie im SQLite-Replikat (sqlite_replica.py).
+#
+#  Ohne Abhängigkeiten; `query` ist ein postgrest-py Request-Builder.
+# ============================================================
+
+import base64
+import json
+
+
+def encode_cursor(row: dict, col: str = "datum") -> str:
+    raw = json.dumps([row.get(col), str(row.get("id"))], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        val, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return val, id_
+    except Exception:
+        return None   # kaputter Cursor → von vorn
+
+
+def order_param(col: str, desc: bool) -> str:
+    """PostgREST-order, z. B. 'datum.desc.nullslast,id.desc'."""
+    direction = "desc" if desc else "asc"
+    return f"{col}.{direction}.nullslast,id.{direction}"
+
+
+def apply_order(query, col: str, desc: bool):
+    """
+    Sortierung explizit setzen: postgrest-py hängt bei nullsfirst=False nichts an,
+    DESC wäre dann Postgres-Default NULLS FIRST – der Cursor setzt aber NULLS LAST voraus.
+    """
+    query.params = query.params.set("order", order_param(col, desc))
+    return query
+
+
+def cursor_filter(cursor: str | None, col: str, desc: bool) -> str | None:
+    """or_-Filter für "nach dem Cursor" (passend zu order_param) – oder None."""
+    after = decode_cursor(cursor)
+    if not after:
+        return None
+    val, id_ = after
+    cmp = "lt" if desc else "gt"
+    if val is None:
+        # schon im NULL-Block am Ende: nur noch id entscheidet
+        return f"and({col}.is.null,id.{cmp}.{id_})"
+    return f"{col}.{cmp}.{val},and({col}.eq.{val},id.{cmp}.{id_}),{col}.is.null"
+
+
+def apply_cursor(query, cursor: str | None, col: str, desc: bool):
+    flt = cursor_filter(cursor, col, desc)
+    return query if flt is None else query.or_(flt)
@@ -0,0 +1,161 @@
+# ============================================================
+#  Streamender PDF-Schreiber für den Export
+#   – ohne Fremdbibliothek: PDF 1.4, Helvetica (Standardschrift),
+#     WinAnsi-Kodierung → Umlaute/ß gehen, Exoten werden zu "?"
+#   – jede fertige Seite wird sofort (zlib-komprimiert) in die Datei
+#     geschrieben; im RAM liegt nur die aktuelle Seite + Offsets
+#   – Zeilenumbruch nach Helvetica-Breiten (AFM), A4 hoch
+#
+#  Nur stdlib.
+# ============================================================
+
+import zlib
+from datetime import datetime
+
+PAGE_W, PAGE_H = 595, 842          # A4 in pt
+MARGIN = 50
+LEADING = 1.3                      # Zeilenabstand relativ zur Schriftgröße
+
+# Helvetica-Breiten (1/1000 em) für ASCII 32–126, Rest ≈ 556
+_WIDTHS = dict(zip(
+    " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~",
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278]
+    + [556] * 10
+    + [278, 278, 584, 584, 584, 556, 1015]
+    + [667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667,
+       611, 722, 667, 944, 667, 667, 611]
+    + [278, 278, 278, 469, 556, 333]
+    + [556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500,
+       278, 556, 500, 722, 500, 500, 500]
+    + [334, 260, 334, 584],
+)) | {"Ä": 667, "Ö": 778, "Ü": 722, "ß": 611, "–": 556, "„": 333, "“": 333, "€": 556}
+BOLD_FACTOR = 1.06                 # Helvetica-Bold ist etwas breiter
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    w = sum(_WIDTHS.get(ch, 556) for ch in text) * size / 1000
+    return w * BOLD_FACTOR if bold else w
+
+
+def _escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def wrap(text: str, size: float, width: float, bold: bool = False) -> list[str]:
+    """Absatz → Zeilen, die in `width` passen (überlange Wörter werden hart getrennt)."""
+    lines = []
+    for para in (text or "").replace("\r", "").split("\n"):
+        line = ""
+        for word in para.split():
+            cand = f"{line} {word}" if line else word
+            if text_width(cand, size, bold) <= width:
+                line = cand
+                continue
+            if line:
+                lines.append(line)
+            while text_width(word, size, bold) > width:
+                cut = max(1, int(len(word) * width / text_width(word, size, bold)))
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+class StreamingPDF:
+    """PDF seitenweise in ein Datei-Objekt (binär) schreiben; close() schreibt Seitenbaum + xref."""
+
+    def __init__(self, fileobj, title: str = "", footer: str = ""):
+        self.f = fileobj
+        self.footer = footer
+        self.offsets: list[int] = []        # Objekt-Nr. − 1 → Byte-Offset
+        self.page_ids: list[int] = []
+        self.pages = 0
+        self._pos = 0
+        self._ops: list[bytes] = []
+        self._y = 0.0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # feste Objekte: 1 Katalog, 2 Seitenbaum, 3/4 Schriften, 5 Info (am Ende geschrieben)
+        for _ in range(5):
+            self.offsets.append(0)
+        self._obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._obj(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        self._obj(5, b"<< /Title (" + _escape(title) + b") /Producer (Kalli BVV-Export) /CreationDate (D:"
+                  + datetime.now().strftime("%Y%m%d%H%M%S").encode() + b") >>")
+        self._new_page()
+
+    # ---------- Low-Level ----------
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self._pos += len(data)
+
+    def _obj(self, num: int, body: bytes):
+        self.offsets[num - 1] = self._pos
+        self._write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _alloc(self) -> int:
+        self.offsets.append(0)
+        return len(self.offsets)
+
+    # ---------- Seiten ----------
+
+    def _new_page(self):
+        self._ops = []
+        self._y = PAGE_H - MARGIN
+        self.pages += 1
+
+    def _flush_page(self):
+        if self.footer:
+            self._text(f"{self.footer} · Seite {self.pages}", MARGIN, MARGIN / 2, 8, False)
+        content = zlib.compress(b"\n".join(self._ops))
+        content_id, page_id = self._alloc(), self._alloc()
+        self._obj(content_id, f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode()
+                  + content + b"\nendstream")
+        self._obj(page_id, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W} {PAGE_H}] "
+                            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        self.page_ids.append(page_id)
+        self._ops = []
+
+    def _text(self, text: str, x: float, y: float, size: float, bold: bool):
+        font = b"/F2" if bold else b"/F1"
+        self._ops.append(b"BT " + font + f" {size:g} Tf {x:.1f} {y:.1f} Td (".encode() + _escape(text) + b") Tj ET")
+
+    def _need(self, height: float):
+        if self._y - height < MARGIN:
+            self._flush_page()
+            self._new_page()
+
+    # ---------- API ----------
+
+    def paragraph(self, text: str, size: float = 10, bold: bool = False, space_after: float = 4):
+        step = size * LEADING
+        for line in wrap(text, size, PAGE_W - 2 * MARGIN, bold):
+            self._need(step)
+            self._y -= step
+            if line:
+                self._text(line, MARGIN, self._y, size, bold)
+        self._y -= space_after
+
+    def heading(self, text: str, size: float = 13):
+        self._need(size * LEADING * 3)          # Überschrift nicht allein am Seitenende
+        self.paragraph(text, size=size, bold=True, space_after=2)
+
+    def rule(self, gap: float = 8):
+        self._need(2 * gap)
+        self._y -= gap
+        self._ops.append(f"0.6 w {MARGIN} {self._y:.1f} m {PAGE_W - MARGIN} {self._y:.1f} l S".encode())
+        self._y -= gap
+
+    def close(self):
+        """Letzte Seite, Seitenbaum, Katalog, xref + Trailer schreiben (Datei bleibt offen)."""
+        self._flush_page()
+        kids = " ".join(f"{p} 0 R" for p in self.page_ids)
+        self._obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self._pos
+        self._write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        self._write("".join(f"{off:010d} 00000 n \n" for off in self.offsets).encode())
+        self._write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R /Info 5 0 R >>\n"
+                    f"startxref\n{xref}\n%%EOF\n".encode())
@@ -0,0 +1,105 @@
+# ============================================================
+#  Semantischer Ergebnis-Cache
+#   – Treffer einer Vektor-Suche werden zusammen mit dem Query-Vektor abgelegt
+#   – neue Anfrage mit gleichen Filtern und Cosinus ≥ Schwelle zu einer
+#     gecachten → deren Rangliste wird wiederverwendet
+#     ("Radwege Tempelhof" ≈ "Radweg in Tempelhof": kein Vektor-Scan)
+#   – größenbegrenzt (LRU) + Ablaufzeit; leeren über kalli_cache.register
+# ============================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+# Optional lib: numpy – ohne NumPy rechnet der Vergleich in reinem Python.
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def _unit(vec):
+    if np is not None:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+    n = sum(x * x for x in vec) ** 0.5
+    return [x / n for x in vec] if n else list(vec)
+
+
+class SemanticCache:
+    """Rangliste je (Filter-Signatur, Query-Vektor); Treffer ab Cosinus `threshold`."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 1800.0, threshold: float = 0.95, name: str = ""):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.threshold = float(threshold)
+        self.name = name
+        self.hits = 0
+        self.near_hits = 0          # Treffer über ähnliche (nicht identische) Anfrage
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()   # nr → (signatur, vektor, wert, ablauf)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, sig, vec):
+        """Wert der ähnlichsten gecachten Anfrage mit gleicher Signatur – oder None."""
+        now = time.monotonic()
+        with self._lock:
+            for nr in [nr for nr, e in self._entries.items() if e[3] < now]:
+                del self._entries[nr]               # abgelaufen
+            cands = [(nr, e) for nr, e in self._entries.items() if e[0] == sig]
+        if not cands:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        q = _unit(vec)
+        if np is not None:
+            sims = np.stack([e[1] for _, e in cands]) @ q
+            best = int(np.argmax(sims))
+            sim = float(sims[best])
+        else:
+            sims = [sum(a * b for a, b in zip(e[1], q)) for _, e in cands]
+            best = max(range(len(sims)), key=sims.__getitem__)
+            sim = sims[best]
+
+        with self._lock:
+            if sim < self.threshold:
+                self.misses += 1
+                return None
+            nr, entry = cands[best]
+            if nr in self._entries:
+                self._entries.move_to_end(nr)
+            self.hits += 1
+            if sim < 0.9999:
+                self.near_hits += 1
+        return entry[2]
+
+    def add(self, sig, vec, value):
+        entry = (sig, _unit(vec), value, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[self._next] = entry
+            self._next += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "shared": False,
+        }
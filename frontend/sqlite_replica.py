@@ -0,0 +1,271 @@
+# ============================================================
+#  Lokales SQLite-Replikat von bvv_dokumente
+#   – inkrementeller Abgleich über dokumente_seit() (Keyset updated_at, id)
+#   – FTS5 mit Trigram-Tokenizer: gleiche Semantik wie ilike '%q%'
+#     (Teilstring, Groß/klein egal), aber per Index statt Full Scan
+#   – Indizes für Filter + Sortierung (datum, id)
+#   – Liste / Anzahl / Detail in einstelligen Millisekunden, auch wenn
+#     Supabase gerade nicht antwortet
+#
+#  WAL-Modus: der Sync schreibt, während Leser den letzten Commit sehen.
+# ============================================================
+
+from __future__ import annotations   # Methode "list" verdeckt sonst den Typ list[...]
+
+import os
+import sqlite3
+import threading
+
+COLUMNS = ("id", "typ", "titel", "inhalt", "datum", "kategorie", "thema", "pdf_url",
+           "drucksache", "fraktion", "einreicher", "status", "published", "updated_at")
+FTS_COLUMNS = ("titel", "inhalt", "drucksache", "fraktion")   # wie _apply_filters
+SORTABLE = ("datum", "titel", "updated_at")
+LIST_COLUMNS = ("id", "typ", "titel", "datum", "status", "fraktion", "einreicher",
+                "drucksache", "pdf_url", "kategorie")      # ohne inhalt → schlanke Listen
+TRIGRAM_MIN = 3        # kürzere Suchbegriffe → LIKE (Trigram-Index greift erst ab 3 Zeichen)
+
+SCHEMA = f"""
+create table if not exists dokumente (
+  {", ".join(c + (" text primary key" if c == "id" else "") for c in COLUMNS)}
+);
+create index if not exists dokumente_datum_idx      on dokumente (datum, id);
+create index if not exists dokumente_typ_idx        on dokumente (typ, datum);
+create index if not exists dokumente_status_idx     on dokumente (status, datum);
+create index if not exists dokumente_einreicher_idx on dokumente (einreicher, datum);
+create index if not exists dokumente_drucksache_idx on dokumente (drucksache);
+
+create virtual table if not exists dokumente_fts using fts5(
+  {", ".join(FTS_COLUMNS)}, content='dokumente', content_rowid='rowid', tokenize='trigram'
+);
+create trigger if not exists dokumente_ai after insert on dokumente begin
+  insert into dokumente_fts(rowid, {", ".join(FTS_COLUMNS)})
+  values (new.rowid, {", ".join("new." + c for c in FTS_COLUMNS)});
+end;
+create trigger if not exists dokumente_ad after delete on dokumente begin
+  insert into dokumente_fts(dokumente_fts, rowid, {", ".join(FTS_COLUMNS)})
+  values ('delete', old.rowid, {", ".join("old." + c for c in FTS_COLUMNS)});
+end;
+create trigger if not exists dokumente_au after update on dokumente begin
+  insert into dokumente_fts(dokumente_fts, rowid, {", ".join(FTS_COLUMNS)})
+  values ('delete', old.rowid, {", ".join("old." + c for c in FTS_COLUMNS)});
+  insert into dokumente_fts(rowid, {", ".join(FTS_COLUMNS)})
+  values (new.rowid, {", ".join("new." + c for c in FTS_COLUMNS)});
+end;
+
+create table if not exists sync_state (key text primary key, value text);
+"""
+
+UPSERT = (
+    f"insert into dokumente ({', '.join(COLUMNS)}) values ({', '.join('?' for _ in COLUMNS)}) "
+    f"on conflict(id) do update set {', '.join(f'{c} = excluded.{c}' for c in COLUMNS if c != 'id')}"
+)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("pragma journal_mode = wal")      # Leser blockieren den Sync nicht
+    conn.execute("pragma synchronous = normal")
+    return conn
+
+
+class SqliteReplica:
+    """Lese-Replikat für die klassische Suche; ein Schreiber (Sync), beliebig viele Leser."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    # ---------- Verbindungen ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        """Eine Verbindung pro Thread (sqlite3-Verbindungen nicht parallel teilen)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def _state(self, conn, key: str):
+        row = conn.execute("select value from sync_state where key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ---------- Status ----------
+
+    @property
+    def ready(self) -> bool:
+        return self._state(self._conn(), "seit") is not None
+
+    def __len__(self):
+        return self._conn().execute("select count(*) from dokumente").fetchone()[0]
+
+    # ---------- Abgleich ----------
+
+    def _pull(self, conn, fetch_page, page_size: int, full: bool) -> int:
+        """Seiten holen + upserten. Inkrementell: Commit je Seite; voll: eine Transaktion."""
+        conn.execute("begin")
+        if full:
+            conn.execute("delete from dokumente")
+            conn.execute("delete from sync_state")
+        seit, nach_id = self._state(conn, "seit") or None, self._state(conn, "nach_id")
+        n = 0
+        while True:
+            page = fetch_page(seit, nach_id, page_size) or []
+            if page:
+                seit, nach_id = page[-1]["updated_at"], str(page[-1]["id"])
+                conn.executemany(UPSERT, [
+                    tuple(str(r["id"]) if c == "id" else r.get(c) for c in COLUMNS) for r in page
+                ])
+                conn.executemany("insert or replace into sync_state values (?, ?)",
+                                 [("seit", seit), ("nach_id", nach_id)])
+                n += len(page)
+                if not full:
+                    conn.execute("commit")
+                    conn.execute("begin")
+            if len(page) < page_size:
+                break
+        if seit is None:
+            # leere Quelle: trotzdem als abgeglichen markieren
+            conn.execute("insert or replace into sync_state values ('seit', '')")
+        conn.execute("commit")
+        return n
+
+    def sync(self, fetch_page, page_size: int = 500, full: bool = False) -> int:
+        """
+        Änderungen seit dem Wasserstand einpflegen.
+        fetch_page(seit, nach_id, anzahl) → Zeilen aus bvv_dokumente inkl. updated_at.
+        full=True → alles neu laden (erfasst auch Löschungen); dank WAL sehen Leser
+        bis zum Commit den alten Stand.
+        """
+        with self._sync_lock:
+            conn = self._conn()
+            try:
+                n = self._pull(conn, fetch_page, page_size, full)
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("rollback")
+                raise
+            if full:
+                conn.execute("pragma optimize")
+            return n
+
+    # ---------- Abfragen ----------
+
+    @staticmethod
+    def _where(q=None, typ=None, einreicher=None, status=None, von=None, bis=None):
+        """Filter wie _apply_filters im Frontend → (SQL, Parameter)."""
+        clauses, params = [], []
+        for col, values in (("typ", typ), ("status", status), ("einreicher", einreicher)):
+            if values:
+                clauses.append(f"d.{col} in ({', '.join('?' for _ in values)})")
+                params += list(values)
+        if von:
+            clauses.append("d.datum >= ?")
+            params.append(str(von)[:10])
+        if bis:
+            clauses.append("d.datum <= ?")
+            params.append(str(bis)[:10])
+        q = (q or "").strip()
+        if q:
+            if len(q) >= TRIGRAM_MIN:
+                clauses.append("d.rowid in (select rowid from dokumente_fts where dokumente_fts match ?)")
+                params.append('"' + q.replace('"', '""') + '"')
+            else:
+                clauses.append("(" + " or ".join(f"d.{c} like ?" for c in FTS_COLUMNS) + ")")
+                params += [f"%{q}%"] * len(FTS_COLUMNS)
+        return (" where " + " and ".join(clauses)) if clauses else "", params
+
+    def list(self, *, q=None, typ=None, einreicher=None, status=None, von=None, bis=None,
+             limit: int = 20, after=None, col: str = "datum", desc: bool = True, columns=None) -> list[dict]:
+        """
+        Eine Seite (LIST_COLUMNS + vorschau), sortiert nach col (NULLs zuletzt), dann id
+        – wie _list_vorgaenge_db.
+        after: (wert, id) der letzten Zeile der Vorseite (Keyset-Cursor).
+        columns: stattdessen genau diese Spalten (Export, z. B. inkl. inhalt).
+        """
+        if col not in SORTABLE:
+            raise ValueError(f"Sortierung nach {col!r} nicht unterstützt")
+        if columns and any(c not in COLUMNS for c in columns):
+            raise ValueError(f"Unbekannte Spalte in {columns!r}")
+        where, params = self._where(q, typ, einreicher, status, von, bis)
+        if after:
+            val, id_ = after
+            cmp = "<" if desc else ">"
+            if val is None:
+                cond = f"d.{col} is null and d.id {cmp} ?"
+                params += [id_]
+            else:
+                cond = f"d.{col} {cmp} ? or (d.{col} = ? and d.id {cmp} ?) or d.{col} is null"
+                params += [val, val, id_]
+            where += (" and " if where else " where ") + f"({cond})"
+        order = "desc" if desc else "asc"
+        if columns:
+            cols = ", ".join(f"d.{c}" for c in columns)
+        else:
+            cols = ", ".join(f"d.{c}" for c in LIST_COLUMNS) + ", substr(d.inhalt, 1, 220) as vorschau"
+        sql = (f"select {cols} from dokumente d{where} "
+               f"order by d.{col} is null, d.{col} {order}, d.id {order} limit ?")
+        rows = self._conn().execute(sql, params + [limit]).fetchall()
+        return [dict(r) for r in rows]
+
+    def by_drucksache(self, values, prefix: str | None = None, *, limit: int = 50, typ=None, einreicher=None,
+                      status=None, von=None, bis=None, col: str = "datum", desc: bool = True) -> list[dict]:
+        """Exakte Drucksache(n), sonst Präfix (Bereich auf dem Index statt LIKE); sortiert wie list()."""
+        if col not in SORTABLE:
+            raise ValueError(f"Sortierung nach {col!r} nicht unterstützt")
+        where, params = self._where(None, typ, einreicher, status, von, bis)
+        cols = ", ".join(f"d.{c}" for c in LIST_COLUMNS)
+        if values:
+            cond = f"d.drucksache in ({', '.join('?' for _ in values)})"
+            args = list(values)
+        elif prefix:
+            cond = "d.drucksache >= ? and d.drucksache < ?"
+            args = [prefix, prefix + "\uffff"]
+        else:
+            return []
+        where += (" and " if where else " where ") + cond
+        direction = "desc" if desc else "asc"
+        sql = (f"select {cols}, substr(d.inhalt, 1, 220) as vorschau from dokumente d{where} "
+               f"order by d.{col} is null, d.{col} {direction}, d.id {direction} limit ?")
+        return [dict(r) for r in self._conn().execute(sql, params + args + [limit])]
+
+    def count(self, *, q=None, typ=None, einreicher=None, status=None, von=None, bis=None) -> int:
+        where, params = self._where(q, typ, einreicher, status, von, bis)
+        return self._conn().execute(f"select count(*) from dokumente d{where}", params).fetchone()[0]
+
+    def facets(self, *, q=None, typ=None, einreicher=None, status=None, von=None, bis=None) -> list[dict]:
+        """
+        Trefferzahlen je typ/status/einreicher/jahr – wie facetten() in sql/08_facetten.sql:
+        jede Facette unter allen Filtern außer ihrem eigenen.
+        """
+        filters = dict(q=q, typ=typ, einreicher=einreicher, status=status, von=von, bis=bis)
+        parts, params = [], []
+        for name, expr in (("typ", "d.typ"), ("status", "d.status"), ("einreicher", "d.einreicher"),
+                           ("jahr", "substr(d.datum, 1, 4)")):
+            where, p = self._where(**(filters | ({name: None} if name != "jahr" else {})))
+            parts.append(f"select '{name}' as facette, {expr} as wert, count(*) as anzahl from dokumente d{where} "
+                         f"group by 2 having wert is not null")
+            params += p
+        sql = " union all ".join(parts) + " order by 1, 3 desc"
+        return [dict(r) for r in self._conn().execute(sql, params)]
+
+    def rows(self, ids) -> list[dict]:
+        """Listen-Zeilen (LIST_COLUMNS + vorschau) zu IDs, Reihenfolge wie übergeben."""
+        ids = [str(i) for i in ids]
+        if not ids:
+            return []
+        cols = ", ".join(LIST_COLUMNS)
+        found = {
+            r["id"]: dict(r) for r in self._conn().execute(
+                f"select {cols}, substr(inhalt, 1, 220) as vorschau from dokumente "
+                f"where id in ({', '.join('?' for _ in ids)})", ids)
+        }
+        return [found[i] for i in ids if i in found]
+
+    def detail(self, doc_id) -> dict | None:
+        row = self._conn().execute("select * from dokumente where id = ?", (str(doc_id),)).fetchone()
+        return dict(row) if row else None
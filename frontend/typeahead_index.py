@@ -0,0 +1,177 @@
+# ============================================================
+#  Typeahead-Index für das Suchfeld
+#   – sortierte Liste (Schlüssel, id) + bisect: Präfix → Bereich
+#   – Schlüssel: Titel und Thema ab jedem Wortanfang, Drucksache
+#     (mit und ohne führende Nullen)
+#   – inkrementell über dokumente_kopf_seit() (ohne inhalt); große Batches
+#     → einmal sortieren
+#   – Antwort in wenigen Millisekunden, kein Netz
+#
+#  Nur stdlib. Gehalten werden nur die Felder für die Vorschlagsliste.
+# ============================================================
+
+import bisect
+import re
+import threading
+
+KEY_MAX = 40           # Schlüssel kürzen: spart RAM, Präfixe sind ohnehin kurz
+MIN_PREFIX = 2         # erst ab 2 Zeichen vorschlagen
+SCAN_MAX = 400         # höchstens so viele Einträge je Anfrage ansehen
+BULK_RATIO = 0.1       # Batch > 10 % des Index → neu sortieren statt einfügen
+META_COLUMNS = ("id", "typ", "titel", "drucksache", "datum")
+
+_WORD_RE = re.compile(r"[0-9a-zäöüß/]+")
+
+
+def _norm(text) -> str:
+    """Kleinschreibung, nur Wortzeichen + '/', einfache Leerzeichen."""
+    return " ".join(_WORD_RE.findall(str(text or "").casefold()))
+
+
+def _suffixes(text) -> list[str]:
+    """'Radwege in Tempelhof' → ['radwege in tempelhof', 'in tempelhof', 'tempelhof']."""
+    words = _norm(text).split()
+    return [" ".join(words[i:])[:KEY_MAX] for i in range(len(words))]
+
+
+def _drucksache_keys(ds) -> list[str]:
+    ds = _norm(ds).replace(" ", "")
+    if not ds:
+        return []
+    return list(dict.fromkeys([ds, ds.lstrip("0") or ds]))
+
+
+def _keys(row: dict) -> list[str]:
+    keys = _suffixes(row.get("titel")) + _suffixes(row.get("thema")) + _drucksache_keys(row.get("drucksache"))
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+class PrefixIndex:
+    """Präfix-Suche über Titel/Thema/Drucksache; thread-sicher über ein Lock."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.entries: list[tuple[str, str]] = []    # sortiert: (schlüssel, id)
+        self.docs: dict[str, dict] = {}             # id → Meta + "_keys"/"_titel"/"_ds"
+        self.watermark = [None, None]               # (updated_at, id)
+
+    # ---------- Status ----------
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.docs)
+
+    def __len__(self):
+        return len(self.docs)
+
+    # ---------- Pflege ----------
+
+    @staticmethod
+    def _meta(row: dict) -> dict:
+        doc_id = str(row["id"])
+        return {c: (doc_id if c == "id" else row.get(c)) for c in META_COLUMNS} | {
+            "_keys": _keys(row),
+            "_titel": _norm(row.get("titel")),
+            "_ds": _drucksache_keys(row.get("drucksache")),
+            "_stand": row.get("updated_at"),
+        }
+
+    def update(self, rows: list[dict]):
+        """Vorgänge (neu oder geändert) übernehmen."""
+        self._apply({str(r["id"]): self._meta(r) for r in rows})
+
+    def _apply(self, new: dict):
+        if not new:
+            return
+        with self._lock:
+            if len(new) > BULK_RATIO * len(self.entries):
+                # viel Neues: alte Einträge herausfiltern, anhängen, einmal sortieren
+                self.entries = [e for e in self.entries if e[1] not in new]
+                for doc_id, meta in new.items():
+                    self.entries.extend((k, doc_id) for k in meta["_keys"])
+                self.entries.sort()
+            else:
+                for doc_id, meta in new.items():
+                    old = self.docs.get(doc_id)
+                    for k in (old["_keys"] if old else ()):
+                        i = bisect.bisect_left(self.entries, (k, doc_id))
+                        if i < len(self.entries) and self.entries[i] == (k, doc_id):
+                            del self.entries[i]
+                    for k in meta["_keys"]:
+                        bisect.insort(self.entries, (k, doc_id))
+            self.docs.update(new)
+
+    def sync(self, fetch_page, page_size: int = 500, full: bool = False) -> int:
+        """
+        Änderungen seit dem Wasserstand einpflegen.
+        fetch_page(seit, nach_id, anzahl) → Vorgänge (Kopfspalten) inkl. updated_at.
+        full=True → neu aufbauen (erfasst auch Löschungen); bis dahin bleibt der alte Stand sichtbar.
+        """
+        with self._sync_lock:
+            target = PrefixIndex() if full else self
+            watermark = list(target.watermark)
+            new = {}                    # erst sammeln (nur Meta, kein inhalt), dann einmal einpflegen
+            while True:
+                page = fetch_page(watermark[0], watermark[1], page_size) or []
+                for row in page:
+                    old = target.docs.get(str(row["id"]))
+                    if old is None or old["_stand"] != row.get("updated_at"):    # Nachlauf: bekannt → weg
+                        new[str(row["id"])] = self._meta(row)
+                if page:
+                    watermark = [page[-1]["updated_at"], str(page[-1]["id"])]
+                if len(page) < page_size:
+                    break
+            target._apply(new)
+            with self._lock:
+                if full:
+                    self.entries, self.docs = target.entries, target.docs
+                self.watermark = watermark
+            return len(new)
+
+    # ---------- Abfrage ----------
+
+    def _scan(self, prefix: str) -> list[str]:
+        """IDs (eindeutig, in Schlüsselreihenfolge) aller Schlüssel mit diesem Präfix."""
+        ids = {}
+        i = bisect.bisect_left(self.entries, (prefix,))
+        for key, doc_id in self.entries[i:i + SCAN_MAX]:
+            if not key.startswith(prefix):
+                break
+            ids[doc_id] = None
+        return list(ids)
+
+    def suggest(self, text: str, k: int = 8) -> list[dict]:
+        """
+        Vorschläge zu `text`: Drucksache-Treffer zuerst, dann Titelanfang,
+        dann Wortanfang in Titel/Thema; jeweils neueste zuerst.
+        Mehrere Wörter, die nicht zusammenhängend passen ("radweg tempel"):
+        erstes Wort als Präfix, die übrigen müssen als Wortanfang vorkommen.
+        """
+        prefix = _norm(text)[:KEY_MAX]
+        if len(prefix) < MIN_PREFIX:
+            return []
+        with self._lock:
+            ids = self._scan(prefix)
+            words = prefix.split()
+            if len(ids) < k and len(words) > 1:
+                rest, seen = words[1:], set(ids)
+                for doc_id in self._scan(words[0]):
+                    if doc_id in seen:
+                        continue
+                    titel_words = self.docs[doc_id]["_titel"].split()
+                    if all(any(w.startswith(r) for w in titel_words) for r in rest):
+                        ids.append(doc_id)
+            metas = [self.docs[i] for i in ids]
+
+        def _group(m):
+            if any(d.startswith(prefix) for d in m["_ds"]):
+                return 0
+            return 1 if m["_titel"].startswith(prefix) else 2
+
+        metas.sort(key=lambda m: str(m.get("datum") or ""), reverse=True)   # neueste zuerst …
+        metas.sort(key=_group)                                              # … je Gruppe (stabil)
+        return [{c: m.get(c) for c in META_COLUMNS} for m in metas[:k]]
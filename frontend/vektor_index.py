@@ -0,0 +1,255 @@
+# ============================================================
+#  Lokaler Vektor-Index für die semantische Suche
+#   – alle Embeddings aus vorgang_embeddings als float16/float32-Matrix
+#     (auf Platte als .npy, geladen per Memory-Map)
+#   – Top-k per NumPy (Skalarprodukt auf normierten Vektoren = Cosinus)
+#   – Filter-Bitmaps für typ/status/einreicher + Datums-Array
+#   – inkrementeller Abgleich über vektoren_seit() (sql/04_vektor_sync.sql)
+#
+#  Wenige zehntausend BVV-Dokumente passen locker in den RAM:
+#  30.000 × 1536 × float32 ≈ 180 MB, eine Abfrage ≈ 15 ms (BLAS).
+#  float16 halbiert den Speicher, kostet aber ~10× Rechenzeit (Umwandlung je Block).
+#  Ein ANN-Graph (HNSW/IVF) lohnt erst bei deutlich mehr Vektoren.
+# ============================================================
+
+import json
+import os
+import threading
+from datetime import date
+
+# Optional lib: numpy – ohne NumPy bleibt die Suche beim Supabase-RPC.
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Spalten, die pro Vorgang zum Rendern im Index liegen
+META_COLUMNS = ("id", "typ", "titel", "datum", "status", "fraktion",
+                "einreicher", "drucksache", "pdf_url", "vorschau")
+FACETS = ("typ", "status", "einreicher")
+_CHUNK = 4096          # Zeilen pro Matmul-Block (begrenzt den float32-Zwischenspeicher)
+
+
+def _ordinal(d) -> int:
+    """ISO-Datum → Tageszahl (−1 = kein Datum)."""
+    if not d:
+        return -1
+    try:
+        return date.fromisoformat(str(d)[:10]).toordinal()
+    except ValueError:
+        return -1
+
+
+class _Snapshot:
+    """Unveränderlicher Stand: wird bei jedem Sync komplett ersetzt (lesende Threads ohne Lock)."""
+
+    def __init__(self, mat, rows: list[dict]):
+        self.mat = mat
+        self.rows = rows
+        self.pos = {r["id"]: i for i, r in enumerate(rows)}
+        self.dates = np.array([_ordinal(r.get("datum")) for r in rows], dtype=np.int32)
+        self.bitmaps: dict[str, dict] = {}
+        for facet in FACETS:
+            values: dict = {}
+            for i, r in enumerate(rows):
+                values.setdefault(r.get(facet), []).append(i)
+            maps = {}
+            for value, idx in values.items():
+                bm = np.zeros(len(rows), dtype=bool)
+                bm[idx] = True
+                maps[value] = bm
+            self.bitmaps[facet] = maps
+
+
+class VektorIndex:
+    """Lokaler Vektor-Index mit Filter-Bitmaps; Zustand liegt unter `path`."""
+
+    def __init__(self, path: str, dtype: str = "float32"):
+        if np is None:
+            raise RuntimeError("numpy fehlt → pip install numpy")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.model = None
+        self.watermark = [None, None]       # (geaendert, id) des zuletzt gesehenen Vektors
+        self._snap: _Snapshot | None = None
+        self._sync_lock = threading.Lock()
+
+    # ---------- Status ----------
+
+    @property
+    def ready(self) -> bool:
+        return self._snap is not None and len(self._snap.rows) > 0
+
+    @property
+    def dims(self) -> int | None:
+        return int(self._snap.mat.shape[1]) if self._snap is not None else None
+
+    def __len__(self):
+        return len(self._snap.rows) if self._snap is not None else 0
+
+    def row(self, doc_id) -> dict | None:
+        snap = self._snap
+        if snap is None:
+            return None
+        i = snap.pos.get(str(doc_id))
+        return None if i is None else snap.rows[i]
+
+    def vector(self, doc_id):
+        """Gespeicherter (normierter) Vektor eines Vorgangs als float32 – oder None."""
+        snap = self._snap
+        if snap is None:
+            return None
+        i = snap.pos.get(str(doc_id))
+        return None if i is None else np.asarray(snap.mat[i], dtype=np.float32)
+
+    # ---------- Persistenz ----------
+
+    def _files(self):
+        return os.path.join(self.path, "vektoren.npy"), os.path.join(self.path, "meta.json")
+
+    def load(self) -> bool:
+        """Stand von Platte laden (Matrix per Memory-Map). False, wenn nichts da ist."""
+        npy, meta = self._files()
+        if not (os.path.exists(npy) and os.path.exists(meta)):
+            return False
+        with open(meta, "r", encoding="utf-8") as f:
+            m = json.load(f)
+        mat = np.load(npy, mmap_mode="r")
+        if mat.dtype != self.dtype or mat.shape[0] != len(m["rows"]):
+            return False                      # Format geändert → neu aufbauen
+        self.model = m.get("model")
+        self.watermark = m.get("watermark") or [None, None]
+        self._snap = _Snapshot(mat, m["rows"])
+        return True
+
+    def _save(self, mat, rows):
+        os.makedirs(self.path, exist_ok=True)
+        npy, meta = self._files()
+        # erst schreiben, dann atomar umbenennen → nie halbe Dateien
+        np.save(npy + ".tmp.npy", mat)
+        with open(meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "watermark": self.watermark, "rows": rows}, f, ensure_ascii=False)
+        os.replace(npy + ".tmp.npy", npy)
+        os.replace(meta + ".tmp", meta)
+        return np.load(npy, mmap_mode="r")
+
+    # ---------- Abgleich ----------
+
+    def sync(self, fetch_page, model: str, page_size: int = 500, full: bool = False) -> int:
+        """
+        Änderungen seit dem Wasserstand holen und einpflegen.
+        fetch_page(seit, nach_id, anzahl) → Liste Dicts (META_COLUMNS + embedding + geaendert).
+        full=True oder Modellwechsel → kompletter Neuaufbau.
+        Zeilen mit schon bekanntem geaendert (Nachlauf des Aufrufers) werden übersprungen.
+        Rückgabe: Anzahl neuer/geänderter Vektoren.
+        """
+        with self._sync_lock:
+            snap = self._snap
+            if full or snap is None or model != self.model:
+                rows, pos, watermark = [], {}, [None, None]
+                base = None
+            else:
+                rows, pos, watermark = list(snap.rows), dict(snap.pos), list(self.watermark)
+                base = snap.mat
+
+            changed: dict[int, object] = {}
+            while True:
+                page = fetch_page(watermark[0], watermark[1], page_size) or []
+                if not page:
+                    break
+                watermark = [page[-1]["geaendert"], str(page[-1]["id"])]
+                for r in page:
+                    i = pos.get(str(r["id"]))
+                    if i is not None and i not in changed and rows[i].get("geaendert") == r.get("geaendert"):
+                        continue                      # Nachlauf: schon mit diesem Stand im Index
+                    v = np.asarray(r["embedding"], dtype=np.float32)
+                    n = float(np.linalg.norm(v))
+                    v = (v / n) if n else v
+                    meta = {c: (str(r[c]) if c == "id" else r.get(c)) for c in META_COLUMNS}
+                    meta["geaendert"] = r.get("geaendert")
+                    if i is None:
+                        i = len(rows)
+                        pos[meta["id"]] = i
+                        rows.append(meta)
+                    else:
+                        rows[i] = meta
+                    changed[i] = v
+                if len(page) < page_size:
+                    break
+
+            if not changed and base is not None:
+                return 0
+
+            dims = len(next(iter(changed.values()))) if changed else (base.shape[1] if base is not None else 0)
+            mat = np.zeros((len(rows), dims), dtype=self.dtype)
+            if base is not None and base.shape[1] == dims:
+                mat[: base.shape[0]] = base
+            for i, v in changed.items():
+                mat[i] = v
+
+            self.model = model
+            self.watermark = watermark
+            mat = self._save(mat, rows)
+            self._snap = _Snapshot(mat, rows)
+            return len(changed)
+
+    # ---------- Suche ----------
+
+    def _mask(self, snap: _Snapshot, typ=None, status=None, einreicher=None, von=None, bis=None):
+        mask = None
+        for facet, wanted in (("typ", typ), ("status", status), ("einreicher", einreicher)):
+            if not wanted:
+                continue
+            m = np.zeros(len(snap.rows), dtype=bool)
+            for value in wanted:
+                bm = snap.bitmaps[facet].get(value)
+                if bm is not None:
+                    m |= bm
+            mask = m if mask is None else (mask & m)
+        if von:
+            m = snap.dates >= _ordinal(von)
+            mask = m if mask is None else (mask & m)
+        if bis:
+            m = (snap.dates >= 0) & (snap.dates <= _ordinal(bis))
+            mask = m if mask is None else (mask & m)
+        return mask
+
+    def search(self, q_vec, k: int = 20, threshold: float = 0.0, exclude=None, **filters) -> list[dict]:
+        """
+        Top-k nach Cosinus-Ähnlichkeit, Filter vorab per Bitmap.
+        filters: typ/status/einreicher (Listen), von/bis (ISO-Datum).
+        Rückgabe: Render-Zeilen inkl. "similarity", absteigend sortiert.
+        """
+        snap = self._snap
+        if snap is None or not snap.rows:
+            return []
+        q = np.asarray(q_vec, dtype=np.float32)
+        n = float(np.linalg.norm(q))
+        if n:
+            q = q / n
+
+        if snap.mat.dtype == np.float32:
+            scores = np.asarray(snap.mat @ q, dtype=np.float32)
+        else:
+            scores = np.empty(len(snap.rows), dtype=np.float32)
+            for start in range(0, len(snap.rows), _CHUNK):
+                block = np.asarray(snap.mat[start:start + _CHUNK], dtype=np.float32)
+                scores[start:start + _CHUNK] = block @ q
+
+        mask = self._mask(snap, **filters)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        if exclude is not None:
+            for doc_id in exclude:
+                i = snap.pos.get(str(doc_id))
+                if i is not None:
+                    scores[i] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**snap.rows[i], "similarity": float(scores[i])}
+            for i in top
+            if scores[i] > threshold
+        ]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+kNN-Graph: für jeden Vorgang die k ähnlichsten Vorgänge vorberechnen → vorgang_nachbarn.
+
+Ablauf:
+  1. alle Vektoren aus vorgang_embeddings laden (Keyset auf id) und normieren
+  2. voll: blockweise Matrix @ Matrix.T (BLOCK Zeilen je Schritt), Top-k per argpartition
+     inkrementell (Standard): nur betroffene Vorgänge neu rechnen
+       – Vektor neu/geändert seit dem letzten Lauf
+       – Vorgang ohne (vollständige) Nachbarliste
+       – ein Nachbar wurde gelöscht oder geändert (Ähnlichkeit veraltet)
+       – ein neuer/geänderter Vorgang ist ähnlicher als der bisher k-te Nachbar
+  3. betroffene Zeilen in EINER Transaktion ersetzen + Wasserstand setzen
+     (Leser sehen bis zum Commit den alten Graphen)
+
+Auslöser:
+  – embed_from_json_v2.py und backfill_embeddings.py rufen nach dem Schreiben
+    after_ingest() auf (inkrementell; abschalten mit KALLI_KNN_AFTER_INGEST=0)
+  – Cron als Sicherheitsnetz für alles andere (manuelle Edits, Löschungen,
+    fehlgeschlagener Lauf nach der Ingestion), z. B. stündlich:
+      15 * * * *  cd /pfad/zum/repo && python knn_nachbarn.py >> log/knn_nachbarn.log 2>&1
+    Ohne Änderungen endet der Lauf nach dem Laden der Vektoren ("nichts zu tun").
+Anderes Embedding-Modell (kalli_status) oder anderes k → automatisch voller Lauf.
+Der Wasserstand bleibt KALLI_SYNC_LAG_S hinter "jetzt" (spät committende Zeilen);
+Vektoren in diesem Fenster prüft der nächste Lauf erneut.
+k wird mit dem Graphen gespeichert (vorgang_nachbarn_stand + kalli_status.knn_k,
+dort liest es das Frontend); ohne --k gilt das bisherige k, beim ersten Lauf KALLI_KNN_K.
+RAM: alle Vektoren (n × dims float32) + ein Block (BLOCK × n).
+
+Usage:
+  python knn_nachbarn.py              # inkrementell
+  python knn_nachbarn.py --full       # alles neu
+  python knn_nachbarn.py --k 20 --block 512
+"""
+import argparse, os, time
+
+import numpy as np
+
+from bulk_load_v2 import connect
+
+K     = int(os.getenv("KALLI_KNN_K", "10"))      # nur für den ersten Lauf, danach gespeichertes k
+LAG_S = float(os.getenv("KALLI_SYNC_LAG_S", "900"))   # Nachlauf wie bei den Frontend-Spiegeln
+BLOCK = 1024        # Zeilen je Matrixprodukt
+PAGE  = 5000        # Vektoren je Lese-Seite
+
+
+def load_vectors(conn):
+    """(ids, normierte Matrix float32, updated_at je Zeile) – Keyset auf id, nie OFFSET."""
+    ids, stamps, blocks, after = [], [], [], None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, embedding::real[], updated_at
+                  FROM vorgang_embeddings
+                 WHERE (%(after)s::uuid IS NULL OR id > %(after)s::uuid)
+                 ORDER BY id
+                 LIMIT %(limit)s""", {"after": after, "limit": PAGE})
+            rows = cur.fetchall()
+        if not rows:
+            break
+        after = rows[-1][0]
+        ids += [str(r[0]) for r in rows]
+        stamps += [r[2] for r in rows]
+        blocks.append(np.asarray([r[1] for r in rows], dtype=np.float32))
+    if not blocks:
+        return [], np.zeros((0, 0), dtype=np.float32), []
+    mat = np.vstack(blocks)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return ids, mat / norms, stamps
+
+
+def topk(mat, rows, k: int, block: int):
+    """Je Block: (Zeilenindizes, Nachbar-Indizes m × k, Ähnlichkeiten m × k), absteigend."""
+    n = len(mat)
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), block):
+        idx = rows[start:start + block]
+        sims = mat[idx] @ mat.T
+        sims[np.arange(len(idx)), idx] = -np.inf            # sich selbst nicht
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        psims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-psims, axis=1)
+        yield idx, np.take_along_axis(part, order, axis=1), np.take_along_axis(psims, order, axis=1)
+
+
+def _stand(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT seit, k, emb_model FROM vorgang_nachbarn_stand WHERE id = 1")
+        return cur.fetchone()
+
+
+def _grenze(conn):
+    """
+    Höchster sicherer Wasserstand: updated_at stempelt now() beim Statement, nicht beim
+    Commit – eine noch offene Transaktion kann später Zeilen mit älterem Stempel
+    sichtbar machen. Also nie über (jetzt − LAG_S) hinaus; der Rest wird erneut geprüft.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT now() - make_interval(secs => %s)", (LAG_S,))
+        return cur.fetchone()[0]
+
+
+def _model(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT emb_model, emb_dims FROM kalli_status WHERE id = 1")
+        row = cur.fetchone()
+    return f"{row[0]}:{row[1] or ''}" if row else ""
+
+
+def _existing(conn) -> dict:
+    """id → (Nachbar-IDs in Rangfolge, Ähnlichkeit des letzten Nachbarn)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, array_agg(nachbar_id ORDER BY rang), min(similarity)
+              FROM vorgang_nachbarn
+             GROUP BY id""")
+        return {str(r[0]): ([str(x) for x in r[1]], float(r[2])) for r in cur.fetchall()}
+
+
+def affected_rows(conn, ids, mat, stamps, seit, k: int, block: int) -> tuple[list[int], list[str]]:
+    """Zeilen, deren Nachbarliste neu berechnet werden muss + IDs, die es nicht mehr gibt."""
+    n = len(ids)
+    pos = {doc_id: i for i, doc_id in enumerate(ids)}
+    changed = [i for i, t in enumerate(stamps) if seit is None or t > seit]
+    changed_set = set(changed)
+    want = min(k, n - 1)
+
+    existing = _existing(conn)
+    gone = [doc_id for doc_id in existing if doc_id not in pos]
+    affected = set(changed)
+    kth = np.full(n, -np.inf, dtype=np.float32)
+    for i, doc_id in enumerate(ids):
+        entry = existing.get(doc_id)
+        if entry is None:
+            affected.add(i)
+            continue
+        nbrs, last = entry
+        if len(nbrs) < want or any(nb not in pos or pos[nb] in changed_set for nb in nbrs):
+            affected.add(i)
+        kth[i] = last
+
+    # Neue/geänderte Vektoren gegen alle: wo schlagen sie den bisherigen k-ten Nachbarn?
+    if changed:
+        cvec = mat[changed]
+        cidx = np.asarray(changed, dtype=np.int64)
+        for start in range(0, n, block):
+            sims = mat[start:start + block] @ cvec.T
+            own = (cidx >= start) & (cidx < start + block)
+            sims[cidx[own] - start, np.flatnonzero(own)] = -np.inf      # sich selbst nicht
+            hit = np.flatnonzero(sims.max(axis=1) > kth[start:start + block])
+            affected.update((hit + start).tolist())
+    return sorted(affected), gone
+
+
+def write(conn, ids, mat, rows, gone, k: int, block: int, full: bool, seit, model: str) -> int:
+    """Betroffene Nachbarlisten ersetzen (eine Transaktion, COPY statt Einzel-Inserts)."""
+    written = 0
+    with conn.cursor() as cur:
+        if full:
+            cur.execute("DELETE FROM vorgang_nachbarn")     # kein TRUNCATE: Leser sollen nicht warten
+        else:
+            # Listen mit gelöschten Nachbarn sind schon unter rows (affected_rows)
+            drop = [ids[i] for i in rows] + gone
+            for start in range(0, len(drop), PAGE):
+                cur.execute("DELETE FROM vorgang_nachbarn WHERE id = ANY(%s::uuid[])", (drop[start:start + PAGE],))
+        t0 = time.monotonic()
+        with cur.copy("COPY vorgang_nachbarn (id, rang, nachbar_id, similarity) FROM STDIN") as cp:
+            for idx, nbrs, sims in topk(mat, rows, k, block):
+                for i, row_nbrs, row_sims in zip(idx, nbrs, sims):
+                    for rang, (j, s) in enumerate(zip(row_nbrs, row_sims), start=1):
+                        cp.write_row((ids[i], rang, ids[j], float(s)))
+                written += len(idx)
+                rate = written / max(time.monotonic() - t0, 1e-6)
+                print(f"[~] {written}/{len(rows)} Vorgänge · {rate:.0f}/s")
+        cur.execute("""
+            INSERT INTO vorgang_nachbarn_stand (id, seit, k, emb_model, updated_at) VALUES (1, %s, %s, %s, now())
+            ON CONFLICT (id) DO UPDATE SET seit = EXCLUDED.seit, k = EXCLUDED.k,
+                                           emb_model = EXCLUDED.emb_model, updated_at = now()""",
+                    (seit, k, model))
+        cur.execute("UPDATE kalli_status SET knn_k = %s WHERE id = 1", (k,))
+    conn.commit()
+    return written
+
+
+def run(k: int | None = None, block: int = BLOCK, full: bool = False):
+    with connect() as conn:
+        model = _model(conn)
+        stand = _stand(conn)
+        if k is None:
+            k = stand[1] if stand else K
+        if not full and (stand is None or stand[1] != k or stand[2] != model):
+            print("[i] Kein passender Wasserstand (erstmals / anderes k / anderes Modell) → voller Lauf")
+            full = True
+
+        t0 = time.monotonic()
+        grenze = _grenze(conn)                                    # vor dem Laden bestimmen
+        ids, mat, stamps = load_vectors(conn)
+        print(f"[i] {len(ids)} Vektoren geladen ({mat.shape[1] if len(ids) else 0} Dim.) in {time.monotonic() - t0:.1f}s")
+        seit = min(max(stamps), grenze) if stamps else (stand[0] if stand else None)
+
+        if full:
+            rows, gone = list(range(len(ids))), []
+        else:
+            rows, gone = affected_rows(conn, ids, mat, stamps, stand[0], k, block)
+            if not rows and not gone:
+                print("[✓] Nachbarn aktuell – nichts zu tun.")
+                return
+            print(f"[i] Inkrementell: {len(rows)} Nachbarlisten neu, {len(gone)} gelöschte Vorgänge")
+
+        n = write(conn, ids, mat, rows, gone, k, block, full, seit, model)
+        print(f"[✓] vorgang_nachbarn: {n} Vorgänge × {min(k, max(len(ids) - 1, 0))} Nachbarn "
+              f"in {time.monotonic() - t0:.1f}s")
+
+
+def after_ingest():
+    """Nach der Ingestion: inkrementeller Lauf. Fehler nur melden – den Rest holt der Cron-Lauf."""
+    if os.getenv("KALLI_KNN_AFTER_INGEST", "1") != "1":
+        return
+    try:
+        run()
+    except Exception as e:
+        print(f"[!] kNN-Graph nicht aktualisiert: {e} → später: python knn_nachbarn.py")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="kNN-Graph über vorgang_embeddings → vorgang_nachbarn")
+    ap.add_argument("--k", type=int, default=None,
+                    help="Nachbarn je Vorgang (Default: bisheriges k, beim ersten Lauf KALLI_KNN_K)")
+    ap.add_argument("--block", type=int, default=BLOCK, help="Zeilen je Matrixprodukt (RAM: block × n × 4 Byte)")
+    ap.add_argument("--full", action="store_true", help="alles neu berechnen")
+    args = ap.parse_args()
+
+    run(k=args.k, block=args.block, full=args.full)
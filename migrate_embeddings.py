@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Modellwechsel für die Embeddings – ohne Downtime der Suche.
+
+Ablauf:
+  1. Schattentabelle vorgang_embeddings_neu (vector(<dims>)) anlegen
+  2. alle Vorgänge aus bvv_dokumente per Keyset-Paging (id) lesen,
+     in Batches neu embedden und in den Schatten schreiben
+     (Fortschritt + Durchsatz; Abbruch/Neustart setzt dort fort, wo er war)
+  3. Nachzügler (während der Migration neu eingespielte Vorgänge) nachziehen
+  4. Cutover in EINER Transaktion: Tabellen tauschen + kalli_status setzen.
+     match_bvv_dokumente löst vorgang_embeddings per Name auf → schaltet sofort um.
+
+Die alte Tabelle bleibt als vorgang_embeddings_alt liegen (Rollback = zurück tauschen).
+Vorgänge, die während der Migration inhaltlich geändert werden, danach erneut einspielen.
+
+Usage:
+  python migrate_embeddings.py --model text-embedding-3-large --dims 1536
+  python migrate_embeddings.py --model text-embedding-3-large --no-cutover   # nur befüllen
+  python migrate_embeddings.py --model text-embedding-3-large --cutover-only
+"""
+import argparse, sys, time
+
+from bulk_load_v2 import connect, vector_literal
+from embed_from_json_v2 import embed_texts, active_embedding_model, BATCH_SIZE
+
+SHADOW = "vorgang_embeddings_neu"
+OLD    = "vorgang_embeddings_alt"
+HNSW_MAX_DIMS = 2000        # pgvector: HNSW-Index nur bis 2000 Dimensionen
+
+
+def ensure_shadow(conn, dims: int):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SHADOW} (
+                id          uuid primary key,
+                embedding   vector({int(dims)}) not null,
+                updated_at  timestamptz not null default now()
+            )""")
+    conn.commit()
+
+
+def shadow_exists(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (SHADOW,))
+        return bool(cur.fetchone()[0])
+
+
+def _missing_page(conn, after_id, limit: int):
+    """Nächste Seite Vorgänge ohne Schatten-Vektor (Keyset auf id, serverseitig sortiert)."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT d.id, d.titel, d.inhalt
+              FROM bvv_dokumente d
+             WHERE (%(after)s::uuid IS NULL OR d.id > %(after)s::uuid)
+               AND NOT EXISTS (SELECT 1 FROM {SHADOW} s WHERE s.id = d.id)
+             ORDER BY d.id
+             LIMIT %(limit)s""", {"after": after_id, "limit": limit})
+        return cur.fetchall()
+
+
+def _count(conn, sql: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        return int(cur.fetchone()[0])
+
+
+def _missing_count(conn) -> int:
+    return _count(conn, f"SELECT count(*) FROM bvv_dokumente d WHERE NOT EXISTS (SELECT 1 FROM {SHADOW} s WHERE s.id = d.id)")
+
+
+def fill_shadow(conn, model: str, dims: int | None, batch: int) -> int:
+    """Ein Durchlauf über alle fehlenden Vorgänge. Rückgabe: Anzahl geschriebener Vektoren."""
+    total = _missing_count(conn)
+    if not total:
+        return 0
+    print(f"[i] {total} Vorgang/Vorgänge ohne Vektor im Schatten → embedde mit {model} …")
+
+    done, after, t0 = 0, None, time.monotonic()
+    while True:
+        rows = _missing_page(conn, after, batch)
+        if not rows:
+            break
+        after = rows[-1][0]
+        embs = embed_texts([f"Titel: {titel}\n\n{inhalt}" for _, titel, inhalt in rows], model=model, dims=dims)
+
+        with conn.cursor() as cur:
+            cur.executemany(
+                f"""INSERT INTO {SHADOW} (id, embedding) VALUES (%s, %s::vector)
+                    ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding""",
+                [(doc_id, vector_literal(emb)) for (doc_id, _, _), emb in zip(rows, embs)],
+            )
+        conn.commit()
+
+        done += len(rows)
+        elapsed = max(time.monotonic() - t0, 1e-6)
+        rate = done / elapsed
+        eta = (total - done) / rate if rate else 0
+        print(f"[~] {done}/{total} ({done / total:.1%}) · {rate:.1f} Vorgänge/s · Rest ~{eta / 60:.1f} min")
+
+    return done
+
+
+def ensure_index(conn, dims: int):
+    if dims > HNSW_MAX_DIMS:
+        print(f"[!] {dims} Dimensionen > {HNSW_MAX_DIMS}: kein HNSW-Index (Suche läuft dann sequentiell)")
+        return
+    print("[i] Baue HNSW-Index auf dem Schatten (Suche läuft solange auf der alten Tabelle) …")
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {SHADOW}_hnsw ON {SHADOW} USING hnsw (embedding vector_cosine_ops)")
+    conn.commit()
+
+
+def cutover(conn, model: str, dims: int | None) -> bool:
+    """Tabellen atomar tauschen. False, wenn in der Zwischenzeit neue Vorgänge ohne Vektor dazukamen."""
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE vorgang_embeddings IN ACCESS EXCLUSIVE MODE")
+        if _missing_count(conn):
+            conn.rollback()
+            return False
+        cur.execute(f"DROP TABLE IF EXISTS {OLD}")
+        cur.execute(f"ALTER TABLE vorgang_embeddings RENAME TO {OLD}")
+        cur.execute(f"ALTER TABLE {SHADOW} RENAME TO vorgang_embeddings")
+        cur.execute(f"ALTER INDEX IF EXISTS {SHADOW}_hnsw RENAME TO vorgang_embeddings_hnsw_{int(time.time())}")
+        # Trigger (sql/02_ingest_version.sql, sql/04_vektor_sync.sql) hängen an der alten Tabelle
+        cur.execute("""
+            CREATE TRIGGER vorgang_embeddings_ingest_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vorgang_embeddings
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_ingest_version()""")
+        cur.execute("""
+            CREATE TRIGGER vorgang_embeddings_touch
+            BEFORE INSERT OR UPDATE ON vorgang_embeddings
+            FOR EACH ROW EXECUTE FUNCTION touch_updated_at()""")
+        cur.execute("""
+            INSERT INTO kalli_status (id, emb_model, emb_dims, updated_at) VALUES (1, %s, %s, now())
+            ON CONFLICT (id) DO UPDATE SET emb_model = EXCLUDED.emb_model,
+                                           emb_dims = EXCLUDED.emb_dims,
+                                           ingest_version = kalli_status.ingest_version + 1,
+                                           updated_at = now()""", (model, dims))
+        cur.execute("NOTIFY pgrst, 'reload schema'")    # PostgREST-Schema-Cache auffrischen
+    conn.commit()
+    return True
+
+
+def migrate(model: str, dims: int | None, batch: int, do_fill: bool = True, do_cutover: bool = True):
+    if (model, dims) == active_embedding_model():
+        print(f"[i] {model} ist bereits aktiv – nichts zu tun.")
+        return
+
+    with connect() as conn:
+        if not do_fill and not shadow_exists(conn):
+            print(f"[!] Schattentabelle {SHADOW} fehlt – erst ohne --cutover-only befüllen "
+                  f"(python migrate_embeddings.py --model {model} --no-cutover).")
+            sys.exit(2)
+
+        if do_fill:
+            probe = embed_texts(["Dimensionstest"], model=model, dims=dims)[0]
+            ensure_shadow(conn, len(probe))
+            fill_shadow(conn, model, dims, batch)
+            ensure_index(conn, len(probe))
+
+        if not do_cutover:
+            print("[i] Schatten befüllt, Cutover übersprungen (--no-cutover).")
+            return
+
+        for attempt in range(5):
+            fill_shadow(conn, model, dims, batch)    # Nachzügler
+            if cutover(conn, model, dims):
+                n = _count(conn, "SELECT count(*) FROM vorgang_embeddings")
+                print(f"[✓] Cutover: match_bvv_dokumente sucht jetzt auf {n} Vektoren ({model}). Alt: {OLD}")
+                return
+            print(f"[~] Neue Vorgänge während des Cutovers – neuer Versuch ({attempt + 1}/5)")
+
+    print("[!] Cutover nicht möglich (ständig neue Vorgänge?) – später mit --cutover-only wiederholen.")
+    sys.exit(2)
+
+
+# --- Main ---
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Embeddings auf neues Modell migrieren (Schattentabelle + Cutover)")
+    ap.add_argument("--model", required=True, help="z. B. text-embedding-3-large")
+    ap.add_argument("--dims", type=int, help="gekürzte Dimension (nur text-embedding-3-*)")
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE)
+    ap.add_argument("--no-cutover", action="store_true", help="nur Schatten befüllen")
+    ap.add_argument("--cutover-only", action="store_true", help="nur Nachzügler + Umschalten")
+    args = ap.parse_args()
+
+    migrate(args.model, args.dims, args.batch,
+            do_fill=not args.cutover_only, do_cutover=not args.no_cutover)
@@ -0,0 +1,24 @@
+-- ============================================================
+--  kalli_status – eine Zeile mit dem aktiven Embedding-Modell
+--   Wird von migrate_embeddings.py beim Umschalten gesetzt und
+--   von Ingestion/Frontend gelesen (Query-Embeddings müssen zum
+--   Modell der gespeicherten Vektoren passen!).
+-- ============================================================
+
+create table if not exists kalli_status (
+  id          int primary key default 1 check (id = 1),
+  emb_model   text not null default 'text-embedding-3-small',
+  emb_dims    int,                      -- null = native Dimension des Modells
+  updated_at  timestamptz not null default now()
+);
+
+insert into kalli_status (id) values (1) on conflict (id) do nothing;
+
+-- Frontend (ANON-Key) darf lesen, nicht schreiben
+alter table kalli_status enable row level security;
+drop policy if exists kalli_status_lesen on kalli_status;
+create policy kalli_status_lesen on kalli_status for select using (true);
+
+-- match_bvv_dokumente bleibt unverändert: Parameter-Typmods (vector(1536)) gehören
+-- nicht zur Signatur, die Funktion löst vorgang_embeddings bei jedem Aufruf per Name auf.
+-- Das Umbenennen der Schattentabelle beim Cutover schaltet die Suche also atomar um.
@@ -0,0 +1,32 @@
+-- ============================================================
+--  Datenstand-Zähler für Frontend-Caches
+--   Jede schreibende Anweisung auf Quelltabellen / vorgang_embeddings
+--   erhöht kalli_status.ingest_version (Statement-Trigger, nicht pro Zeile).
+--   Das Frontend pollt den Wert und leert seine Caches bei Änderung.
+--   Greift für embed_from_json_v2.py, Bulk-Loader, Backfill UND manuelle Edits.
+-- ============================================================
+
+alter table kalli_status add column if not exists ingest_version bigint not null default 0;
+
+create or replace function bump_ingest_version()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+  update kalli_status set ingest_version = ingest_version + 1, updated_at = now() where id = 1;
+  return null;
+end;
+$$;
+
+do $$
+declare t text;
+begin
+  foreach t in array array['antraege', 'anfragen_klein', 'anfragen_gross', 'anfragen_muendlich', 'vorgang_embeddings'] loop
+    execute format('drop trigger if exists %I on %I', t || '_ingest_version', t);
+    execute format(
+      'create trigger %I after insert or update or delete or truncate on %I
+         for each statement execute function bump_ingest_version()',
+      t || '_ingest_version', t);
+  end loop;
+end $$;
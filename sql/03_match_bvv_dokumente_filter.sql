@@ -0,0 +1,54 @@
+-- ============================================================
+--  match_bvv_dokumente v2 – alle Filter im Vektor-Query
+--   + status_filter / einreicher_filter (vorher Nachfilter im Frontend)
+--   + nur die Spalten fürs Rendern; vorschau = left(inhalt, 220)
+--   + full_text=false spart den kompletten inhalt (Frontend-Liste)
+--   Gefilterte Zeilen fressen so keine Plätze mehr im Top-N.
+--
+--   Alte Aufrufe (GitHub/main.py: query_embedding/threshold/count)
+--   funktionieren unverändert, alle neuen Parameter haben Defaults.
+-- ============================================================
+
+-- Rückgabetyp ändert sich → alte Signatur muss weg
+drop function if exists match_bvv_dokumente(vector, float, int, text[], date, date, boolean);
+
+create or replace function match_bvv_dokumente(
+  query_embedding    vector(1536),
+  match_threshold    float   default 0.3,
+  match_count        int     default 10,
+  typ_filter         text[]  default null,
+  von                date    default null,
+  bis                date    default null,
+  published_only     boolean default false,
+  status_filter      text[]  default null,
+  einreicher_filter  text[]  default null,
+  full_text          boolean default true
+)
+returns table (
+  id uuid, typ text, titel text, datum date, status text, fraktion text,
+  einreicher text, drucksache text, pdf_url text, kategorie text,
+  vorschau text, inhalt text, similarity float
+)
+language sql stable
+as $$
+  select d.id, d.typ, d.titel, d.datum, d.status, d.fraktion,
+         d.einreicher, d.drucksache, d.pdf_url, d.kategorie,
+         left(d.inhalt, 220) as vorschau,
+         case when full_text then d.inhalt end as inhalt,
+         1 - (e.embedding <=> query_embedding) as similarity
+    from vorgang_embeddings e
+    join bvv_dokumente d on d.id = e.id
+   where 1 - (e.embedding <=> query_embedding) > match_threshold
+     and (typ_filter is null or d.typ = any(typ_filter))
+     and (status_filter is null or d.status = any(status_filter))
+     and (einreicher_filter is null or d.einreicher = any(einreicher_filter))
+     and (von is null or d.datum >= von)
+     and (bis is null or d.datum <= bis)
+     and (not published_only or d.published)
+   order by e.embedding <=> query_embedding
+   limit match_count;
+$$;
+
+-- Hinweis HNSW: stark filternde Abfragen können mit einem HNSW-Index weniger als
+-- match_count Treffer liefern. Ab pgvector 0.8 hilft (Rolle/DB-weit):
+--   alter role authenticator set hnsw.iterative_scan = relaxed_order;
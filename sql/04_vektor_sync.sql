@@ -0,0 +1,107 @@
+-- ============================================================
+--  Inkrementeller Abgleich für lokale Indizes im Frontend
+--   – updated_at auf Quelltabellen + vorgang_embeddings (Trigger)
+--   – bvv_dokumente liefert updated_at mit
+--   – vektoren_seit(): Vektoren + Render-Spalten, Keyset auf (geaendert, id)
+--
+--   vektoren_seit ist bewusst eine Funktion und keine View: Views binden
+--   Tabellen per OID, der Cutover in migrate_embeddings.py tauscht
+--   vorgang_embeddings aber per Umbenennen aus.
+-- ============================================================
+
+create or replace function touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+do $$
+declare t text;
+begin
+  foreach t in array array['antraege', 'anfragen_klein', 'anfragen_gross', 'anfragen_muendlich', 'vorgang_embeddings'] loop
+    execute format('alter table %I add column if not exists updated_at timestamptz not null default now()', t);
+    execute format('create index if not exists %I on %I (updated_at, id)', t || '_updated_idx', t);
+    execute format('drop trigger if exists %I on %I', t || '_touch', t);
+    execute format(
+      'create trigger %I before insert or update on %I
+         for each row execute function touch_updated_at()',
+      t || '_touch', t);
+  end loop;
+end $$;
+
+-- neue Spalte nur hinten anhängen (create or replace view erlaubt nichts anderes)
+create or replace view bvv_dokumente as
+  select id, 'antrag'::text as typ, titel, inhalt, datum, kategorie, thema, pdf_url,
+         drucksache, fraktion, einreicher, status, published, updated_at
+    from antraege
+  union all
+  select id, 'anfrage_klein', titel, inhalt, datum, kategorie, thema, pdf_url,
+         drucksache, fraktion, einreicher, status, published, updated_at
+    from anfragen_klein
+  union all
+  select id, 'anfrage_gross', titel, inhalt, datum, kategorie, thema, pdf_url,
+         drucksache, fraktion, einreicher, status, published, updated_at
+    from anfragen_gross
+  union all
+  select id, 'anfrage_muendlich', titel, inhalt, datum, kategorie, thema, pdf_url,
+         drucksache, fraktion, einreicher, status, published, updated_at
+    from anfragen_muendlich;
+
+-- Keyset auf (geaendert, id) mit geaendert = greatest(d.updated_at, e.updated_at).
+-- Darauf gibt es keinen Index – also je Tabelle über den eigenen Index
+-- (updated_at, id) lesen: e_neu = Zeilen, deren jüngste Änderung der Vektor ist,
+-- d_neu = die, bei denen es der Vorgang ist (jede Zeile in genau einem Zweig).
+-- Je Zweig ist geaendert damit genau die Index-Spalte → Top-"anzahl" je Zweig,
+-- zusammenführen, erneut kürzen. Vektor-Cast + Vorschau erst für die Seite.
+-- Wasserstand rückwärts: das Frontend setzt beim ersten Aufruf je Abgleich
+-- einen Nachlauf ab (now()-Stempel können später committen).
+create or replace function vektoren_seit(
+  seit    timestamptz default null,
+  nach_id uuid        default null,
+  anzahl  int         default 500
+)
+returns table (
+  id uuid, typ text, titel text, datum date, status text, fraktion text,
+  einreicher text, drucksache text, pdf_url text, vorschau text,
+  embedding real[], geaendert timestamptz
+)
+language sql stable
+as $$
+  with e_neu as (
+    select e.id, e.updated_at as geaendert
+      from vorgang_embeddings e
+      join bvv_dokumente d on d.id = e.id
+     where (e.updated_at, e.id) > (coalesce(seit, '-infinity'),
+                                   coalesce(nach_id, '00000000-0000-0000-0000-000000000000'))
+       and e.updated_at >= d.updated_at
+     order by e.updated_at, e.id
+     limit anzahl
+  ), d_neu as (
+    select d.id, d.updated_at as geaendert
+      from bvv_dokumente d
+      join vorgang_embeddings e on e.id = d.id
+     where (d.updated_at, d.id) > (coalesce(seit, '-infinity'),
+                                   coalesce(nach_id, '00000000-0000-0000-0000-000000000000'))
+       and d.updated_at > e.updated_at
+     order by d.updated_at, d.id
+     limit anzahl
+  ), seite as (
+    select * from e_neu
+    union all
+    select * from d_neu
+    order by geaendert, id
+    limit anzahl
+  )
+  select d.id, d.typ, d.titel, d.datum, d.status, d.fraktion,
+         d.einreicher, d.drucksache, d.pdf_url, left(d.inhalt, 220) as vorschau,
+         e.embedding::real[] as embedding,
+         s.geaendert
+    from seite s
+    join vorgang_embeddings e on e.id = s.id
+    join bvv_dokumente d on d.id = s.id
+   order by s.geaendert, s.id;
+$$;
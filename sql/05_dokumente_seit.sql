@@ -0,0 +1,24 @@
+-- ============================================================
+--  dokumente_seit() – geänderte Vorgänge für lokale Indizes
+--   (BM25, SQLite-Replikat, Typeahead im Frontend)
+--   Keyset auf (updated_at, id) als Zeilenvergleich → Index (updated_at, id)
+--   je Quelltabelle, Merge Append statt Sortieren der ganzen View.
+--   Nachlauf gegen spät committende Zeilen: setzt das Frontend beim ersten
+--   Aufruf je Abgleich ab (wie bei vektoren_seit()).
+-- ============================================================
+
+create or replace function dokumente_seit(
+  seit    timestamptz default null,
+  nach_id uuid        default null,
+  anzahl  int         default 500
+)
+returns setof bvv_dokumente
+language sql stable
+as $$
+  select d.*
+    from bvv_dokumente d
+   where (d.updated_at, d.id) > (coalesce(seit, '-infinity'),
+                                 coalesce(nach_id, '00000000-0000-0000-0000-000000000000'))
+   order by d.updated_at, d.id
+   limit anzahl;
+$$;
@@ -0,0 +1,16 @@
+-- ============================================================
+--  vorschau – berechnete Spalte für schlanke Listen (PostgREST)
+--   select=id,titel,...,vorschau liefert left(inhalt, 220) statt
+--   des kompletten inhalt (oft zig KB pro Zeile).
+--   PostgREST erkennt Funktionen mit Zeilentyp-Parameter als
+--   "computed field" der View bvv_dokumente.
+-- ============================================================
+
+create or replace function vorschau(d bvv_dokumente)
+returns text
+language sql immutable
+as $$
+  select left(d.inhalt, 220);
+$$;
+
+notify pgrst, 'reload schema';
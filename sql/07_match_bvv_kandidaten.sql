@@ -0,0 +1,36 @@
+-- ============================================================
+--  match_bvv_kandidaten – nur (id, similarity) für semantisches Blättern
+--   Das Frontend holt einmal die Top-N-Kandidaten (z. B. 200) und cached
+--   die Rangliste pro Session + Suche; jede Seite lädt danach nur noch die
+--   Render-Spalten ihrer 10 IDs (kein Embedding, kein Vektor-Scan mehr).
+--   Filter wie match_bvv_dokumente (sql/03_match_bvv_dokumente_filter.sql).
+-- ============================================================
+
+create or replace function match_bvv_kandidaten(
+  query_embedding    vector(1536),
+  match_threshold    float   default 0.3,
+  match_count        int     default 200,
+  typ_filter         text[]  default null,
+  von                date    default null,
+  bis                date    default null,
+  published_only     boolean default false,
+  status_filter      text[]  default null,
+  einreicher_filter  text[]  default null
+)
+returns table (id uuid, similarity float)
+language sql stable
+as $$
+  select d.id,
+         1 - (e.embedding <=> query_embedding) as similarity
+    from vorgang_embeddings e
+    join bvv_dokumente d on d.id = e.id
+   where 1 - (e.embedding <=> query_embedding) > match_threshold
+     and (typ_filter is null or d.typ = any(typ_filter))
+     and (status_filter is null or d.status = any(status_filter))
+     and (einreicher_filter is null or d.einreicher = any(einreicher_filter))
+     and (von is null or d.datum >= von)
+     and (bis is null or d.datum <= bis)
+     and (not published_only or d.published)
+   order by e.embedding <=> query_embedding
+   limit match_count;
+$$;
@@ -0,0 +1,49 @@
+-- ============================================================
+--  facetten() – Trefferzahlen je typ/status/einreicher/jahr
+--   EIN Scan statt je Facettenwert ein count="exact".
+--   Filter wie die klassische Suche (_apply_filters im Frontend):
+--   q → ilike auf titel/inhalt/drucksache/fraktion.
+-- ============================================================
+
+create or replace function facetten(
+  q                  text    default null,
+  typ_filter         text[]  default null,
+  status_filter      text[]  default null,
+  einreicher_filter  text[]  default null,
+  von                date    default null,
+  bis                date    default null
+)
+returns table (facette text, wert text, anzahl bigint)
+language sql stable
+as $$
+  -- Jede Facette zählt unter allen Filtern AUSSER ihrem eigenen – sonst fällt
+  -- bei Auswahl eines Werts jeder andere Wert auf 0 und die Mehrfachauswahl
+  -- wird unbrauchbar. Ein Scan (treffer, materialisiert), die Filter der
+  -- Facetten als Spalten, je Facette ein Aggregat darüber.
+  with treffer as materialized (
+    select d.typ, d.status, d.einreicher, extract(year from d.datum)::int::text as jahr,
+           (typ_filter is null or d.typ = any(typ_filter))                      as ok_typ,
+           (status_filter is null or d.status = any(status_filter))             as ok_status,
+           (einreicher_filter is null or d.einreicher = any(einreicher_filter)) as ok_einreicher
+      from bvv_dokumente d
+     where (von is null or d.datum >= von)
+       and (bis is null or d.datum <= bis)
+       and (q is null or q = ''
+            or d.titel ilike '%' || q || '%'
+            or d.inhalt ilike '%' || q || '%'
+            or d.drucksache ilike '%' || q || '%'
+            or d.fraktion ilike '%' || q || '%')
+  )
+  select 'typ' as facette, typ as wert, count(*) as anzahl
+    from treffer where ok_status and ok_einreicher and typ is not null group by typ
+  union all
+  select 'status', status, count(*)
+    from treffer where ok_typ and ok_einreicher and status is not null group by status
+  union all
+  select 'einreicher', einreicher, count(*)
+    from treffer where ok_typ and ok_status and einreicher is not null group by einreicher
+  union all
+  select 'jahr', jahr, count(*)
+    from treffer where ok_typ and ok_status and ok_einreicher and jahr is not null group by jahr
+   order by 1, 3 desc;
+$$;
@@ -0,0 +1,16 @@
+-- ============================================================
+--  Drucksache-Schnellpfad: Index für exakte + Präfix-Suche
+--   text_pattern_ops → auch "drucksache like '0246/XXI%'" nutzt den
+--   Index (unabhängig von der Collation der Datenbank).
+--   Das Frontend erkennt Eingaben wie "0246/XXI" und sucht damit
+--   direkt statt per ilike über inhalt.
+-- ============================================================
+
+do $$
+declare t text;
+begin
+  foreach t in array array['antraege', 'anfragen_klein', 'anfragen_gross', 'anfragen_muendlich'] loop
+    execute format('create index if not exists %I on %I (drucksache text_pattern_ops)',
+                   t || '_drucksache_pattern_idx', t);
+  end loop;
+end $$;
@@ -0,0 +1,41 @@
+-- ============================================================
+--  aehnliche_vorgaenge – "Ähnliche Vorgänge" zu einem Vorgang
+--   Nimmt den gespeicherten Vektor aus vorgang_embeddings als Anfrage
+--   → kein Embedding-Aufruf. Liefert nur (id, similarity) wie
+--   match_bvv_kandidaten (sql/07); der Vorgang selbst fehlt in der Liste.
+--   Filter wie match_bvv_dokumente (sql/03_match_bvv_dokumente_filter.sql).
+-- ============================================================
+
+create or replace function aehnliche_vorgaenge(
+  doc_id             uuid,
+  match_threshold    float   default 0.3,
+  match_count        int     default 10,
+  typ_filter         text[]  default null,
+  von                date    default null,
+  bis                date    default null,
+  published_only     boolean default false,
+  status_filter      text[]  default null,
+  einreicher_filter  text[]  default null
+)
+returns table (id uuid, similarity float)
+language sql stable
+as $$
+  with q as (
+    select embedding from vorgang_embeddings where id = doc_id
+  )
+  select d.id,
+         1 - (e.embedding <=> q.embedding) as similarity
+    from q
+    cross join vorgang_embeddings e
+    join bvv_dokumente d on d.id = e.id
+   where e.id <> doc_id
+     and 1 - (e.embedding <=> q.embedding) > match_threshold
+     and (typ_filter is null or d.typ = any(typ_filter))
+     and (status_filter is null or d.status = any(status_filter))
+     and (einreicher_filter is null or d.einreicher = any(einreicher_filter))
+     and (von is null or d.datum >= von)
+     and (bis is null or d.datum <= bis)
+     and (not published_only or d.published)
+   order by e.embedding <=> q.embedding
+   limit match_count;
+$$;
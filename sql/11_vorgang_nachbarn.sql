@@ -0,0 +1,34 @@
+-- ============================================================
+--  vorgang_nachbarn – vorberechneter kNN-Graph über vorgang_embeddings
+--   je Vorgang die k ähnlichsten (rang 1 … k), berechnet von
+--   knn_nachbarn.py (NumPy, voll oder inkrementell nach der Ingestion).
+--   "Ähnliche Vorgänge" / "Siehe auch" = ein Index-Read auf (id, rang).
+-- ============================================================
+
+create table if not exists vorgang_nachbarn (
+  id          uuid     not null,
+  rang        smallint not null,
+  nachbar_id  uuid     not null,
+  similarity  real     not null,
+  primary key (id, rang)
+);
+create index if not exists vorgang_nachbarn_nachbar_idx on vorgang_nachbarn (nachbar_id);
+
+-- Wasserstand des Jobs (updated_at der zuletzt verarbeiteten Vektoren)
+create table if not exists vorgang_nachbarn_stand (
+  id          int primary key default 1 check (id = 1),
+  seit        timestamptz,
+  k           int  not null,
+  emb_model   text,
+  updated_at  timestamptz not null default now()
+);
+
+-- k des aktuellen Graphen für das Frontend: es liest kalli_status ohnehin (Watcher),
+-- so kann sein Grenzwert nicht vom k des Jobs abweichen
+alter table kalli_status add column if not exists knn_k int;
+
+-- Frontend (ANON-Key) darf lesen, nicht schreiben
+alter table vorgang_nachbarn enable row level security;
+drop policy if exists vorgang_nachbarn_lesen on vorgang_nachbarn;
+create policy vorgang_nachbarn_lesen on vorgang_nachbarn for select using (true);
+alter table vorgang_nachbarn_stand enable row level security;
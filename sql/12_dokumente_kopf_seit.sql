@@ -0,0 +1,24 @@
+-- ============================================================
+--  dokumente_kopf_seit() – wie dokumente_seit(), aber nur die Kopfspalten
+--   für den Typeahead (Titel/Thema/Drucksache/Datum). Ohne inhalt: der
+--   Aufbau je Prozess/Worker zieht sonst den ganzen Volltext übers Netz.
+-- ============================================================
+
+create or replace function dokumente_kopf_seit(
+  seit    timestamptz default null,
+  nach_id uuid        default null,
+  anzahl  int         default 2000
+)
+returns table (
+  id uuid, typ text, titel text, thema text, drucksache text, datum date,
+  updated_at timestamptz
+)
+language sql stable
+as $$
+  select d.id, d.typ, d.titel, d.thema, d.drucksache, d.datum, d.updated_at
+    from bvv_dokumente d
+   where (d.updated_at, d.id) > (coalesce(seit, '-infinity'),
+                                 coalesce(nach_id, '00000000-0000-0000-0000-000000000000'))
+   order by d.updated_at, d.id
+   limit anzahl;
+$$;
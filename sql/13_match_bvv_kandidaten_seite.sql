@@ -0,0 +1,57 @@
+-- ============================================================
+--  match_bvv_kandidaten_seite – Rangliste + erste Seite in EINEM Roundtrip
+--   Wie match_bvv_kandidaten (sql/07): Top-N als (id, similarity) für das
+--   Blättern. Zusätzlich tragen die ersten seite_n Treffer ihre Render-Spalten
+--   (wie LIST_COLUMNS im Frontend, vorschau statt inhalt) als jsonb "zeile" –
+--   Seite 1 braucht damit keinen zweiten Abruf, erst weitere Seiten laden
+--   ihre Zeilen über die IDs nach.
+-- ============================================================
+
+create or replace function match_bvv_kandidaten_seite(
+  query_embedding    vector(1536),
+  match_threshold    float   default 0.3,
+  match_count        int     default 200,
+  seite_n            int     default 10,
+  typ_filter         text[]  default null,
+  von                date    default null,
+  bis                date    default null,
+  published_only     boolean default false,
+  status_filter      text[]  default null,
+  einreicher_filter  text[]  default null
+)
+returns table (id uuid, similarity float, zeile jsonb)
+language sql stable
+as $$
+  with k as (
+    -- gleicher Scan wie match_bvv_kandidaten (Index-Order + limit)
+    select d.id,
+           1 - (e.embedding <=> query_embedding) as similarity
+      from vorgang_embeddings e
+      join bvv_dokumente d on d.id = e.id
+     where 1 - (e.embedding <=> query_embedding) > match_threshold
+       and (typ_filter is null or d.typ = any(typ_filter))
+       and (status_filter is null or d.status = any(status_filter))
+       and (einreicher_filter is null or d.einreicher = any(einreicher_filter))
+       and (von is null or d.datum >= von)
+       and (bis is null or d.datum <= bis)
+       and (not published_only or d.published)
+     order by e.embedding <=> query_embedding
+     limit match_count
+  ), r as (
+    -- Rang erst über den ≤ match_count Treffern (Fensterfunktion nicht im Scan)
+    select k.id, k.similarity, row_number() over (order by k.similarity desc, k.id) as rang
+      from k
+  )
+  select r.id, r.similarity,
+         case when r.rang <= seite_n then (
+           select jsonb_build_object(
+                    'id', d.id, 'typ', d.typ, 'titel', d.titel, 'datum', d.datum,
+                    'status', d.status, 'fraktion', d.fraktion, 'einreicher', d.einreicher,
+                    'drucksache', d.drucksache, 'pdf_url', d.pdf_url, 'kategorie', d.kategorie,
+                    'vorschau', left(d.inhalt, 220))
+             from bvv_dokumente d
+            where d.id = r.id)
+         end as zeile
+    from r
+   order by r.rang;
+$$;
@@ -0,0 +1,78 @@
+# BM25: CISTEM-Stemmer, Tokenisierung (Stoppwörter, Zahlen) und Scoring –
+# seltene Terme und Titel zählen mehr, Filter greifen, geänderte Vorgänge ersetzen den alten Slot.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+import bm25_index  # noqa: E402
+from bm25_index import BM25Index, rrf_fuse, stem, tokenize  # noqa: E402
+
+needs_numpy = pytest.mark.skipif(bm25_index.np is None, reason="NumPy fehlt")
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("Radwegen", "radweg"),
+    ("Radweg", "radweg"),
+    ("Anträge", "antrag"),
+    ("Schulen", "schul"),
+    ("Spielplätze", "spielplatz"),
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+def test_stem_vereint_flexionsformen():
+    assert stem("Bäume") == stem("Baum")
+    assert stem("gefordert") == stem("fordert")
+
+
+def test_tokenize():
+    assert tokenize("Der Antrag zur Drucksache 0246 über Radwege") == ["antrag", "0246", "radweg"]
+    assert tokenize(None) == []
+
+
+def _index() -> BM25Index:
+    idx = BM25Index()
+    idx.add({"id": "1", "titel": "Radwege", "inhalt": "Sanierung der Schulen", "typ": "antrag", "datum": "2024-01-01"})
+    idx.add({"id": "2", "titel": "Schulen", "inhalt": "Radwege an Schulen", "typ": "anfrage_klein", "datum": "2023-01-01"})
+    idx.add({"id": "3", "titel": "Haushalt", "inhalt": "Schulen und Kitas", "typ": "antrag", "datum": "2024-05-01"})
+    return idx
+
+
+@needs_numpy
+def test_titel_zaehlt_mehr():
+    hits = _index().search("radwege")
+    assert [h["id"] for h in hits] == ["1", "2"]
+    assert hits[0]["bm25"] > hits[1]["bm25"] > 0
+
+
+@needs_numpy
+def test_seltener_term_wiegt_mehr():
+    hits = _index().search("schulen kitas")
+    assert hits[0]["id"] == "3"            # einziger Treffer für "kitas"
+
+
+@needs_numpy
+def test_filter():
+    idx = _index()
+    assert sorted(h["id"] for h in idx.search("schulen", typ=["antrag"])) == ["1", "3"]
+    assert [h["id"] for h in idx.search("schulen", von="2024-02-01")] == ["3"]
+
+
+@needs_numpy
+def test_aenderung_ersetzt_slot():
+    idx = _index()
+    idx.add({"id": "1", "titel": "Parkplätze", "inhalt": "", "typ": "antrag"})
+    assert "1" not in [h["id"] for h in idx.search("radwege")]
+    assert [h["id"] for h in idx.search("parkplatz")] == ["1"]
+    assert len(idx) == 3
+
+
+def test_rrf_fuse():
+    fused = rrf_fuse([{"id": "a"}, {"id": "b"}], [{"id": "b", "titel": "B"}, {"id": "c"}])
+    assert [r["id"] for r in fused] == ["b", "a", "c"]
+    assert fused[0]["titel"] == "B"
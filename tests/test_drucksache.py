@@ -0,0 +1,36 @@
+# Drucksache-Schnellpfad: nur echte Drucksache-Nummern werden erkannt,
+# Varianten mit/ohne führende Nullen, Wahlperiode in Großbuchstaben.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from drucksache import drucksache_query  # noqa: E402
+
+
+@pytest.mark.parametrize("q, variants, prefix", [
+    ("0246/XXI", ["0246/XXI", "246/XXI"], "0246/XXI"),
+    ("246/xxi", ["246/XXI", "0246/XXI"], "0246/XXI"),
+    ("  1234 / XX ", ["1234/XX"], "1234/XX"),
+    ("0000/XXI", ["0000/XXI", "0/XXI"], "0000/XXI"),
+])
+def test_erkannt(q, variants, prefix):
+    assert drucksache_query(q) == (variants, prefix)
+
+
+@pytest.mark.parametrize("q", [
+    None,
+    "",
+    "Radwege",
+    "12/XXI",                 # zu kurz
+    "12345/XXI",              # zu lang
+    "0246/ABC",               # keine Wahlperiode
+    "0246/XXIII",             # fünf Zeichen
+    "0246/XXI Radwege",       # Drucksache + Text → normale Suche
+    "0246-XXI",
+])
+def test_keine_drucksache(q):
+    assert drucksache_query(q) is None
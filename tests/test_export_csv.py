@@ -0,0 +1,46 @@
+# CSV-Export: Zellen, die eine Tabellenkalkulation als Formel ausführen würde,
+# werden mit ' als Text markiert – alles andere bleibt unverändert.
+
+import csv
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from export_csv import csv_cell  # noqa: E402
+
+
+@pytest.mark.parametrize("value", [
+    "=HYPERLINK(\"http://evil\";\"klick\")",
+    "=1+1",
+    "+49 30 123",
+    "-2+3",
+    "@SUM(A1:A2)",
+    "\t=1+1",
+    "\r=1+1",
+])
+def test_formel_wird_text(value):
+    assert csv_cell(value) == "'" + value
+
+
+@pytest.mark.parametrize("value", [
+    "Radwege in Tempelhof",
+    "0246/XXI",
+    "a=b",
+    "",
+    None,
+    42,
+    -3,
+])
+def test_unveraendert(value):
+    assert csv_cell(value) == value
+
+
+def test_im_csv():
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=";")
+    w.writerow([csv_cell(v) for v in ("=cmd|' /C calc'!A0", "ok")])
+    assert buf.getvalue() == "'=cmd|' /C calc'!A0;ok\r\n"
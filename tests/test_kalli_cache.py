@@ -0,0 +1,141 @@
+# TTLCache (LRU, Ablauf, on_evict, Namensraum je Datenstand) und SingleFlight
+# (gleichzeitige Aufrufe rechnen einmal, Fehler erreichen alle Wartenden).
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+import kalli_cache  # noqa: E402
+from kalli_cache import SharedStore, SingleFlight, TTLCache  # noqa: E402
+
+
+def test_lru_verwirft_aeltesten():
+    evicted = []
+    c = TTLCache(maxsize=2, ttl=60, on_evict=evicted.append)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1              # a zuletzt benutzt → b fliegt
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert evicted == [2]
+
+
+def test_ablauf(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(kalli_cache.time, "monotonic", lambda: now[0])
+    evicted = []
+    c = TTLCache(maxsize=8, ttl=10, on_evict=evicted.append)
+    c.set("k", "v")
+    now[0] += 9
+    assert c.get("k") == "v"
+    now[0] += 2
+    assert c.get("k", "weg") == "weg"
+    assert evicted == ["v"]
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_clear_und_ersetzen_melden_on_evict():
+    evicted = []
+    c = TTLCache(maxsize=8, ttl=60, on_evict=evicted.append)
+    c.set("k", "alt")
+    c.set("k", "neu")
+    c.set("x", "y")
+    assert c.pop("x") == "y"            # pop gibt den Wert zurück, kein on_evict
+    c.clear()
+    assert evicted == ["alt", "neu"]
+    assert len(c) == 0
+
+
+def test_get_or_set_rechnet_nur_bei_miss():
+    calls = []
+    c = TTLCache(maxsize=8, ttl=60)
+    assert c.get_or_set("k", lambda: calls.append(1) or "v") == "v"
+    assert c.get_or_set("k", lambda: calls.append(1) or "anders") == "v"
+    assert calls == [1]
+
+
+def test_shared_store_je_datenstand(tmp_path, monkeypatch):
+    monkeypatch.setitem(kalli_cache._GENERATION, "v", 1)
+    store = SharedStore(str(tmp_path / "cache.sqlite"))
+    alt = TTLCache(maxsize=8, ttl=60, name="suche", shared=store)
+    alt.versioned = True
+    alt.set("q", "stand 1")
+
+    kalli_cache.set_generation(2)
+    neu = TTLCache(maxsize=8, ttl=60, name="suche", shared=store)
+    neu.versioned = True
+    assert neu.get("q") is None         # anderer Datenstand → nicht sichtbar
+    neu.set("q", "stand 2")
+    assert TTLCache(maxsize=8, ttl=60, name="suche", shared=store).get("q") is None   # unversioniert
+    neu.clear()
+    kalli_cache.set_generation(1)
+    assert TTLCache(maxsize=8, ttl=60, name="suche", shared=store).get("q") is None
+    assert store.get("suche@1", "q") is None    # clear leert alle Datenstände
+
+
+def test_singleflight_rechnet_einmal():
+    sf = SingleFlight("t")
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    def worker():
+        results.append(sf.do("k", slow))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    deadline = time.monotonic() + 5
+    while sf.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1]
+    assert results == [42] * 5
+    assert sf.coalesced == 4
+
+
+def test_singleflight_fehler_fuer_alle():
+    sf = SingleFlight("t")
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def boom():
+        started.set()
+        release.wait(5)
+        raise ValueError("kaputt")
+
+    def worker():
+        try:
+            sf.do("k", boom)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=worker)
+    follower.start()
+    deadline = time.monotonic() + 5
+    while sf.coalesced < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert errors == ["kaputt", "kaputt"]
+    with pytest.raises(ValueError):     # nichts hängen geblieben: nächster Aufruf rechnet neu
+        sf.do("k", boom)
@@ -0,0 +1,99 @@
+# BufferedLogger: schreibt nach Anzahl ODER Zeit, verliert beim close() nichts,
+# verwirft bei voller Queue und wiederholt ein fehlgeschlagenes Insert einmal.
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from kalli_log import BufferedLogger  # noqa: E402
+
+
+class _Sink:
+    def __init__(self, fail: int = 0):
+        self.batches = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self.lock:
+            if self.fail:
+                self.fail -= 1
+                raise RuntimeError("DB weg")
+            self.batches.append(list(rows))
+
+    def rows(self):
+        with self.lock:
+            return [r for b in self.batches for r in b]
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_batch_nach_anzahl():
+    sink = _Sink()
+    lg = BufferedLogger(sink, batch_size=3, interval=60, name="t-anzahl")
+    try:
+        for i in range(3):
+            assert lg.log({"i": i})
+        assert _wait(lambda: len(sink.rows()) == 3)
+        assert sink.batches == [[{"i": 0}, {"i": 1}, {"i": 2}]]
+    finally:
+        lg.close()
+
+
+def test_batch_nach_zeit():
+    sink = _Sink()
+    lg = BufferedLogger(sink, batch_size=100, interval=0.2, name="t-zeit")
+    try:
+        lg.log({"i": 1})
+        assert _wait(lambda: sink.rows() == [{"i": 1}])
+    finally:
+        lg.close()
+
+
+def test_close_schreibt_rest():
+    sink = _Sink()
+    lg = BufferedLogger(sink, batch_size=100, interval=60, name="t-close")
+    for i in range(7):
+        lg.log({"i": i})
+    lg.close()
+    assert sink.rows() == [{"i": i} for i in range(7)]
+    assert lg.written == 7
+    lg.close()                              # zweites close (atexit nach SIGTERM) ist harmlos
+
+
+def test_volle_queue_verwirft():
+    release = threading.Event()
+    sink = _Sink()
+
+    def blocked(rows):
+        release.wait(5)
+        sink(rows)
+
+    lg = BufferedLogger(blocked, maxsize=2, batch_size=1, interval=60, name="t-voll")
+    try:
+        lg.log({"i": 0})                    # Writer hängt in insert_fn
+        assert _wait(lambda: lg._q.qsize() == 0)
+        assert lg.log({"i": 1}) and lg.log({"i": 2})
+        assert not lg.log({"i": 3})
+        assert lg.dropped == 1
+    finally:
+        release.set()
+        lg.close()
+    assert sorted(r["i"] for r in sink.rows()) == [0, 1, 2]
+
+
+def test_fehler_einmal_wiederholt():
+    sink = _Sink(fail=1)
+    lg = BufferedLogger(sink, batch_size=100, interval=60, name="t-retry")
+    lg.log({"i": 1})
+    lg.close()
+    assert sink.rows() == [{"i": 1}]
+    assert (lg.written, lg.failed) == (1, 0)
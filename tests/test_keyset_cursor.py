@@ -0,0 +1,103 @@
+# Keyset-Paging mit NULL-Daten: jede Zeile genau einmal, in Sortierreihenfolge –
+# einmal gegen das SQLite-Replikat, einmal gegen die PostgREST-Parameter aus keyset.py
+# (order + or_-Filter, hier in Python ausgewertet wie PostgREST es tut).
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from keyset import apply_cursor, apply_order, encode_cursor, order_param  # noqa: E402
+from sqlite_replica import SqliteReplica  # noqa: E402
+
+ROWS = [
+    {"id": f"{i:04d}", "titel": f"t{i}", "inhalt": "x", "updated_at": f"{i:08d}",
+     "datum": None if i % 4 == 0 else f"2024-01-{1 + i % 3:02d}"}
+    for i in range(23)
+]
+
+
+def _expected(desc: bool) -> list[str]:
+    dated = sorted((r for r in ROWS if r["datum"]), key=lambda r: (r["datum"], r["id"]), reverse=desc)
+    nulls = sorted((r for r in ROWS if not r["datum"]), key=lambda r: r["id"], reverse=desc)
+    return [r["id"] for r in dated + nulls]
+
+
+# ---------- PostgREST-Auswertung (nur was keyset.py erzeugt) ----------
+
+def _split(expr: str) -> list[str]:
+    parts, depth, cur = [], 0, ""
+    for ch in expr:
+        if ch == "," and depth == 0:
+            parts.append(cur)
+            cur = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        cur += ch
+    return parts + [cur]
+
+
+def _term(row: dict, term: str) -> bool:
+    if term.startswith("and("):
+        return all(_term(row, t) for t in _split(term[4:-1]))
+    col, op, val = term.split(".", 2)
+    v = row.get(col)
+    if op == "is":
+        return v is None
+    if v is None:
+        return False                      # Vergleich mit NULL → unbekannt → raus
+    return {"lt": v < val, "gt": v > val, "eq": v == val}[op]
+
+
+class _Params(dict):
+    def set(self, key, value):
+        return _Params(self, **{key: value})
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows, self.params, self.filters = rows, _Params(), []
+
+    def or_(self, expr):
+        self.filters.append(expr)
+        return self
+
+    def execute(self, limit):
+        rows = [r for r in self.rows if all(any(_term(r, t) for t in _split(f)) for f in self.filters)]
+        for key in reversed(self.params["order"].split(",")):
+            col, direction, *nulls = key.split(".")
+            present = sorted((r for r in rows if r[col] is not None), key=lambda r: r[col],
+                             reverse=direction == "desc")
+            missing = [r for r in rows if r[col] is None]
+            rows = present + missing if nulls == ["nullslast"] else missing + present
+        return rows[:limit]
+
+
+@pytest.mark.parametrize("desc", [True, False])
+def test_postgrest_keyset_nulls_last(desc):
+    assert order_param("datum", desc).startswith(f"datum.{'desc' if desc else 'asc'}.nullslast")
+    seen, cursor = [], None
+    while True:
+        query = apply_order(apply_cursor(FakeQuery(ROWS), cursor, "datum", desc), "datum", desc)
+        page = query.execute(5)
+        seen += [r["id"] for r in page]
+        if len(page) < 5:
+            break
+        cursor = encode_cursor(page[-1], "datum")
+    assert seen == _expected(desc)
+
+
+@pytest.mark.parametrize("desc", [True, False])
+def test_replica_keyset_nulls_last(tmp_path, desc):
+    rep = SqliteReplica(str(tmp_path / "r.sqlite"))
+    rep.sync(lambda seit, nach_id, anzahl: ROWS if seit is None else [])
+    seen, after = [], None
+    while True:
+        page = rep.list(limit=5, after=after, col="datum", desc=desc)
+        seen += [r["id"] for r in page]
+        if len(page) < 5:
+            break
+        after = (page[-1]["datum"], page[-1]["id"])
+    assert seen == _expected(desc)
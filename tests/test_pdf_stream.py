@@ -0,0 +1,68 @@
+# StreamingPDF: xref-Offsets zeigen genau auf "n 0 obj", Trailer/startxref
+# stimmen, Seiten landen im Seitenbaum, Umbruch erzeugt neue Seiten.
+
+import io
+import os
+import re
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from pdf_stream import PAGE_W, MARGIN, StreamingPDF, text_width, wrap  # noqa: E402
+
+
+def _pdf(paragraphs: int) -> bytes:
+    buf = io.BytesIO()
+    pdf = StreamingPDF(buf, title="Test (Kalli)", footer="Export")
+    pdf.heading("Überschrift")
+    for i in range(paragraphs):
+        pdf.paragraph(f"Absatz {i}: " + "Radwege in Tempelhof " * 20)
+        pdf.rule()
+    pdf.close()
+    return buf.getvalue()
+
+
+def _xref(data: bytes) -> tuple[int, list[int]]:
+    start = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[start:start + 5] == b"xref\n"
+    head, *lines = data[start:].split(b"trailer")[0].split(b"\n")[1:-1]
+    count = int(head.split()[1])
+    assert lines[0] == b"0000000000 65535 f "
+    offsets = [int(line[:10]) for line in lines[1:]]
+    assert len(offsets) == count - 1
+    return count, offsets
+
+
+def test_xref_offsets():
+    data = _pdf(paragraphs=3)
+    count, offsets = _xref(data)
+    for num, off in enumerate(offsets, start=1):
+        assert data[off:].startswith(f"{num} 0 obj\n".encode()), num
+    assert f"/Size {count} /Root 1 0 R".encode() in data
+
+
+def test_seitenbaum():
+    data = _pdf(paragraphs=40)
+    pages = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+    assert pages > 1
+    assert data.count(b"/Type /Page ") == pages
+    _, offsets = _xref(data)
+    assert len(offsets) == 5 + 2 * pages       # 5 feste Objekte + je Seite Inhalt + Seite
+
+
+def test_inhalt_escaped_und_komprimiert():
+    data = _pdf(paragraphs=1)
+    assert b"/Title (Test \\(Kalli\\))" in data
+    stream = re.search(rb"stream\n(.*?)\nendstream", data, re.S).group(1)
+    text = zlib.decompress(stream)
+    assert "Überschrift".encode("cp1252") in text
+    assert b"Export \xb7 Seite 1" in text
+
+
+def test_wrap_passt_in_die_breite():
+    width = PAGE_W - 2 * MARGIN
+    lines = wrap("Radwege " * 60 + "x" * 400, 10, width)
+    assert len(lines) > 3
+    assert all(text_width(line, 10) <= width for line in lines)
+    assert wrap("a\n\nb", 10, width) == ["a", "", "b"]
@@ -0,0 +1,47 @@
+# Facetten im SQLite-Replikat: jede Facette zählt ohne ihren eigenen Filter –
+# andere Werte derselben Facette bleiben sichtbar (Mehrfachauswahl), die
+# Filter der übrigen Facetten greifen weiter.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from sqlite_replica import SqliteReplica  # noqa: E402
+
+ROWS = [
+    {"id": "1", "typ": "antrag", "status": "eingereicht", "einreicher": "Franck", "datum": "2023-05-01"},
+    {"id": "2", "typ": "antrag", "status": "beantwortet", "einreicher": "Kasper", "datum": "2024-02-01"},
+    {"id": "3", "typ": "anfrage_klein", "status": "beantwortet", "einreicher": "Kasper", "datum": "2024-03-01"},
+    {"id": "4", "typ": "anfrage_klein", "status": "eingereicht", "einreicher": "Turban", "datum": "2024-04-01"},
+]
+
+
+def _replica(tmp_path):
+    rep = SqliteReplica(str(tmp_path / "r.sqlite"))
+    rows = [{**r, "titel": f"t{r['id']}", "inhalt": "x", "updated_at": r["id"]} for r in ROWS]
+    rep.sync(lambda seit, nach_id, anzahl: [] if seit else rows)
+    return rep
+
+
+def _counts(rows) -> dict:
+    out = {}
+    for r in rows:
+        out.setdefault(r["facette"], {})[r["wert"]] = r["anzahl"]
+    return out
+
+
+def test_eigener_filter_zaehlt_nicht(tmp_path):
+    f = _counts(_replica(tmp_path).facets(einreicher=["Kasper"]))
+    assert f["einreicher"] == {"Franck": 1, "Kasper": 2, "Turban": 1}
+    # andere Facetten: unter dem Einreicher-Filter
+    assert f["typ"] == {"antrag": 1, "anfrage_klein": 1}
+    assert f["status"] == {"beantwortet": 2}
+    assert f["jahr"] == {"2024": 2}
+
+
+def test_kombinierte_filter(tmp_path):
+    f = _counts(_replica(tmp_path).facets(typ=["anfrage_klein"], status=["eingereicht"]))
+    assert f["typ"] == {"antrag": 1, "anfrage_klein": 1}          # nur status greift
+    assert f["status"] == {"beantwortet": 1, "eingereicht": 1}     # nur typ greift
+    assert f["einreicher"] == {"Turban": 1}                        # beide greifen
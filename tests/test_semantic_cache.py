@@ -0,0 +1,53 @@
+# SemanticCache: Treffer nur ab der Cosinus-Schwelle und nur bei gleicher
+# Filter-Signatur; ähnliche (nicht identische) Anfragen zählen als near_hit.
+
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from semantic_cache import SemanticCache  # noqa: E402
+
+
+def _vec(grad: float) -> list[float]:
+    """Einheitsvektor im Winkel `grad` zu [1, 0, 0]."""
+    w = math.radians(grad)
+    return [math.cos(w), math.sin(w), 0.0]
+
+
+def test_schwelle():
+    c = SemanticCache(maxsize=8, ttl=60, threshold=0.95)
+    c.add("sig", [2.0, 0.0, 0.0], "rangliste")       # wird normiert
+    assert c.lookup("sig", _vec(0)) == "rangliste"
+    assert c.lookup("sig", _vec(15)) == "rangliste"   # cos 15° ≈ 0.966
+    assert c.lookup("sig", _vec(20)) is None          # cos 20° ≈ 0.940
+    assert (c.hits, c.near_hits, c.misses) == (2, 1, 1)
+
+
+def test_andere_signatur_kein_treffer():
+    c = SemanticCache(maxsize=8, ttl=60, threshold=0.5)
+    c.add(("antrag",), _vec(0), "a")
+    assert c.lookup(("anfrage",), _vec(0)) is None
+
+
+def test_naechster_nachbar_gewinnt():
+    c = SemanticCache(maxsize=8, ttl=60, threshold=0.9)
+    c.add("sig", _vec(0), "weit")
+    c.add("sig", _vec(20), "nah")
+    assert c.lookup("sig", _vec(18)) == "nah"
+
+
+def test_lru_und_ablauf(monkeypatch):
+    import semantic_cache
+    now = [0.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    c = SemanticCache(maxsize=2, ttl=10, threshold=0.99)
+    c.add("sig", _vec(0), "a")
+    c.add("sig", _vec(60), "b")
+    c.add("sig", _vec(120), "c")                       # a fliegt (LRU)
+    assert c.lookup("sig", _vec(0)) is None
+    assert c.lookup("sig", _vec(120)) == "c"
+    now[0] = 11
+    assert c.lookup("sig", _vec(120)) is None          # abgelaufen
+    assert len(c) == 0
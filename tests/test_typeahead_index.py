@@ -0,0 +1,64 @@
+# PrefixIndex: Drucksache vor Titelanfang vor Wortanfang, neueste zuerst;
+# inkrementelle Updates ersetzen alte Schlüssel, Nachlauf zählt nicht doppelt.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+
+from typeahead_index import PrefixIndex  # noqa: E402
+
+ROWS = [
+    {"id": "1", "titel": "Radwege in Tempelhof", "drucksache": "0246/XXI", "datum": "2023-01-01", "updated_at": "1"},
+    {"id": "2", "titel": "Sichere Radwege", "thema": "Verkehr", "drucksache": "0300/XXI", "datum": "2024-01-01", "updated_at": "2"},
+    {"id": "3", "titel": "Radverkehr am Tempelhofer Feld", "drucksache": "0012/XXI", "datum": "2024-06-01", "updated_at": "3"},
+]
+
+
+def _index() -> PrefixIndex:
+    idx = PrefixIndex()
+    idx.update(ROWS)
+    return idx
+
+
+def _ids(hits) -> list[str]:
+    return [h["id"] for h in hits]
+
+
+def test_reihenfolge():
+    idx = _index()
+    assert _ids(idx.suggest("rad")) == ["3", "1", "2"]      # Titelanfang (neueste zuerst), dann Wortanfang
+    assert _ids(idx.suggest("tempelhof")) == ["3", "1"]
+
+
+def test_drucksache_mit_und_ohne_nullen():
+    idx = _index()
+    assert _ids(idx.suggest("0246/X")) == ["1"]
+    assert _ids(idx.suggest("12/xxi")) == ["3"]
+
+
+def test_mehrere_woerter_und_mindestlaenge():
+    idx = _index()
+    assert _ids(idx.suggest("radweg tempel")) == ["1"]
+    assert idx.suggest("r") == []
+
+
+def test_update_ersetzt_schluessel():
+    idx = _index()
+    idx.update([{**ROWS[0], "titel": "Parkplätze", "updated_at": "9"}])
+    assert "1" not in _ids(idx.suggest("radwege"))
+    assert _ids(idx.suggest("parkpl")) == ["1"]
+    assert len(idx) == 3
+
+
+def test_sync_mit_nachlauf():
+    pages = {None: ROWS[:2], "2": ROWS[1:]}          # zweite Seite beginnt mit bekannter Zeile
+
+    def fetch(seit, nach_id, anzahl):
+        return pages.get(seit, [])[:anzahl]
+
+    idx = PrefixIndex()
+    assert idx.sync(fetch, page_size=3) == 2
+    assert idx.sync(fetch, page_size=3) == 1          # nur Zeile 3 ist neu
+    assert idx.watermark == ["3", "3"]
+    assert len(idx) == 3